@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        from . import signals
+        post_save.connect(signals.invalidate_cached_user, sender=self.get_model('User'))
+        post_delete.connect(signals.invalidate_cached_user, sender=self.get_model('User'))
@@ -0,0 +1,148 @@
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework import authentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+User = get_user_model()
+
+
+class CachedBasicAuthentication(authentication.BasicAuthentication):
+    """
+    HTTP Basic authentication which remembers successfully verified credentials
+    for ``BASIC_AUTH_CACHE_TIMEOUT`` seconds, so repeated requests skip the password hashing.
+
+    Cache keys are an HMAC of the user id, the stored password hash and the supplied password,
+    so the entries of a user stop matching as soon as the password changes, and the cache
+    never holds the password itself. Whether the user is active is checked on every request.
+    Failed attempts are not cached.
+    """
+    cache_prefix = 'basic-auth'
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'BASIC_AUTH_CACHE_TIMEOUT', 0)
+
+    def authenticate_credentials(self, userid, password, request=None):
+        if not self.timeout:
+            return super(CachedBasicAuthentication, self).authenticate_credentials(userid, password, request)
+
+        try:
+            user = User._default_manager.get_by_natural_key(userid)
+        except User.DoesNotExist:
+            user = None
+        if user is not None and user.is_active and cache.get(self.get_cache_key(user, password)):
+            return user, None
+
+        user, auth = super(CachedBasicAuthentication, self).authenticate_credentials(userid, password, request)
+        cache.set(self.get_cache_key(user, password), True, self.timeout)
+        return user, auth
+
+    def get_cache_key(self, user, password):
+        message = '{}:{}:{}'.format(user.pk, user.password, password).encode()
+        digest = hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+        return '{}:{}'.format(self.cache_prefix, digest)
+
+
+class UserCache:
+    """
+    Small in-process LRU cache of :model:`accounts.User` rows which expire after ``JWT_USER_CACHE_TIMEOUT`` seconds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = OrderedDict()
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'JWT_USER_CACHE_SIZE', 1024)
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'JWT_USER_CACHE_TIMEOUT', 0)
+
+    def get(self, user_id):
+        """
+        Return the user with the given id, or ``None`` if there is no such user.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._users.move_to_end(user_id)
+                return entry[1]
+
+        user = User.objects.filter(pk=user_id).first()
+        if user is not None and self.timeout:
+            with self._lock:
+                self._users[user_id] = (now + self.timeout, user)
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_size:
+                    self._users.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+class ClaimsUser(TokenUser):
+    """
+    User built from the claims of a validated token, without a database query.
+
+    Attributes which are not in the claims, e.g. ``email``, are read from the full user row,
+    loaded through :data:`user_cache` on first use.
+    """
+
+    @property
+    def is_active(self):
+        return self.token.get('is_active', True)
+
+    @property
+    def user(self):
+        user = user_cache.get(self.pk)
+        if user is None:
+            raise AuthenticationFailed('User not found.', code='user_not_found')
+        return user
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name == 'token':
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication which resolves the user from the token claims
+    embedded by :class:`accounts.serializers.TokenObtainPairSerializer`, so it costs no queries.
+
+    Changes of the user are reflected when the access token is refreshed.
+    Tokens issued without the claims are resolved from the database.
+    """
+
+    def get_user(self, validated_token):
+        if 'username' not in validated_token:
+            return super(ClaimsJWTAuthentication, self).get_user(validated_token)
+        if jwt_settings.USER_ID_CLAIM not in validated_token:
+            raise AuthenticationFailed('Token contained no recognizable user identification', code='token_not_valid')
+
+        user = ClaimsUser(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+        return user
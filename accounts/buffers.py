@@ -0,0 +1,171 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DatabaseError, close_old_connections
+
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
+
+
+class LastRequestBuffer:
+    """
+    Coalesces writes of :model:`accounts.User` ``last_request`` timestamps.
+
+    Timestamps closer than ``LAST_REQUEST_GRANULARITY`` seconds to the last recorded value are skipped.
+    In buffered mode (``LAST_REQUEST_BUFFERED``) the latest timestamp per user is kept in memory and
+    written with a single bulk update once ``LAST_REQUEST_FLUSH_SIZE`` users are pending
+    or ``LAST_REQUEST_FLUSH_INTERVAL`` seconds have passed since the previous flush. A background thread
+flushes the buffer once the interval has passed without requests, so the interval bounds the lag of the database.
+    Timestamps flushed to a background task are kept until it writes them in this process, so they can still be read.
+    """
+    max_seen = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._queued = {}
+        self._seen = {}
+        self._last_flush = time.monotonic()
+        self._thread = None
+
+    @property
+    def buffered(self):
+        return bool(getattr(settings, 'LAST_REQUEST_BUFFERED', False))
+
+    @property
+    def granularity(self):
+        return getattr(settings, 'LAST_REQUEST_GRANULARITY', 0)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'LAST_REQUEST_FLUSH_INTERVAL', 30)
+
+    @property
+    def flush_size(self):
+        return getattr(settings, 'LAST_REQUEST_FLUSH_SIZE', 500)
+
+    def touch(self, user_id, timestamp, defer=False):
+        """
+        Record a request made by the user at the given time.
+        """
+        if self.record(user_id, timestamp):
+            self.flush(defer)
+
+    def record(self, user_id, timestamp):
+        """
+        Record a request like :meth:`touch`, without writing to the database.
+        Return whether pending timestamps should be flushed now.
+        """
+        buffered = self.buffered
+        with self._lock:
+            seen = self._seen.get(user_id)
+            if seen is not None and (timestamp - seen).total_seconds() < self.granularity:
+                return False
+            if len(self._seen) >= self.max_seen:
+                self._seen.clear()
+            self._seen[user_id] = timestamp
+            self._pending[user_id] = timestamp
+            due = not buffered or len(self._pending) >= self.flush_size or \
+                time.monotonic() - self._last_flush >= self.flush_interval
+        if buffered and not due:
+            self.start()
+        return due
+
+    def start(self):
+        """
+        Start the thread flushing pending timestamps every ``LAST_REQUEST_FLUSH_INTERVAL`` seconds, unless running.
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self.run, name='last-request-flush', daemon=True)
+            self._thread.start()
+
+    def run(self):
+        while True:
+            time.sleep(max(self._last_flush + self.flush_interval - time.monotonic(), 1))
+            close_old_connections()
+            try:
+                self.flush_due()
+            except Exception:
+                logger.exception('Failed to flush last request timestamps')
+            finally:
+                close_old_connections()
+
+    def flush_due(self):
+        """
+        Flush pending timestamps if ``LAST_REQUEST_FLUSH_INTERVAL`` seconds have passed since the previous flush.
+        """
+        if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def get(self, user_id):
+        """
+        Return the latest timestamp waiting to be written for the user, if any.
+        """
+        with self._lock:
+            pending, queued = self._pending.get(user_id), self._queued.get(user_id)
+        if pending is None or queued is None:
+            return pending or queued
+        return max(pending, queued)
+
+    def flush(self, defer=False):
+        """
+        Write all pending timestamps to the database, or with ``defer`` in a background task.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            if defer:
+                if len(self._queued) >= self.max_seen:
+                    self._queued.clear()
+                self._queued.update(pending)
+
+        if not pending:
+            return
+
+        try:
+            if defer:
+                from .tasks import save_last_requests
+                save_last_requests.delay(timestamps={user_id: value.isoformat() for user_id, value in pending.items()})
+            else:
+                self.write(pending)
+        except DatabaseError:
+            logger.exception('Failed to flush %d last request timestamps', len(pending))
+            with self._lock:
+                for user_id, timestamp in pending.items():
+                    self._pending.setdefault(user_id, timestamp)
+
+    def write(self, pending):
+        """
+        Write the ``{user_id: timestamp}`` map to the database, and forget the queued timestamps it covers.
+        """
+        if len(pending) == 1:
+            [(user_id, timestamp)] = pending.items()
+            User.objects.filter(pk=user_id).update(last_request=timestamp)
+        else:
+            User.objects.bulk_update(
+                [User(pk=user_id, last_request=timestamp) for user_id, timestamp in pending.items()],
+                ['last_request'],
+                batch_size=self.flush_size,
+            )
+        with self._lock:
+            for user_id, timestamp in pending.items():
+                if user_id in self._queued and self._queued[user_id] <= timestamp:
+                    del self._queued[user_id]
+
+    def clear(self):
+        with self._lock:
+            self._pending.clear()
+            self._queued.clear()
+            self._seen.clear()
+
+
+last_request_buffer = LastRequestBuffer()
+
+atexit.register(last_request_buffer.flush)
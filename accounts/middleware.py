@@ -1,15 +1,43 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.utils.functional import empty
 from django.utils.timezone import now
-from django.contrib.auth import get_user_model
-from django.utils.deprecation import MiddlewareMixin
 
-User = get_user_model()
+from .buffers import last_request_buffer
 
 
-class SaveLastRequestMiddleware(MiddlewareMixin):
+class SaveLastRequestMiddleware:
     """
     Middleware for saving datetime of last user request.
+    Writes are coalesced by :class:`accounts.buffers.LastRequestBuffer`. Buffered writes are made by a background
+    task, while unbuffered ones are a single update, cheaper than storing a task.
+
+    Under ASGI the middleware runs on the event loop, and only leaves it when
+    the user has to be loaded from the session or pending timestamps are written.
     """
-    def process_response(self, request, response):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        response = self.get_response(request)
         if request.user.is_authenticated:
-            User.objects.filter(pk=request.user.pk).update(last_request=now())
+            last_request_buffer.touch(request.user.pk, now(), defer=last_request_buffer.buffered)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user = request.user
+        if getattr(user, '_wrapped', None) is empty:
+            # The user of session authentication is loaded lazily, which queries the database.
+            await sync_to_async(user._setup)()
+        if user.is_authenticated and last_request_buffer.record(user.pk, now()):
+            await sync_to_async(last_request_buffer.flush)(defer=last_request_buffer.buffered)
         return response
@@ -1,9 +1,57 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import AbstractUser
 
+from .signals import followed, unfollowed
+
 
 class User(AbstractUser):
     last_request = models.DateTimeField(blank=True, null=True)
+    followers_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         ordering = ['-date_joined']
+
+
+class FollowManager(models.Manager):
+
+    def follow(self, follower_id, followee_id):
+        """
+        Make the follower follow the followee, return whether a new follow was stored.
+        """
+        with transaction.atomic(using=self.db):
+            _, created = self.get_or_create(follower_id=follower_id, followee_id=followee_id)
+            if created:
+                User.objects.using(self.db).filter(pk=followee_id).update(followers_count=F('followers_count') + 1)
+        if created:
+            followed.send(sender=self.model, follower_id=follower_id, followee_id=followee_id)
+        return created
+
+    def unfollow(self, follower_id, followee_id):
+        """
+        Stop following the followee, return whether a follow was deleted.
+        """
+        with transaction.atomic(using=self.db):
+            deleted, _ = self.filter(follower_id=follower_id, followee_id=followee_id).delete()
+            if deleted:
+                User.objects.using(self.db).filter(pk=followee_id).update(followers_count=F('followers_count') - 1)
+        if deleted:
+            unfollowed.send(sender=self.model, follower_id=follower_id, followee_id=followee_id)
+        return bool(deleted)
+
+
+class Follow(models.Model):
+    """
+    Stores a single follow entry, :model:`accounts.User` follower follows the followee.
+    """
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='following')
+    followee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='followers')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = FollowManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'followee'], name='accounts_follow_unique_follower_followee'),
+        ]
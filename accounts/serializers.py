@@ -1,10 +1,16 @@
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt import serializers as jwt_serializers
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from socialnetwork.serializers import RowHyperlinkedModelSerializer, RowListSerializer, TimedDataMixin
 
 User = get_user_model()
 
 
-class UserSerializer(serializers.HyperlinkedModelSerializer):
+class UserSerializer(RowHyperlinkedModelSerializer):
     class Meta:
         model = User
         fields = ('url', 'id', 'username', 'password', 'email', 'first_name', 'last_name')
@@ -12,20 +18,17 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
         extra_kwargs = {
             'password': {'write_only': True},
         }
+        list_serializer_class = RowListSerializer
 
     def create(self, validated_data):
-        user = User.objects.create(
+        return User.objects.create_user(
             username=validated_data['username'],
+            password=validated_data['password'],
             email=validated_data.get('email', ""),
             first_name=validated_data.get('first_name', ""),
             last_name=validated_data.get('last_name', "")
         )
 
-        user.set_password(validated_data['password'])
-        user.save()
-
-        return user
-
     def get_fields(self):
         fields = super(UserSerializer, self).get_fields()
         request = self.context.get('request', None)
@@ -35,8 +38,48 @@ class UserSerializer(serializers.HyperlinkedModelSerializer):
         return fields
 
 
-class UserActivitySerializer(serializers.ModelSerializer):
+class UserActivitySerializer(TimedDataMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ('id', 'last_login', 'last_request')
         read_only_fields = ('id',)
+
+
+class TokenObtainPairSerializer(jwt_serializers.TokenObtainPairSerializer):
+    """
+    Embeds the user fields needed by :class:`accounts.authentication.ClaimsJWTAuthentication` into the tokens.
+    """
+    claims = ('username', 'is_staff', 'is_active')
+
+    @classmethod
+    def get_token(cls, user):
+        token = super(TokenObtainPairSerializer, cls).get_token(user)
+        set_user_claims(token, user)
+        return token
+
+
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """
+    Issues access tokens with the current user claims instead of the ones copied from the refresh token.
+    """
+
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        user = User.objects.filter(pk=refresh[jwt_settings.USER_ID_CLAIM]).first()
+        if user is None or not user.is_active:
+            raise AuthenticationFailed('User not found or inactive.', code='user_inactive')
+        set_user_claims(refresh, user)
+
+        data = {'access': str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION and hasattr(refresh, 'blacklist'):
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            data['refresh'] = str(refresh)
+        return data
+
+
+def set_user_claims(token, user):
+    for claim in TokenObtainPairSerializer.claims:
+        token[claim] = getattr(user, claim)
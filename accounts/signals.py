@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+# Sent with ``follower_id`` and ``followee_id`` arguments after a follow is stored or deleted.
+followed = Signal()
+unfollowed = Signal()
+
+
+def invalidate_cached_user(sender, instance, **kwargs):
+    from .authentication import user_cache
+    user_cache.invalidate(instance.pk)
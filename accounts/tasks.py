@@ -0,0 +1,17 @@
+from django.utils.dateparse import parse_datetime
+
+from tasks.queue import task
+from .buffers import last_request_buffer
+
+
+@task(batch_size=100)
+def save_last_requests(payloads):
+    """
+    Write the latest of the ``timestamps`` maps of user ids to request times of the batch.
+    """
+    latest = {}
+    for payload in payloads:
+        for user_id, value in payload['timestamps'].items():
+            timestamp = parse_datetime(value)
+            latest[int(user_id)] = max(timestamp, latest.get(int(user_id), timestamp))
+    last_request_buffer.write(latest)
@@ -0,0 +1,120 @@
+import base64
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.authentication import ClaimsUser, user_cache
+from accounts.tests.test_views import SetUpTestCase
+
+User = get_user_model()
+
+
+@override_settings(BASIC_AUTH_CACHE_TIMEOUT=60)
+class CachedBasicAuthenticationTestCase(TestCase):
+    fixtures = ['user-data.json']
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.check_password = mock.patch('django.contrib.auth.base_user.check_password', wraps=check_password).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def get(self, password='development'):
+        credentials = base64.b64encode('admin:{}'.format(password).encode()).decode()
+        return self.client.get(reverse('user-detail', kwargs={'pk': 1}), HTTP_AUTHORIZATION='Basic ' + credentials)
+
+    def test_success_cached(self):
+        self.assertEqual(self.get().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get().status_code, status.HTTP_200_OK)
+        self.assertEqual(self.check_password.call_count, 1)
+
+    def test_fail_not_cached(self):
+        self.assertEqual(self.get('wrong_password').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get('wrong_password').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.check_password.call_count, 2)
+
+    def test_password_change_invalidates(self):
+        self.get()
+        user = User.objects.get(pk=1)
+        user.set_password('changed_password123')
+        user.save()
+        self.assertEqual(self.get().status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.get('changed_password123').status_code, status.HTTP_200_OK)
+
+    def test_deactivation_invalidates(self):
+        self.get()
+        User.objects.filter(pk=1).update(is_active=False)
+        self.assertEqual(self.get().status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(BASIC_AUTH_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        self.get()
+        self.get()
+        self.assertEqual(self.check_password.call_count, 2)
+
+
+class ClaimsJWTAuthenticationTestCase(SetUpTestCase):
+
+    def setUp(self):
+        super(ClaimsJWTAuthenticationTestCase, self).setUp()
+        user_cache.clear()
+
+    def test_token_claims(self):
+        token = AccessToken(self.obtain_token_pair(self.login_data_admin).data['access'])
+        self.assertEqual(token['username'], 'admin')
+        self.assertTrue(token['is_staff'])
+        self.assertTrue(token['is_active'])
+
+    def test_read_without_user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client_authorized.get(reverse('user-detail', kwargs={'pk': 1}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        user_queries = [query['sql'] for query in queries if 'FROM "accounts_user"' in query['sql']]
+        self.assertEqual(len(user_queries), 1)  # the retrieved user only
+
+    def test_owner_and_admin_permissions(self):
+        response = self.client_authorized.patch(reverse('user-detail', kwargs={'pk': self.user_id}),
+                                                {'first_name': 'A'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client_authorized.patch(reverse('user-detail', kwargs={'pk': 1}), {'first_name': 'A'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client_authorized_admin.patch(reverse('user-detail', kwargs={'pk': self.user_id}),
+                                                      {'first_name': 'B'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    @override_settings(JWT_USER_CACHE_TIMEOUT=60)
+    def test_full_user_cached(self):
+        user = ClaimsUser(AccessToken(self.obtain_token_pair(self.login_data).data['access']))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, '')
+            self.assertEqual(user.user, user_cache.get(self.user_id))
+
+        user.user.save()
+        with self.assertNumQueries(1):
+            user.email
+
+    def test_refresh_updates_claims(self):
+        refresh = self.obtain_token_pair(self.login_data).data['refresh']
+        User.objects.filter(pk=self.user_id).update(is_staff=True)
+        response = self.client.post(reverse('token_refresh'), {'refresh': refresh})
+        self.assertTrue(AccessToken(response.data['access'])['is_staff'])
+
+        User.objects.filter(pk=self.user_id).update(is_active=False)
+        response = self.client.post(reverse('token_refresh'), {'refresh': refresh})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_inactive_claim_rejected(self):
+        token = AccessToken(self.obtain_token_pair(self.login_data).data['access'])
+        token['is_active'] = False
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer {}'.format(token))
+        response = self.client.get(reverse('user-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,80 @@
+import time
+from datetime import datetime, timedelta
+from unittest import mock
+import pytz
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from accounts.buffers import last_request_buffer
+from accounts.tests.test_views import SetUpTestCase
+
+User = get_user_model()
+
+
+class LastRequestBufferTestCase(SetUpTestCase):
+
+    def setUp(self):
+        super(LastRequestBufferTestCase, self).setUp()
+        last_request_buffer.clear()
+        self.timestamp = datetime(2021, 6, 1, 12, 0, 0, tzinfo=pytz.UTC)
+
+    def tearDown(self):
+        last_request_buffer.clear()
+
+    def get_last_request(self):
+        return User.objects.get(pk=self.user_id).last_request
+
+    @override_settings(LAST_REQUEST_BUFFERED=0, LAST_REQUEST_GRANULARITY=60)
+    def test_unbuffered_write_skipped_within_granularity(self):
+        last_request_buffer.touch(self.user_id, self.timestamp)
+        self.assertEqual(self.get_last_request(), self.timestamp)
+
+        last_request_buffer.touch(self.user_id, self.timestamp + timedelta(seconds=30))
+        self.assertEqual(self.get_last_request(), self.timestamp)
+
+        later = self.timestamp + timedelta(seconds=90)
+        last_request_buffer.touch(self.user_id, later)
+        self.assertEqual(self.get_last_request(), later)
+
+    @override_settings(LAST_REQUEST_BUFFERED=1, LAST_REQUEST_GRANULARITY=0,
+                       LAST_REQUEST_FLUSH_INTERVAL=3600, LAST_REQUEST_FLUSH_SIZE=2)
+    def test_buffered_flush_on_size(self):
+        admin_id = User.objects.get(username=self.login_data_admin['username']).id
+        last_request_buffer.touch(self.user_id, self.timestamp)
+        self.assertNotEqual(self.get_last_request(), self.timestamp)
+        self.assertEqual(last_request_buffer.get(self.user_id), self.timestamp)
+
+        last_request_buffer.touch(admin_id, self.timestamp)
+        self.assertEqual(self.get_last_request(), self.timestamp)
+        self.assertEqual(User.objects.get(pk=admin_id).last_request, self.timestamp)
+        self.assertIsNone(last_request_buffer.get(self.user_id))
+
+    @override_settings(LAST_REQUEST_BUFFERED=1, LAST_REQUEST_GRANULARITY=0,
+                       LAST_REQUEST_FLUSH_INTERVAL=60, LAST_REQUEST_FLUSH_SIZE=100)
+    def test_buffered_flush_without_requests(self):
+        last_request_buffer.touch(self.user_id, self.timestamp)
+        self.assertTrue(last_request_buffer._thread.is_alive())
+        last_request_buffer.flush_due()
+        self.assertNotEqual(self.get_last_request(), self.timestamp)
+
+        with mock.patch('accounts.buffers.time.monotonic', return_value=time.monotonic() + 60):
+            last_request_buffer.flush_due()
+        self.assertEqual(self.get_last_request(), self.timestamp)
+        self.assertIsNone(last_request_buffer.get(self.user_id))
+
+    @override_settings(LAST_REQUEST_BUFFERED=1, LAST_REQUEST_GRANULARITY=0,
+                       LAST_REQUEST_FLUSH_INTERVAL=3600, LAST_REQUEST_FLUSH_SIZE=100)
+    def test_activity_view_returns_pending_value(self):
+        last_request_buffer.touch(self.user_id, self.timestamp)
+        response = self.client_authorized_admin.get('/api/users/{}/activity/'.format(self.user_id))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['last_request'], self.timestamp.isoformat().replace('+00:00', 'Z'))
+
+    @override_settings(LAST_REQUEST_BUFFERED=0, LAST_REQUEST_GRANULARITY=60)
+    def test_middleware_records_authenticated_request(self):
+        response = self.client_authorized.get(reverse('user-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertGreater(self.get_last_request(), self.timestamp)
@@ -1,3 +1,4 @@
+from django.core.cache import cache
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
@@ -73,6 +74,7 @@ class SetUpTestCase(TestCase):
         return response
 
     def setUp(self):
+        cache.clear()
         self.client = APIClient()
         self.client_authorized_admin = APIClient()
         self.client_authorized = APIClient()
@@ -107,6 +109,23 @@ class UsersTestCase(SetUpTestCase):
         serializer = UserSerializer(users, many=True, context={'request': factory.get(reverse('user-list'))})
         self.assertEqual(response.data.get('results'), serializer.data)
 
+    def test_get_all_users_fresh_after_signup(self):
+        self.client_authorized.get(reverse('user-list'), format='json')
+        self.client.post(reverse('user-list'), {'username': 'new_user', 'password': 'test_password123'}, format='json')
+        response = self.client_authorized.get(reverse('user-list'), format='json')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertIn('new_user', [user['username'] for user in response.data['results']])
+
+    def test_get_all_users_not_modified(self):
+        etag = self.client_authorized.get(reverse('user-list'))['ETag']
+        response = self.client_authorized.get(reverse('user-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client_authorized.patch(reverse('user-detail', kwargs={'pk': self.user_id}), {'first_name': 'Newname'})
+        response = self.client_authorized.get(reverse('user-list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
     def test_get_one_user_fail_unauthorized(self):
         response = self.client.get(reverse('user-detail', kwargs={'pk': User.objects.all().first().id}))
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -9,4 +9,5 @@ urlpatterns = [
     path('', include(router.urls)),
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework')),
     path('users/<int:pk>/activity/', views.UserActivityView.as_view()),
+    path('users/<int:pk>/follow/', views.FollowView.as_view(), name='user-follow'),
 ]
@@ -1,15 +1,24 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
 from rest_framework import (
     viewsets,
     permissions,
     generics,
+    views,
 )
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework_simplejwt import views as jwt_views
 
+from socialnetwork.cache import bump_generation, conditional, versioned_cache
+from socialnetwork.pagination import ApproximateCountPagination
+from .buffers import last_request_buffer
+from .models import Follow
 from .serializers import (
     UserSerializer,
     UserActivitySerializer,
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
 )
 
 User = get_user_model()
@@ -29,23 +38,47 @@ class IsOwnerOrAdminPermission(permissions.IsAuthenticated):
 
     def has_object_permission(self, request, view, obj):
         if (request.user and request.user.is_staff) or \
-                (request.user and request.user.is_authenticated and request.user == obj):
+                (request.user and request.user.is_authenticated and request.user.pk == obj.pk):
             return True
         return request.method in permissions.SAFE_METHODS
 
 
+def get_users(view):
+    return User.objects.all()
+
+
 class UserViewSet(viewsets.ModelViewSet):
     """
     API endpoint that allows users to be viewed or edited.
     """
     queryset = User.objects.all()
     serializer_class = UserSerializer
+    pagination_class = ApproximateCountPagination
     permission_classes = [IsOwnerOrAdminPermission]
 
-    @method_decorator(cache_page(60 * 60 * 2))
+    def get_queryset(self):
+        queryset = super(UserViewSet, self).get_queryset()
+        if self.action == 'list':
+            queryset = self.get_serializer().get_row_queryset(queryset)
+        return queryset
+
+    @conditional(get_users, namespace='users')
+    @versioned_cache('users', settings.USER_LIST_CACHE_TIMEOUT, get_rows=get_users, count=False)
     def list(self, *args, **kwargs):
         return super(UserViewSet, self).list(*args, **kwargs)
 
+    def perform_create(self, serializer):
+        super(UserViewSet, self).perform_create(serializer)
+        bump_generation('users')
+
+    def perform_update(self, serializer):
+        super(UserViewSet, self).perform_update(serializer)
+        bump_generation('users')
+
+    def perform_destroy(self, instance):
+        super(UserViewSet, self).perform_destroy(instance)
+        bump_generation('users', 'posts')
+
 
 class UserActivityView(generics.RetrieveAPIView):
     """
@@ -59,3 +92,53 @@ class UserActivityView(generics.RetrieveAPIView):
     def get_queryset(self):
         queryset = User.objects.filter(pk=self.kwargs.get('pk')).values('last_login', 'last_request')
         return queryset
+
+    def get_object(self):
+        obj = super(UserActivityView, self).get_object()
+        pending = last_request_buffer.get(self.kwargs.get('pk'))
+        if pending and (obj['last_request'] is None or pending > obj['last_request']):
+            obj['last_request'] = pending
+        return obj
+
+
+class FollowView(views.APIView):
+    """
+    API endpoint that allows following or unfollowing users.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_followee_id(self, request, pk):
+        if pk == request.user.pk:
+            raise ValidationError('Users can not follow themselves.')
+        if not User.objects.filter(pk=pk).exists():
+            raise NotFound()
+        return pk
+
+    def get(self, request, pk):
+        if Follow.objects.filter(follower_id=request.user.pk, followee_id=self.get_followee_id(request, pk)).exists():
+            return Response('Following')
+        return Response('Not following')
+
+    def post(self, request, pk):
+        Follow.objects.follow(request.user.pk, self.get_followee_id(request, pk))
+        return Response("OK")
+
+    def delete(self, request, pk):
+        Follow.objects.unfollow(request.user.pk, self.get_followee_id(request, pk))
+        return Response("OK")
+
+
+class TokenObtainPairView(jwt_views.TokenObtainPairView):
+    """
+    Takes a set of user credentials and returns an access and refresh JSON web
+    token pair to prove the authentication of those credentials.
+    """
+    serializer_class = TokenObtainPairSerializer
+
+
+class TokenRefreshView(jwt_views.TokenRefreshView):
+    """
+    Takes a refresh type JSON web token and returns an access type JSON web
+    token if the refresh token is valid.
+    """
+    serializer_class = TokenRefreshSerializer
@@ -0,0 +1,132 @@
+"""
+Async versions of the busiest blog endpoints, served under ``api/async/``.
+
+They authenticate with JWT only, whose users are built from the token claims without queries,
+and render responses on the event loop. Database work of a request, which the ORM can only do
+synchronously, runs in a single hop to a worker thread, so one ASGI worker process keeps serving
+other connections while it waits. Responses are the same as the ones of the synchronous endpoints.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.db import close_old_connections
+from django.http import Http404, HttpResponse
+from rest_framework.exceptions import APIException, MethodNotAllowed, NotAuthenticated, NotFound
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.views import exception_handler
+
+from accounts.authentication import ClaimsJWTAuthentication
+from .models import get_like_manager
+from .views import LikeAnalyticsView, PostViewSet
+
+
+def run_in_thread(func):
+    """
+    Wrap a function using the database to be awaited from async code.
+
+    Unless ``ASYNC_DATABASE_THREAD_SENSITIVE`` is set, calls run in a pool of threads
+    instead of one shared thread, and release their connections like requests do.
+    """
+    if getattr(settings, 'ASYNC_DATABASE_THREAD_SENSITIVE', True):
+        return sync_to_async(func)
+
+    @wraps(func)
+    def call(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False)
+
+
+async def authenticate(request):
+    authentication = ClaimsJWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header is not None else None
+    if raw_token is None:
+        raise NotAuthenticated()
+    token = authentication.get_validated_token(raw_token)
+    if 'username' in token:
+        return authentication.get_user(token)
+    return await run_in_thread(authentication.get_user)(token)
+
+
+def render(data, status=200, headers=None):
+    response = HttpResponse(JSONRenderer().render(data), status=status, content_type='application/json')
+    for name, value in (headers or {}).items():
+        if name.lower() != 'content-type':
+            response[name] = value
+    return response
+
+
+def api_view(*methods):
+    """
+    Turn an async function returning response data into an authenticated API view allowing the given methods.
+    The function may also return a DRF response, whose data and headers are rendered.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            try:
+                if request.method not in methods:
+                    raise MethodNotAllowed(request.method)
+                request.user = await authenticate(request)
+                result = await view(request, *args, **kwargs)
+            except (APIException, Http404, PermissionDenied) as exc:
+                response = exception_handler(exc, {'request': request})
+                headers = dict(response.items())
+                if response.status_code == 401:
+                    headers['WWW-Authenticate'] = ClaimsJWTAuthentication().authenticate_header(request)
+                return render(response.data, response.status_code, headers)
+            if hasattr(result, 'data'):
+                return render(result.data, result.status_code, dict(result.items()))
+            return render(result)
+
+        # Requests are authenticated with tokens, not cookies.
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+def call_view(view_class, request, handler, **kwargs):
+    """
+    Call a handler of a DRF view for the request, skipping authentication which is already done.
+    """
+    request = Request(request)
+    request.user = request._request.user
+    view = view_class(request=request, args=(), kwargs=kwargs, format_kwarg=None, action=handler)
+    view.check_permissions(request)
+    return getattr(view, handler)(request, **kwargs)
+
+
+@api_view('GET')
+async def post_list(request):
+    return await run_in_thread(call_view)(PostViewSet, request, 'list')
+
+
+@api_view('GET')
+async def post_detail(request, pk):
+    return await run_in_thread(call_view)(PostViewSet, request, 'retrieve', pk=pk)
+
+
+@api_view('GET', 'POST', 'DELETE')
+async def like(request, post_id):
+    if request.method == 'GET':
+        liked = await run_in_thread(get_like_manager().is_liked)(request.user.pk, post_id)
+        if liked is None:
+            raise NotFound()
+        return 'Liked' if liked else 'Not liked'
+
+    likes = get_like_manager()
+    toggle = likes.add if request.method == 'POST' else likes.remove
+    if await run_in_thread(toggle)(request.user.pk, post_id) is None:
+        raise NotFound()
+    return 'OK'
+
+
+@api_view('GET')
+async def like_analytics(request, user_id):
+    return await run_in_thread(call_view)(LikeAnalyticsView, request, 'list', user_id=user_id)
@@ -0,0 +1,78 @@
+"""
+Streaming export of the posts and likes of a user as newline-delimited JSON.
+
+Posts come first, then likes, both ordered by id. Every line carries a ``cursor``,
+which can be passed back to resume the export after that line.
+"""
+import json
+import zlib
+
+from rest_framework.fields import DateTimeField
+
+from .models import Like, Post
+
+SECTIONS = ('posts', 'likes')
+
+
+def parse_cursor(cursor):
+    """
+    Return the section and the last exported id of a cursor like ``posts:42``.
+    Raise ``ValueError`` for invalid cursors.
+    """
+    section, _, last_id = cursor.partition(':')
+    if section not in SECTIONS:
+        raise ValueError(cursor)
+    return section, int(last_id)
+
+
+def export_rows(user_id, cursor=None, chunk_size=2000):
+    """
+    Yield the rows of the export following the cursor.
+    """
+    section, last_id = parse_cursor(cursor) if cursor else (SECTIONS[0], 0)
+    timestamp = DateTimeField().to_representation
+
+    if section == 'posts':
+        posts = Post.objects.filter(author_id=user_id, id__gt=last_id).order_by('id')
+        for post in posts.values('id', 'text', 'created_at', 'like_count').iterator(chunk_size=chunk_size):
+            post['created_at'] = timestamp(post['created_at'])
+            yield dict(type='post', cursor='posts:{}'.format(post['id']), **post)
+        last_id = 0
+
+    likes = Like.objects.filter(user_id=user_id, id__gt=last_id).order_by('id')
+    for like in likes.values('id', 'post_id', 'created_at').iterator(chunk_size=chunk_size):
+        yield {
+            'type': 'like',
+            'cursor': 'likes:{}'.format(like['id']),
+            'id': like['id'],
+            'post': like['post_id'],
+            'created_at': timestamp(like['created_at']),
+        }
+
+
+def encode_lines(rows, buffer_size=64 * 1024):
+    """
+    Encode rows as JSON lines, joined into chunks of about ``buffer_size`` bytes.
+    """
+    buffer, size = [], 0
+    for row in rows:
+        line = json.dumps(row, ensure_ascii=False, separators=(',', ':')).encode() + b'\n'
+        buffer.append(line)
+        size += len(line)
+        if size >= buffer_size:
+            yield b''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_chunks(chunks):
+    """
+    Compress a stream of chunks into a gzip stream, flushing after every chunk.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,157 @@
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from accounts.serializers import TokenObtainPairSerializer
+from blog.models import DailyLikeCount, Like, Post
+from socialnetwork.benchmark import summarize, wsgi_request
+from socialnetwork.cache import bump_generation
+
+User = get_user_model()
+
+PASSWORD = 'bench_password123'
+
+
+class Command(BaseCommand):
+    help = 'Seeds a synthetic dataset and measures latency, throughput and queries per request of the main ' \
+           'API endpoints, with requests made in-process by concurrent clients. ' \
+           'Benchmark data is deleted afterwards, unless --keep is passed.'
+
+    endpoints = ('posts', 'like', 'analytics', 'activity', 'token')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--posts-per-user', type=int, default=20)
+        parser.add_argument('--likes-per-user', type=int, default=50)
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Exponent of the Zipf distribution of post popularity, 0 for uniform.')
+        parser.add_argument('--endpoints', nargs='+', choices=self.endpoints, default=list(self.endpoints))
+        parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8],
+                            help='Numbers of concurrent clients to compare.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and concurrency.')
+        parser.add_argument('--write-ratio', type=float, default=0.2,
+                            help='Share of like requests which like or unlike instead of checking.')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the random generator.')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark data.')
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        try:
+            self.seed(options)
+            results = [
+                dict(endpoint=endpoint, concurrency=concurrency, **self.measure(endpoint, concurrency, options))
+                for endpoint in options['endpoints'] for concurrency in options['concurrency']
+            ]
+        finally:
+            if not options['keep']:
+                User.objects.filter(username__startswith='bench_api_').delete()
+            bump_generation('users', 'posts')
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def seed(self, options):
+        password = make_password(PASSWORD)
+        User.objects.bulk_create([
+            User(username='bench_api_user_{}'.format(i), password=password, is_staff=i == 0)
+            for i in range(options['users'])
+        ], batch_size=1000)
+        self.users = list(User.objects.filter(username__startswith='bench_api_user_').order_by('pk'))
+        user_ids = [user.pk for user in self.users]
+
+        Post.objects.bulk_create([
+            Post(author_id=user_id, text='Benchmark post {}'.format(i))
+            for i in range(options['posts_per_user']) for user_id in user_ids
+        ], batch_size=1000)
+        posts = Post.objects.filter(author__username__startswith='bench_api_user_')
+        self.post_ids = list(posts.values_list('pk', flat=True))
+        self.random.shuffle(self.post_ids)
+        weights = [1 / (rank + 1) ** options['skew'] for rank in range(len(self.post_ids))]
+        self.cumulative_weights = list(accumulate(weights))
+
+        likes = {
+            (user_id, post_id)
+            for user_id in user_ids
+            for post_id in self.choose_posts(min(options['likes_per_user'], len(self.post_ids)))
+        }
+        Like.objects.bulk_create([Like(user_id=user_id, post_id=post_id) for user_id, post_id in likes],
+                                 batch_size=1000, ignore_conflicts=True)
+        posts.rebuild_like_counts()
+        DailyLikeCount.objects.rebuild(user_ids)
+        bump_generation('users', 'posts')
+
+        self.tokens = {
+            user.pk: str(TokenObtainPairSerializer.get_token(user).access_token) for user in self.users
+        }
+
+    def choose_posts(self, count):
+        """
+        Choose posts with probabilities following the popularity distribution.
+        """
+        return self.random.choices(self.post_ids, cum_weights=self.cumulative_weights, k=count)
+
+    def make_request(self, endpoint, options):
+        """
+        Return the method, path, headers and body of a random request to the endpoint.
+        """
+        user = self.random.choice(self.users)
+        headers = {'Authorization': 'Bearer ' + self.tokens[user.pk]}
+        if endpoint == 'posts':
+            return 'GET', '/api/posts/?limit=20&offset={}'.format(self.random.randrange(10) * 20), headers, b''
+        if endpoint == 'like':
+            path = '/api/posts/{}/like/'.format(self.choose_posts(1)[0])
+            if self.random.random() < options['write_ratio']:
+                return self.random.choice(['POST', 'DELETE']), path, headers, b''
+            return 'GET', path, headers, b''
+        if endpoint == 'analytics':
+            return 'GET', '/api/users/{}/analytics/'.format(user.pk), headers, b''
+        if endpoint == 'activity':
+            headers = {'Authorization': 'Bearer ' + self.tokens[self.users[0].pk]}
+            return 'GET', '/api/users/{}/activity/'.format(user.pk), headers, b''
+        body = json.dumps({'username': user.username, 'password': PASSWORD}).encode()
+        return 'POST', '/api/token/', {}, body
+
+    def measure(self, endpoint, concurrency, options):
+        handler = WSGIHandler()
+        requests = [self.make_request(endpoint, options) for _ in range(options['requests'])]
+        lock = threading.Lock()
+        latencies, queries, errors = [], [], []
+
+        def call(request):
+            method, path, headers, body = request
+            executed = []
+
+            def count_query(execute, sql, params, many, context):
+                executed.append(sql)
+                return execute(sql, params, many, context)
+
+            start = time.perf_counter()
+            with connection.execute_wrapper(count_query):
+                status, _ = wsgi_request(handler, method, path, headers, body)
+            latency = time.perf_counter() - start
+            with lock:
+                latencies.append(latency)
+                queries.append(len(executed))
+                if status >= 400:
+                    errors.append(status)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(call, requests))
+        elapsed = time.perf_counter() - start
+
+        return dict(
+            requests=len(requests),
+            errors=len(errors),
+            requests_per_second=round(len(requests) / elapsed, 1),
+            queries_per_request=round(sum(queries) / len(queries), 2),
+            max_queries=max(queries),
+            **summarize(latencies)
+        )
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+
+from accounts.serializers import TokenObtainPairSerializer
+from blog.models import Like, Post
+from socialnetwork.benchmark import summarize, wsgi_request
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Compares latency and throughput of the synchronous endpoints served by a WSGI handler with a pool ' \
+           'of threads and of the api/async/ endpoints served by an ASGI handler on one event loop, ' \
+           'with clients which take a while to read responses. Benchmark data is deleted afterwards.'
+
+    endpoints = {
+        'like': '/api{}posts/{post_id}/like/',
+        'post-detail': '/api{}posts/{post_id}/',
+        'post-list': '/api{}posts/?limit=20',
+        'analytics': '/api{}users/{user_id}/analytics/',
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--endpoints', nargs='+', choices=list(self.endpoints), default=list(self.endpoints))
+        parser.add_argument('--concurrency', nargs='+', type=int, default=[10, 100],
+                            help='Numbers of requests in flight to compare.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and concurrency.')
+        parser.add_argument('--threads', type=int, default=8, help='Threads of the WSGI handler.')
+        parser.add_argument('--client-delay', type=float, default=0.05,
+                            help='Seconds a client takes to read a response.')
+
+    def handle(self, *args, **options):
+        user = self.seed()
+        try:
+            token = str(TokenObtainPairSerializer.get_token(user).access_token)
+            post_id = Post.objects.filter(author=user).values_list('pk', flat=True).first()
+            results = []
+            for name in options['endpoints']:
+                for concurrency in options['concurrency']:
+                    for server in ('wsgi', 'asgi'):
+                        path = self.endpoints[name].format('/' if server == 'wsgi' else '/async/',
+                                                           post_id=post_id, user_id=user.pk)
+                        measure = self.measure_wsgi if server == 'wsgi' else self.measure_asgi
+                        results.append(dict(endpoint=name, server=server, concurrency=concurrency,
+                                            **measure(path, token, concurrency, options)))
+        finally:
+            User.objects.filter(username__startswith='bench_async_').delete()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def seed(self):
+        user = User.objects.create(username='bench_async_user', password='!')
+        Post.objects.bulk_create([Post(author=user, text='Benchmark post {}'.format(i)) for i in range(100)])
+        Like.objects.add_many(user.pk, Post.objects.filter(author=user).values_list('pk', flat=True)[:50])
+        return user
+
+    def measure_wsgi(self, path, token, concurrency, options):
+        handler = WSGIHandler()
+
+        def call(start):
+            status, _ = wsgi_request(handler, 'GET', path, {'Authorization': 'Bearer ' + token})
+            time.sleep(options['client_delay'])
+            return time.perf_counter() - start, status == 200
+
+        with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+            return self.run_batches(lambda count: list(executor.map(call, [time.perf_counter()] * count)),
+                                    concurrency, options['requests'])
+
+    def measure_asgi(self, path, token, concurrency, options):
+        handler = ASGIHandler()
+        url = urlsplit(path)
+        host = settings.ALLOWED_HOSTS[0].encode()
+
+        async def call(start):
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': url.path,
+                'query_string': url.query.encode(),
+                'headers': [(b'host', host), (b'authorization', 'Bearer {}'.format(token).encode())],
+                'server': (settings.ALLOWED_HOSTS[0], 80),
+            }
+            statuses = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                elif not message.get('more_body'):
+                    await asyncio.sleep(options['client_delay'])
+
+            await handler(scope, receive, send)
+            return time.perf_counter() - start, statuses[0] == 200
+
+        async def batch(count):
+            start = time.perf_counter()
+            return await asyncio.gather(*(call(start) for _ in range(count)))
+
+        loop = asyncio.new_event_loop()
+        try:
+            return self.run_batches(lambda count: loop.run_until_complete(batch(count)),
+                                    concurrency, options['requests'])
+        finally:
+            loop.close()
+
+    def run_batches(self, run, concurrency, requests):
+        """
+        Send the requests in batches of ``concurrency`` requests at once.
+        Latencies are measured from the start of the batch, so they include waiting for a free thread.
+        """
+        latencies, errors = [], 0
+        start = time.perf_counter()
+        for sent in range(0, requests, concurrency):
+            for latency, ok in run(min(concurrency, requests - sent)):
+                latencies.append(latency)
+                errors += not ok
+        elapsed = time.perf_counter() - start
+        return dict(errors=errors, requests_per_second=round(requests / elapsed, 1), **summarize(latencies))
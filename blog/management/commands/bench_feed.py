@@ -0,0 +1,68 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import Follow
+from blog import timeline
+from blog.models import Post
+from blog.views import FeedView
+from socialnetwork.benchmark import rollback, summarize
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Measures home timeline read latency for users following different numbers of authors. ' \
+           'Benchmark data is created in a transaction which is rolled back.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--followees', nargs='+', type=int, default=[100, 1000, 3000],
+                            help='Numbers of followed authors to compare.')
+        parser.add_argument('--posts-per-author', type=int, default=5)
+        parser.add_argument('--popular-authors', type=int, default=2,
+                            help='Number of followed authors with more than TIMELINE_FANOUT_LIMIT followers.')
+        parser.add_argument('--repeat', type=int, default=50, help='Timeline reads per measured user.')
+
+    def handle(self, *args, **options):
+        with rollback():
+            readers = self.seed(options)
+            results = [self.measure(reader, followees, options['repeat']) for followees, reader in readers]
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def seed(self, options):
+        User.objects.bulk_create([
+            User(username='bench_feed_author_{}'.format(i), password='!')
+            for i in range(max(options['followees']))
+        ], batch_size=1000)
+        authors = list(User.objects.filter(username__startswith='bench_feed_author_').order_by('pk'))
+        popular = [author.pk for author in authors[:options['popular_authors']]]
+        User.objects.filter(pk__in=popular).update(followers_count=settings.TIMELINE_FANOUT_LIMIT)
+
+        Post.objects.bulk_create([
+            Post(author_id=author.pk, text='Benchmark post {}'.format(i))
+            for i in range(options['posts_per_author']) for author in authors
+        ], batch_size=1000)
+
+        readers = []
+        for followees in options['followees']:
+            reader = User.objects.create(username='bench_feed_reader_{}'.format(followees), password='!')
+            Follow.objects.bulk_create([Follow(follower=reader, followee=author) for author in authors[:followees]])
+            readers.append((followees, reader))
+        timeline.fan_out(list(Post.objects.filter(author__in=authors)))
+        return readers
+
+    def measure(self, reader, followees, repeat):
+        factory = APIRequestFactory(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        view = FeedView.as_view()
+        latencies = []
+        for _ in range(repeat):
+            request = factory.get('/api/feed/')
+            force_authenticate(request, user=reader)
+            start = time.perf_counter()
+            view(request).render()
+            latencies.append(time.perf_counter() - start)
+        return dict(followees=followees, **summarize(latencies))
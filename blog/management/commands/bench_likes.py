@@ -0,0 +1,107 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from accounts.serializers import TokenObtainPairSerializer
+from blog.models import Like, LikeEvent, Post
+from socialnetwork.benchmark import summarize, wsgi_request
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Measures sustained likes per second of a single post, with concurrent clients liking and unliking it ' \
+           'in-process, for likes written directly and appended to the event log. For the event log the time of ' \
+           'applying the events is measured as well. Benchmark data is deleted afterwards, unless --keep is passed.'
+
+    modes = ('direct', 'log')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=500)
+        parser.add_argument('--modes', nargs='+', choices=self.modes, default=list(self.modes))
+        parser.add_argument('--concurrency', nargs='+', type=int, default=[1, 8],
+                            help='Numbers of concurrent clients to compare.')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per mode and concurrency.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Events applied per transaction.')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark data.')
+
+    def handle(self, *args, **options):
+        try:
+            self.seed(options)
+            results = [
+                dict(mode=mode, concurrency=concurrency, **self.measure(mode, concurrency, options))
+                for mode in options['modes'] for concurrency in options['concurrency']
+            ]
+        finally:
+            if not options['keep']:
+                User.objects.filter(username__startswith='bench_likes_user_').delete()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def seed(self, options):
+        User.objects.bulk_create([
+            User(username='bench_likes_user_{}'.format(i), password='!') for i in range(options['users'])
+        ], batch_size=1000)
+        self.users = list(User.objects.filter(username__startswith='bench_likes_user_').order_by('pk'))
+        self.post = Post.objects.create(author=self.users[0], text='Benchmark post')
+        self.tokens = [str(TokenObtainPairSerializer.get_token(user).access_token) for user in self.users]
+
+    def make_requests(self, count):
+        """
+        Return requests of users taking turns, each liking the post and then unliking it on the next turn.
+        """
+        path = '/api/posts/{}/like/'.format(self.post.pk)
+        return [
+            ('DELETE' if i // len(self.users) % 2 else 'POST', path,
+             {'Authorization': 'Bearer ' + self.tokens[i % len(self.users)]})
+            for i in range(count)
+        ]
+
+    def measure(self, mode, concurrency, options):
+        Like.objects.filter(post=self.post).delete()
+        LikeEvent.objects.filter(post=self.post).delete()
+        Post.objects.filter(pk=self.post.pk).update(like_count=0)
+
+        handler = WSGIHandler()
+        requests = self.make_requests(options['requests'])
+        lock = threading.Lock()
+        latencies, errors = [], []
+
+        def call(request):
+            method, path, headers = request
+            start = time.perf_counter()
+            status, _ = wsgi_request(handler, method, path, headers)
+            latency = time.perf_counter() - start
+            with lock:
+                latencies.append(latency)
+                if status >= 400:
+                    errors.append(status)
+
+        with override_settings(LIKE_INGESTION=mode):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                list(executor.map(call, requests))
+            elapsed = time.perf_counter() - start
+
+        result = dict(
+            requests=len(requests),
+            errors=len(errors),
+            likes_per_second=round(len(requests) / elapsed, 1),
+            **summarize(latencies)
+        )
+        if mode == 'log':
+            events = LikeEvent.objects.filter(post=self.post).count()
+            start = time.perf_counter()
+            while LikeEvent.objects.compact(options['batch_size']):
+                pass
+            elapsed = time.perf_counter() - start
+            result.update(events=events, applied_events_per_second=round(events / elapsed, 1) if elapsed else None)
+        result['like_count_consistent'] = (
+            Post.objects.get(pk=self.post.pk).like_count == Like.objects.filter(post=self.post).count()
+        )
+        return result
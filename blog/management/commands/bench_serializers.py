@@ -0,0 +1,71 @@
+import json
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework import serializers
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.serializers import UserSerializer
+from blog.models import Post
+from blog.serializers import PostSerializer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Measures the cost per row of serializing lists of posts and users with the hyperlinked model ' \
+           'serializers of DRF and with the row serializers, from model instances and from values() rows. ' \
+           'Lists of post instances are assembled from fragments cached after the first run. ' \
+           'Rows are built in memory, the database is not used.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=settings.REST_FRAMEWORK['PAGE_SIZE'],
+                            help='Rows per serialized list.')
+        parser.add_argument('--repeat', type=int, default=200, help='Lists serialized per measurement.')
+        parser.add_argument('--fields', default='', help='Sparse fieldset to measure as well, e.g. "id,text".')
+
+    def handle(self, *args, **options):
+        factory = APIRequestFactory(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        rows = options['rows']
+        posts = [Post(id=i, author_id=i % 50 + 1, text='Benchmark post {}'.format(i), like_count=i % 7)
+                 for i in range(1, rows + 1)]
+        users = [User(id=i, username='bench_user_{}'.format(i), email='user{}@example.com'.format(i),
+                      first_name='First', last_name='Last') for i in range(1, rows + 1)]
+
+        results = []
+        for serializer_class, instances, path in ((PostSerializer, posts, '/api/posts/'),
+                                                  (UserSerializer, users, '/api/users/')):
+            for fields in [''] + ([options['fields']] if options['fields'] else []):
+                request = Request(factory.get(path, {'fields': fields} if fields else {}))
+                context = {'request': request}
+                columns = [column for _, column, _ in serializer_class(context=context).get_row_fields()]
+                values = [{column: getattr(instance, column) for column in columns} for instance in instances]
+                cases = {
+                    'hyperlinked': lambda: serializers.ListSerializer(
+                        instances, child=serializer_class(), context=context).data,
+                    'row_instances': lambda: serializer_class(instances, many=True, context=context).data,
+                    'row_values': lambda: serializer_class(values, many=True, context=context).data,
+                }
+                for name, serialize in cases.items():
+                    results.append(dict(
+                        serializer=serializer_class.__name__,
+                        fields=fields or 'all',
+                        path=name,
+                        us_per_row=round(self.measure(serialize, options['repeat']) / rows * 1e6, 3),
+                    ))
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def measure(serialize, repeat):
+        """
+        Return the shortest time of serializing the list, taken over ``repeat`` runs.
+        """
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            serialize()
+            best = min(best, time.perf_counter() - start)
+        return best
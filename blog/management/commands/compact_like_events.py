@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.models import LikeEvent
+
+
+class Command(BaseCommand):
+    help = 'Applies pending like events of the event log (LIKE_INGESTION=log) to the stored likes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Events applied per transaction.')
+        parser.add_argument('--loop', action='store_true', help='Keep applying new events until interrupted.')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait for new events when the log is empty, with --loop.')
+
+    def handle(self, *args, **options):
+        applied = 0
+        try:
+            while True:
+                compacted = LikeEvent.objects.compact(options['batch_size'])
+                applied += compacted
+                if compacted:
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Applied {} like events.'.format(applied)))
@@ -0,0 +1,206 @@
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from blog.models import DailyLikeCount, Like, Post, TrendingBucket
+from socialnetwork.cache import bump_generation
+
+User = get_user_model()
+
+
+def read_rows(path, format=None):
+    """
+    Yield rows of a JSON Lines or CSV file (``-`` for the standard input) as dicts.
+    """
+    format = format or ('csv' if path.lower().endswith('.csv') else 'jsonl')
+    file = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+    try:
+        if format == 'csv':
+            yield from csv.DictReader(file)
+        else:
+            for number, line in enumerate(file, 1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as exc:
+                        raise CommandError('{}:{}: {}'.format(path, number, exc))
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def chunks(rows, size):
+    rows = iter(rows)
+    return iter(lambda: list(islice(rows, size)), [])
+
+
+def parse_timestamp(value, default):
+    if not value:
+        return default
+    timestamp = parse_datetime(value)
+    if timestamp is None:
+        raise CommandError('Invalid timestamp: {}'.format(value))
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    return timestamp
+
+
+class Command(BaseCommand):
+    help = 'Imports users, posts and likes from JSON Lines or CSV files, in batches of bulk inserts. ' \
+           'Users have "username", "password" (or an already hashed "password_hash"), "email", "first_name", ' \
+           '"last_name" and "date_joined", posts have "author" (username) or "author_id", "text" and "created_at", ' \
+           'likes have "user" (username) or "user_id", "post_id" and "created_at". Users and posts may have ' \
+           'an "id" to keep. Rows referring to missing users or posts are skipped. ' \
+           'Imported posts are not delivered to home timelines of existing followers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', help='File with users, "-" for the standard input.')
+        parser.add_argument('--posts', help='File with posts.')
+        parser.add_argument('--likes', help='File with likes.')
+        parser.add_argument('--format', choices=['jsonl', 'csv'],
+                            help='Format of the files, detected from the file extension by default.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows inserted in one transaction.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                            help='Processes hashing passwords, 0 to hash them in this process.')
+        parser.add_argument('--ignore-conflicts', action='store_true',
+                            help='Skip users and posts which already exist, e.g. to resume an import.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        if not any(options[name] for name in ('users', 'posts', 'likes')):
+            raise CommandError('Pass at least one of --users, --posts and --likes.')
+        self.options = options
+        self.using = options['database']
+        self.liked_posts, self.liking_users = set(), set()
+
+        if options['users']:
+            workers = options['workers']
+            self.pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup) if workers else None
+            try:
+                self.run('users', User, self.import_users)
+            finally:
+                if self.pool is not None:
+                    self.pool.shutdown()
+        if options['posts']:
+            self.run('posts', Post, self.import_posts)
+        if options['likes']:
+            self.run('likes', Like, self.import_likes)
+        bump_generation('users', 'posts')
+
+    def run(self, name, model, import_batch):
+        """
+        Import the rows of the file in batches. Rows are counted as imported once stored, so rows skipped as
+        conflicts with existing rows count as skipped like rows referring to missing users or posts.
+        """
+        start = time.perf_counter()
+        before = model.objects.using(self.using).count()
+        read = 0
+        for batch in chunks(read_rows(self.options[name], self.options['format']), self.options['batch_size']):
+            with transaction.atomic(using=self.using):
+                import_batch(batch)
+            read += len(batch)
+        imported = model.objects.using(self.using).count() - before
+        skipped = read - imported
+        self.finish(name)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS('Imported {} {} in {:.1f}s ({:.0f} rows/s), skipped {}.'.format(
+            imported, name, elapsed, imported / elapsed if elapsed else 0, skipped)))
+
+    def import_users(self, rows):
+        passwords = [row.get('password') or None for row in rows if not row.get('password_hash')]
+        if self.pool is None:
+            hashes = iter([make_password(password) for password in passwords])
+        else:
+            chunksize = max(1, len(passwords) // (self.options['workers'] * 4))
+            hashes = self.pool.map(make_password, passwords, chunksize=chunksize)
+
+        now = timezone.now()
+        users = [
+            User(
+                id=row.get('id') or None,
+                username=row['username'],
+                password=row.get('password_hash') or next(hashes),
+                email=row.get('email') or '',
+                first_name=row.get('first_name') or '',
+                last_name=row.get('last_name') or '',
+                date_joined=parse_timestamp(row.get('date_joined'), now),
+            )
+            for row in rows
+        ]
+        User.objects.using(self.using).bulk_create(users, ignore_conflicts=self.options['ignore_conflicts'])
+
+    def import_posts(self, rows):
+        now = timezone.now()
+        posts = [
+            Post(id=row.get('id') or None, author_id=author_id, text=row['text'],
+                 created_at=parse_timestamp(row.get('created_at'), now))
+            for row, author_id in zip(rows, self.get_user_ids(rows, 'author')) if author_id
+        ]
+        Post.objects.using(self.using).bulk_create(posts, ignore_conflicts=self.options['ignore_conflicts'])
+
+    def import_likes(self, rows):
+        post_ids = Post.objects.using(self.using).filter(pk__in={int(row['post_id']) for row in rows})
+        post_ids = set(post_ids.values_list('pk', flat=True))
+        now = timezone.now()
+        likes = [
+            Like(user_id=user_id, post_id=int(row['post_id']), created_at=parse_timestamp(row.get('created_at'), now))
+            for row, user_id in zip(rows, self.get_user_ids(rows, 'user'))
+            if user_id and int(row['post_id']) in post_ids
+        ]
+        Like.objects.using(self.using).bulk_create(likes, ignore_conflicts=True)
+        self.liked_posts.update(like.post_id for like in likes)
+        self.liking_users.update(like.user_id for like in likes)
+
+    def get_user_ids(self, rows, field):
+        """
+        Return ids of existing users the rows refer to by username in ``field`` or by id in ``<field>_id``,
+        ``None`` for missing users.
+        """
+        id_field = field + '_id'
+        usernames = {row[field] for row in rows if row.get(field)}
+        ids = {int(row[id_field]) for row in rows if row.get(id_field)}
+        users = User.objects.using(self.using).filter(Q(username__in=usernames) | Q(pk__in=ids))
+        by_username = dict(users.values_list('username', 'pk'))
+        existing = set(by_username.values())
+        return [
+            int(row[id_field]) if row.get(id_field) and int(row[id_field]) in existing
+            else by_username.get(row.get(field))
+            for row in rows
+        ]
+
+    def finish(self, name):
+        """
+        Bring data derived from the imported rows up to date.
+        """
+        if name == 'users':
+            self.reset_sequence(User)
+        elif name == 'posts':
+            self.reset_sequence(Post)
+        elif name == 'likes':
+            post_ids, user_ids = list(self.liked_posts), list(self.liking_users)
+            size = self.options['batch_size']
+            for start in range(0, len(post_ids), size):
+                Post.objects.using(self.using).filter(pk__in=post_ids[start:start + size]).rebuild_like_counts()
+                TrendingBucket.objects.db_manager(self.using).rebuild(size, post_ids[start:start + size])
+            for start in range(0, len(user_ids), size):
+                DailyLikeCount.objects.db_manager(self.using).rebuild(user_ids[start:start + size])
+
+    def reset_sequence(self, model):
+        connection = connections[self.using]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [model]):
+                cursor.execute(sql)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import DailyLikeCount
+
+
+class Command(BaseCommand):
+    help = 'Recalculates daily like counts used by likes analytics from the stored likes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('user_ids', nargs='*', type=int, help='Rebuild only the users with these ids.')
+
+    def handle(self, *args, **options):
+        stored = DailyLikeCount.objects.rebuild(user_ids=options['user_ids'] or None)
+        self.stdout.write(self.style.SUCCESS('Stored like counts of {} days.'.format(stored)))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Recalculates like counters of posts from the stored likes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('post_ids', nargs='*', type=int, help='Rebuild only the posts with these ids.')
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options['post_ids']:
+            posts = posts.filter(id__in=options['post_ids'])
+        updated = posts.rebuild_like_counts()
+        self.stdout.write(self.style.SUCCESS('Rebuilt like counts of {} posts.'.format(updated)))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from blog import search
+
+
+class Command(BaseCommand):
+    help = 'Creates the full-text search index of posts if it is missing and fills it from the posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        search.install(options['database'], rebuild=True)
+        self.stdout.write(self.style.SUCCESS('Rebuilt the search index.'))
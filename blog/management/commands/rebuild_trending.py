@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import TrendingBucket
+
+
+class Command(BaseCommand):
+    help = 'Recalculates like counts in time buckets used by the trending posts leaderboard from the stored likes.'
+
+    def handle(self, *args, **options):
+        stored = TrendingBucket.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS('Stored {} trending buckets.'.format(stored)))
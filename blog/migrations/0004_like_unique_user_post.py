@@ -0,0 +1,34 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:07
+
+from django.db import migrations, models
+from django.db.models import Count, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Like = apps.get_model('blog', 'Like')
+    duplicates = Like.objects.values('user', 'post').annotate(first_id=Min('id'), count=Count('id')).filter(count__gt=1)
+    post_ids = set()
+    for duplicate in duplicates:
+        Like.objects.filter(user=duplicate['user'], post=duplicate['post']).exclude(id=duplicate['first_id']).delete()
+        post_ids.add(duplicate['post'])
+
+    if post_ids:
+        likes = Like.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(count=Count('id'))
+        Post.objects.filter(id__in=post_ids).update(like_count=Coalesce(Subquery(likes.values('count')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_post_like_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='like',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='blog_like_unique_user_post'),
+        ),
+    ]
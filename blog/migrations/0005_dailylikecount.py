@@ -0,0 +1,40 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:09
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDay
+import django.db.models.deletion
+
+
+def populate_daily_like_counts(apps, schema_editor):
+    Like = apps.get_model('blog', 'Like')
+    DailyLikeCount = apps.get_model('blog', 'DailyLikeCount')
+    rows = Like.objects.annotate(day=TruncDay('created_at')).order_by().values('user_id', 'day').annotate(
+        count=Count('id'))
+    DailyLikeCount.objects.bulk_create((DailyLikeCount(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('blog', '0004_like_unique_user_post'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLikeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='dailylikecount',
+            constraint=models.UniqueConstraint(fields=('user', 'day'), name='blog_dailylikecount_unique_user_day'),
+        ),
+        migrations.RunPython(populate_daily_like_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailylikecount',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
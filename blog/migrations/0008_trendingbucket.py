@@ -0,0 +1,52 @@
+# Generated by Django 3.2.3 on 2026-10-18 18:55
+
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from django.db import migrations, models
+from django.utils.timezone import now
+import django.db.models.deletion
+
+
+def populate_trending_buckets(apps, schema_editor):
+    Like = apps.get_model('blog', 'Like')
+    TrendingBucket = apps.get_model('blog', 'TrendingBucket')
+    likes = Like.objects.filter(created_at__gte=now() - timedelta(weeks=1, hours=1))
+    likes = likes.values_list('post_id', 'created_at')
+    counts = Counter(
+        (post_id, size, datetime.fromtimestamp(created_at.timestamp() // size * size, tz=timezone.utc))
+        for post_id, created_at in likes.iterator() for size in (5 * 60, 60 * 60)
+    )
+    TrendingBucket.objects.bulk_create((
+        TrendingBucket(post_id=post_id, size=size, start=start, count=count)
+        for (post_id, size, start), count in counts.items()
+    ), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('size', models.PositiveIntegerField()),
+                ('start', models.DateTimeField()),
+                ('count', models.IntegerField(default=0)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='blog.post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='trendingbucket',
+            index=models.Index(fields=['size', 'start'], name='blog_trending_size_start_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='trendingbucket',
+            constraint=models.UniqueConstraint(fields=('post', 'size', 'start'), name='blog_trendingbucket_unique_post_bucket'),
+        ),
+        migrations.RunPython(populate_trending_buckets, migrations.RunPython.noop),
+    ]
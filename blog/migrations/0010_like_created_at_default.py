@@ -0,0 +1,19 @@
+# Generated by Django 3.2.3 on 2026-10-18 19:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_likeevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='like',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
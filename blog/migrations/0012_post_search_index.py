@@ -0,0 +1,46 @@
+from django.db import migrations
+
+import socialnetwork.operations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_post_created_at_default'),
+    ]
+
+    operations = [
+        socialnetwork.operations.RunSQLForVendor(
+            sql={
+                'sqlite': [
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts "
+                    "USING fts5(text, content='blog_post', content_rowid='id')",
+                    "CREATE TRIGGER IF NOT EXISTS blog_post_fts_insert AFTER INSERT ON blog_post BEGIN "
+                    "INSERT INTO blog_post_fts(rowid, text) VALUES (new.id, new.text); END",
+                    "CREATE TRIGGER IF NOT EXISTS blog_post_fts_delete AFTER DELETE ON blog_post BEGIN "
+                    "INSERT INTO blog_post_fts(blog_post_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+                    "CREATE TRIGGER IF NOT EXISTS blog_post_fts_update AFTER UPDATE OF text ON blog_post BEGIN "
+                    "INSERT INTO blog_post_fts(blog_post_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+                    "INSERT INTO blog_post_fts(rowid, text) VALUES (new.id, new.text); END",
+                    "INSERT INTO blog_post_fts(blog_post_fts) VALUES ('rebuild')",
+                ],
+                'postgresql': [
+                    "ALTER TABLE blog_post ADD COLUMN IF NOT EXISTS search_vector tsvector "
+                    "GENERATED ALWAYS AS (to_tsvector('english', text)) STORED",
+                    "CREATE INDEX IF NOT EXISTS blog_post_search_vector_idx ON blog_post USING GIN (search_vector)",
+                ],
+            },
+            reverse_sql={
+                'sqlite': [
+                    "DROP TRIGGER IF EXISTS blog_post_fts_insert",
+                    "DROP TRIGGER IF EXISTS blog_post_fts_delete",
+                    "DROP TRIGGER IF EXISTS blog_post_fts_update",
+                    "DROP TABLE IF EXISTS blog_post_fts",
+                ],
+                'postgresql': [
+                    "DROP INDEX IF EXISTS blog_post_search_vector_idx",
+                    "ALTER TABLE blog_post DROP COLUMN IF EXISTS search_vector",
+                ],
+            },
+        ),
+    ]
@@ -1,16 +1,206 @@
-from django.db import models
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from django.conf import settings
+from django.db import connections, models, transaction, IntegrityError
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDay
+from django.utils.timezone import localtime, now
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
 
+def truncate_day(value):
+    """
+    Truncate the datetime to the start of its day in the current time zone, like :class:`TruncDay`.
+    """
+    return localtime(value).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def truncate_bucket(value, size):
+    """
+    Truncate the datetime to the start of its bucket of ``size`` seconds, counted from the Unix epoch.
+    """
+    return datetime.fromtimestamp(value.timestamp() // size * size, tz=timezone.utc)
+
+
+class PostQuerySet(models.QuerySet):
+
+    def rebuild_like_counts(self):
+        """
+        Recalculate ``like_count`` of the posts from :model:`blog.Like` rows.
+        """
+        likes = Like.objects.filter(post=OuterRef('pk')).order_by().values('post').annotate(count=Count('id'))
+        return self.update(like_count=Coalesce(Subquery(likes.values('count')), 0), updated_at=now())
+
+
 class Post(models.Model):
     """
     Stores a single post entry, related to :model:`auth.User`.
     """
     text = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=now, editable=False)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    like_count = models.PositiveIntegerField(default=0)
+
+    objects = PostQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='blog_post_created_at_id_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='blog_post_author_created_idx'),
+        ]
+
+
+class LikeManager(models.Manager):
+
+    def is_liked(self, user_id, post_id):
+        """
+        Return whether the user likes the post, or ``None`` if the post does not exist.
+        """
+        liked = Exists(self.filter(post=OuterRef('pk'), user_id=user_id))
+        return Post.objects.using(self.db).filter(id=post_id).annotate(liked=liked).values_list(
+            'liked', flat=True).first()
+
+    def statuses(self, user_id, post_ids):
+        """
+        Return a ``{post_id: liked}`` map for the existing posts among ``post_ids``.
+        """
+        liked = Exists(self.filter(post=OuterRef('pk'), user_id=user_id))
+        return dict(Post.objects.using(self.db).filter(id__in=post_ids).annotate(liked=liked).values_list(
+            'id', 'liked'))
+
+    def add_many(self, user_id, post_ids):
+        """
+        Like all existing posts among ``post_ids`` with a single insert-or-ignore statement,
+        return the ids of the existing posts. Counters change only for the likes the statement stored,
+        so concurrent identical batches count every like once.
+        """
+        post_ids = list(post_ids)
+        if not post_ids:
+            return []
+        connection = connections[self.db]
+        opts = self.model._meta
+        qn = connection.ops.quote_name
+        sql = (
+            '{insert} {table} ({user}, {post}, {created_at}) '
+            'SELECT %s, {id}, %s FROM {post_table} WHERE {id} IN ({ids}) {suffix} RETURNING {post}'
+        ).format(
+            insert=connection.ops.insert_statement(ignore_conflicts=True),
+            table=qn(opts.db_table),
+            user=qn(opts.get_field('user').column),
+            post=qn(opts.get_field('post').column),
+            created_at=qn(opts.get_field('created_at').column),
+            id=qn(Post._meta.pk.column),
+            post_table=qn(Post._meta.db_table),
+            ids=', '.join(['%s'] * len(post_ids)),
+            suffix=connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+        )
+        created_at = now()
+
+        with transaction.atomic(using=self.db):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [user_id, opts.get_field('created_at').get_db_prep_value(created_at, connection)]
+                               + post_ids)
+                new_ids = [post_id for post_id, in cursor.fetchall()]
+            if new_ids:
+                Post.objects.using(self.db).filter(id__in=new_ids).update(
+                    like_count=F('like_count') + 1, updated_at=created_at)
+                DailyLikeCount.objects.db_manager(self.db).change(user_id, created_at, len(new_ids))
+                TrendingBucket.objects.db_manager(self.db).change({post_id: created_at for post_id in new_ids}, 1)
+        return list(Post.objects.using(self.db).filter(id__in=post_ids).values_list('id', flat=True))
+
+    def remove_many(self, user_id, post_ids):
+        """
+        Unlike all posts among ``post_ids``, return the ids of the existing posts.
+        Counters change only for the likes the delete statement removed, so concurrent identical batches
+        count every unlike once.
+        """
+        with transaction.atomic(using=self.db):
+            likes = {
+                like_id: (post_id, created_at) for like_id, post_id, created_at in self.filter(
+                    user_id=user_id, post_id__in=post_ids).values_list('id', 'post_id', 'created_at')
+            }
+            if likes:
+                connection = connections[self.db]
+                qn = connection.ops.quote_name
+                sql = 'DELETE FROM {table} WHERE {id} IN ({ids}) RETURNING {id}'.format(
+                    table=qn(self.model._meta.db_table),
+                    id=qn(self.model._meta.pk.column),
+                    ids=', '.join(['%s'] * len(likes)),
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, list(likes))
+                    deleted = dict(likes[like_id] for like_id, in cursor.fetchall())
+                if deleted:
+                    Post.objects.using(self.db).filter(id__in=deleted).update(
+                        like_count=F('like_count') - 1, updated_at=now())
+                    for day, count in Counter(truncate_day(created_at) for created_at in deleted.values()).items():
+                        DailyLikeCount.objects.db_manager(self.db).change(user_id, day, -count)
+                    TrendingBucket.objects.db_manager(self.db).change(deleted, -1)
+        return list(Post.objects.using(self.db).filter(id__in=post_ids).values_list('id', flat=True))
+
+    def add(self, user_id, post_id):
+        """
+        Like the post with a single insert-or-ignore statement.
+        Return whether a new like was stored, or ``None`` if the post does not exist.
+        """
+        connection = connections[self.db]
+        opts = self.model._meta
+        qn = connection.ops.quote_name
+        sql = (
+            '{insert} {table} ({user}, {post}, {created_at}) '
+            'SELECT %s, {id}, %s FROM {post_table} WHERE {id} = %s {suffix}'
+        ).format(
+            insert=connection.ops.insert_statement(ignore_conflicts=True),
+            table=qn(opts.db_table),
+            user=qn(opts.get_field('user').column),
+            post=qn(opts.get_field('post').column),
+            created_at=qn(opts.get_field('created_at').column),
+            id=qn(Post._meta.pk.column),
+            post_table=qn(Post._meta.db_table),
+            suffix=connection.ops.ignore_conflicts_suffix_sql(ignore_conflicts=True),
+        )
+        created_at = now()
+
+        with transaction.atomic(using=self.db):
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [user_id, opts.get_field('created_at').get_db_prep_value(created_at, connection),
+                                     post_id])
+                created = cursor.rowcount == 1
+            if created:
+                Post.objects.using(self.db).filter(id=post_id).update(
+                    like_count=F('like_count') + 1, updated_at=created_at)
+                DailyLikeCount.objects.db_manager(self.db).change(user_id, created_at, 1)
+                TrendingBucket.objects.db_manager(self.db).change({post_id: created_at}, 1)
+
+        if not created and not Post.objects.using(self.db).filter(id=post_id).exists():
+            return None
+        return created
+
+    def remove(self, user_id, post_id):
+        """
+        Unlike the post with a filtered delete.
+        Return whether a like was deleted, or ``None`` if the post does not exist.
+        """
+        with transaction.atomic(using=self.db):
+            like = self.filter(user_id=user_id, post_id=post_id).values_list('id', 'created_at').first()
+            deleted = 0
+            if like is not None:
+                deleted, _ = self.filter(id=like[0]).delete()
+            if deleted:
+                Post.objects.using(self.db).filter(id=post_id).update(
+                    like_count=F('like_count') - 1, updated_at=now())
+                DailyLikeCount.objects.db_manager(self.db).change(user_id, like[1], -1)
+                TrendingBucket.objects.db_manager(self.db).change({post_id: like[1]}, -1)
+
+        if not deleted and not Post.objects.using(self.db).filter(id=post_id).exists():
+            return None
+        return bool(deleted)
 
 
 class Like(models.Model):
@@ -19,4 +209,335 @@ class Like(models.Model):
     """
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(default=now, editable=False)
+
+    objects = LikeManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='blog_like_unique_user_post'),
+        ]
+
+
+class LikeEventManager(models.Manager):
+    """
+    Appends likes and unlikes to the event log instead of changing :model:`blog.Like`, see ``LIKE_INGESTION``.
+    Provides the methods of :class:`LikeManager`, reads include the pending events of the user.
+    """
+
+    def pending(self, user_id, post_ids):
+        """
+        Return a ``{post_id: liked}`` map of the latest pending events of the user for the posts.
+        """
+        return dict(self.filter(user_id=user_id, post_id__in=post_ids).order_by('id').values_list('post_id', 'liked'))
+
+    def is_liked(self, user_id, post_id):
+        liked = self.pending(user_id, [post_id]).get(post_id)
+        if liked is None:
+            return Like.objects.db_manager(self.db).is_liked(user_id, post_id)
+        return liked
+
+    def statuses(self, user_id, post_ids):
+        statuses = Like.objects.db_manager(self.db).statuses(user_id, post_ids)
+        statuses.update((post_id, liked) for post_id, liked in self.pending(user_id, statuses).items())
+        return statuses
+
+    def append(self, user_id, post_id, liked):
+        """
+        Append the event with a single insert of the post if it exists.
+        Return ``True``, or ``None`` if the post does not exist.
+        """
+        connection = connections[self.db]
+        opts = self.model._meta
+        qn = connection.ops.quote_name
+        sql = (
+            'INSERT INTO {table} ({user}, {post}, {liked}, {created_at}) '
+            'SELECT %s, {id}, %s, %s FROM {post_table} WHERE {id} = %s'
+        ).format(
+            table=qn(opts.db_table),
+            user=qn(opts.get_field('user').column),
+            post=qn(opts.get_field('post').column),
+            liked=qn(opts.get_field('liked').column),
+            created_at=qn(opts.get_field('created_at').column),
+            id=qn(Post._meta.pk.column),
+            post_table=qn(Post._meta.db_table),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [user_id, liked, opts.get_field('created_at').get_db_prep_value(now(), connection),
+                                 post_id])
+            return True if cursor.rowcount == 1 else None
+
+    def append_many(self, user_id, post_ids, liked):
+        """
+        Append events of all existing posts among ``post_ids``, return the ids of the existing posts.
+        """
+        existing = list(Post.objects.using(self.db).filter(id__in=post_ids).values_list('id', flat=True))
+        self.bulk_create([self.model(user_id=user_id, post_id=post_id, liked=liked) for post_id in existing])
+        return existing
+
+    def add(self, user_id, post_id):
+        return self.append(user_id, post_id, True)
+
+    def remove(self, user_id, post_id):
+        return self.append(user_id, post_id, False)
+
+    def add_many(self, user_id, post_ids):
+        return self.append_many(user_id, post_ids, True)
+
+    def remove_many(self, user_id, post_ids):
+        return self.append_many(user_id, post_ids, False)
+
+    def compact(self, batch_size=1000):
+        """
+        Apply up to ``batch_size`` of the oldest events to :model:`blog.Like` and the counters kept with it,
+        and delete them. Only the latest event of a user and a post counts, and a new like keeps the time of
+        that event. Return the number of applied events.
+        """
+        with transaction.atomic(using=self.db):
+            events = list(self.select_for_update(skip_locked=True).order_by('id').values_list(
+                'id', 'user_id', 'post_id', 'liked', 'created_at')[:batch_size])
+            if not events:
+                return 0
+            latest = {(user_id, post_id): (liked, created_at) for _, user_id, post_id, liked, created_at in events}
+            likes = Like.objects.db_manager(self.db)
+            existing = {
+                (user_id, post_id): (like_id, created_at)
+                for like_id, user_id, post_id, created_at in likes.filter(
+                    user_id__in={user_id for user_id, _ in latest}, post_id__in={post_id for _, post_id in latest},
+                ).values_list('id', 'user_id', 'post_id', 'created_at')
+                if (user_id, post_id) in latest
+            }
+            added = [key for key, (liked, _) in latest.items() if liked and key not in existing]
+            removed = [key for key, (liked, _) in latest.items() if not liked and key in existing]
+
+            likes.bulk_create([Like(user_id=user_id, post_id=post_id, created_at=latest[user_id, post_id][1])
+                               for user_id, post_id in added], batch_size=batch_size)
+            likes.filter(id__in=[existing[key][0] for key in removed]).delete()
+
+            changes = [(user_id, post_id, latest[user_id, post_id][1], 1) for user_id, post_id in added] + [
+                (user_id, post_id, existing[user_id, post_id][1], -1) for user_id, post_id in removed]
+            post_deltas, day_deltas, bucket_deltas = Counter(), Counter(), Counter()
+            for user_id, post_id, liked_at, delta in changes:
+                post_deltas[post_id] += delta
+                day_deltas[user_id, truncate_day(liked_at)] += delta
+                bucket_deltas[post_id, liked_at] += delta
+            posts_by_delta = {}
+            for post_id, delta in post_deltas.items():
+                posts_by_delta.setdefault(delta, []).append(post_id)
+            for delta, post_ids in posts_by_delta.items():
+                if delta:
+                    Post.objects.using(self.db).filter(id__in=post_ids).update(
+                        like_count=F('like_count') + delta, updated_at=now())
+            for (user_id, day), delta in day_deltas.items():
+                if delta:
+                    DailyLikeCount.objects.db_manager(self.db).change(user_id, day, delta)
+            TrendingBucket.objects.db_manager(self.db).change_many(bucket_deltas)
+
+            self.filter(id__in=[event[0] for event in events]).delete()
+        return len(events)
+
+
+class LikeEvent(models.Model):
+    """
+    Stores a like or unlike of :model:`blog.Post` by :model:`auth.User` not yet applied to :model:`blog.Like`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, db_index=False)
+    liked = models.BooleanField()
     created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = LikeEventManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'post'], name='blog_likeevent_user_post_idx'),
+        ]
+
+
+def get_like_manager():
+    """
+    Return the manager the like endpoints write and read likes with, depending on ``LIKE_INGESTION``.
+    """
+    if getattr(settings, 'LIKE_INGESTION', 'direct') == 'log':
+        return LikeEvent.objects
+    return Like.objects
+
+
+class DailyLikeCountManager(models.Manager):
+
+    def change(self, user_id, day, delta):
+        """
+        Add ``delta`` to the number of likes the user made on the day of the given datetime.
+        """
+        day = truncate_day(day)
+        if self.filter(user_id=user_id, day=day).update(count=F('count') + delta, updated_at=now()) or delta < 0:
+            return
+        try:
+            with transaction.atomic(using=self.db):
+                self.create(user_id=user_id, day=day, count=delta)
+        except IntegrityError:
+            self.filter(user_id=user_id, day=day).update(count=F('count') + delta, updated_at=now())
+
+    def rebuild(self, user_ids=None, batch_size=1000):
+        """
+        Recalculate the daily counts from :model:`blog.Like` rows, return the number of stored days.
+        """
+        likes = Like.objects.using(self.db).all()
+        counts = self.all()
+        if user_ids is not None:
+            likes = likes.filter(user_id__in=user_ids)
+            counts = counts.filter(user_id__in=user_ids)
+
+        rows = likes.annotate(day=TruncDay('created_at')).order_by().values('user_id', 'day').annotate(
+            count=Count('id')).iterator(chunk_size=batch_size)
+        stored = 0
+        with transaction.atomic(using=self.db):
+            counts.delete()
+            while True:
+                batch = [self.model(**row) for row in islice(rows, batch_size)]
+                if not batch:
+                    break
+                self.bulk_create(batch)
+                stored += len(batch)
+        return stored
+
+
+class DailyLikeCount(models.Model):
+    """
+    Stores the number of likes made by :model:`auth.User` on a single day, maintained together with :model:`blog.Like`.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    day = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = DailyLikeCountManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='blog_dailylikecount_unique_user_day'),
+        ]
+
+
+class TrendingBucketManager(models.Manager):
+    # Windows of the leaderboard, with the size of the buckets they are summed from, in seconds.
+    windows = {
+        'hour': (timedelta(hours=1), 5 * 60),
+        'day': (timedelta(days=1), 60 * 60),
+        'week': (timedelta(weeks=1), 60 * 60),
+    }
+    sizes = sorted({size for _, size in windows.values()})
+    retention = max(span for span, _ in windows.values())
+    expired_at = None
+
+    def change(self, created_at_by_post, delta):
+        """
+        Add ``delta`` to the like counts of the buckets containing the given like times of the posts,
+        for every bucket size. Buckets older than the longest window are skipped.
+        """
+        self.change_many({(post_id, created_at): delta for post_id, created_at in created_at_by_post.items()})
+
+    def change_many(self, deltas):
+        """
+        Like :meth:`change`, with a delta for every ``(post_id, created_at)`` pair, writing each bucket once.
+        """
+        oldest = now() - self.retention - timedelta(seconds=max(self.sizes))
+        buckets = Counter()
+        for (post_id, created_at), delta in deltas.items():
+            if created_at >= oldest:
+                for size in self.sizes:
+                    buckets[post_id, size, truncate_bucket(created_at, size)] += delta
+        for (post_id, size, start), delta in buckets.items():
+            if not delta or self.filter(post_id=post_id, size=size, start=start).update(
+                    count=F('count') + delta) or delta < 0:
+                continue
+            try:
+                with transaction.atomic(using=self.db):
+                    self.create(post_id=post_id, size=size, start=start, count=delta)
+            except IntegrityError:
+                self.filter(post_id=post_id, size=size, start=start).update(count=F('count') + delta)
+        self.expire()
+
+    def expire(self, force=False):
+        """
+        Delete buckets older than the longest window, at most once per ``TRENDING_EXPIRE_INTERVAL`` seconds
+        in a process unless forced.
+        """
+        interval = getattr(settings, 'TRENDING_EXPIRE_INTERVAL', 60 * 60)
+        if not force and self.expired_at is not None and time.monotonic() - self.expired_at < interval:
+            return 0
+        TrendingBucketManager.expired_at = time.monotonic()
+        deleted, _ = self.filter(start__lt=now() - self.retention - timedelta(seconds=max(self.sizes))).delete()
+        return deleted
+
+    def top(self, window, limit):
+        """
+        Return up to ``limit`` ``(post_id, likes)`` pairs of the posts liked most within the window, most liked first.
+        The window slides by the size of its buckets.
+        """
+        span, size = self.windows[window]
+        rows = self.filter(size=size, start__gt=now() - span).values('post_id').annotate(likes=Sum('count'))
+        rows = rows.filter(likes__gt=0).order_by('-likes', '-post_id')
+        return list(rows.values_list('post_id', 'likes')[:limit])
+
+    def rebuild(self, batch_size=1000, post_ids=None):
+        """
+        Recalculate the buckets of all posts, or of ``post_ids`` if given, from :model:`blog.Like` rows
+        within the longest window, return the number of buckets.
+        """
+        since = truncate_bucket(now() - self.retention, max(self.sizes))
+        likes = Like.objects.using(self.db).filter(created_at__gte=since)
+        buckets = self.all()
+        if post_ids is not None:
+            likes = likes.filter(post_id__in=post_ids)
+            buckets = buckets.filter(post_id__in=post_ids)
+        likes = likes.values_list('post_id', 'created_at')
+        counts = Counter(
+            (post_id, size, truncate_bucket(created_at, size))
+            for post_id, created_at in likes.iterator(chunk_size=batch_size) for size in self.sizes
+        )
+        with transaction.atomic(using=self.db):
+            buckets.delete()
+            self.bulk_create([
+                self.model(post_id=post_id, size=size, start=start, count=count)
+                for (post_id, size, start), count in counts.items()
+            ], batch_size=batch_size)
+        return len(counts)
+
+
+class TrendingBucket(models.Model):
+    """
+    Stores the number of likes :model:`blog.Post` got within a time bucket, maintained together with
+    :model:`blog.Like` for the trending posts leaderboard.
+    """
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    size = models.PositiveIntegerField()
+    start = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    objects = TrendingBucketManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'size', 'start'], name='blog_trendingbucket_unique_post_bucket'),
+        ]
+        indexes = [
+            models.Index(fields=['size', 'start'], name='blog_trending_size_start_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """
+    Stores a :model:`blog.Post` delivered to the home timeline of :model:`auth.User` following its author.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    post = models.ForeignKey(Post, on_delete=models.CASCADE)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'post'], name='blog_timelineentry_unique_owner_post'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-post'], name='blog_timeline_owner_idx'),
+        ]
@@ -0,0 +1,32 @@
+from rest_framework.exceptions import NotFound
+
+from socialnetwork.pagination import ApproximateCountPagination, KeysetPagination, SelectablePagination
+from . import search, timeline
+
+
+class PostCursorPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class PostPagination(SelectablePagination):
+    offset_class = ApproximateCountPagination
+    cursor_class = PostCursorPagination
+
+
+class TimelinePagination(PostCursorPagination):
+
+    def get_page_items(self, queryset, ordering, position, limit):
+        return timeline.get_timeline(queryset, self.request.user.pk, ordering, position, limit)
+
+
+class SearchPagination(KeysetPagination):
+    ordering = ('-score', '-id')
+
+    def decode_position(self, model, position):
+        score, post_id = super(SearchPagination, self).decode_position(model, position)
+        if not isinstance(score, (int, float)):
+            raise NotFound(self.invalid_cursor_message)
+        return [score, post_id]
+
+    def get_page_items(self, queryset, ordering, position, limit):
+        return search.search(queryset, self.request.query_params.get('q', ''), ordering, position, limit)
@@ -0,0 +1,109 @@
+"""
+Full-text search over :model:`blog.Post` text.
+
+SQLite uses an FTS5 table kept in sync with ``blog_post`` by triggers, PostgreSQL a generated ``tsvector``
+column with a GIN index. Both are created by the ``0012_post_search_index`` migration. SQLite drops the triggers
+whenever Django rebuilds the posts table, so migrations which alter ``blog_post`` later have to recreate them,
+and :func:`install` recreates them for ``rebuild_search_index``. Other databases fall back to a ``LIKE`` scan.
+"""
+import re
+
+from django.db import connections
+
+SQLITE_INSTALL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts USING fts5(text, content='blog_post', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS blog_post_fts_insert AFTER INSERT ON blog_post BEGIN "
+    "INSERT INTO blog_post_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_post_fts_delete AFTER DELETE ON blog_post BEGIN "
+    "INSERT INTO blog_post_fts(blog_post_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS blog_post_fts_update AFTER UPDATE OF text ON blog_post BEGIN "
+    "INSERT INTO blog_post_fts(blog_post_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO blog_post_fts(rowid, text) VALUES (new.id, new.text); END",
+]
+SQLITE_TRIGGERS = {'blog_post_fts_insert', 'blog_post_fts_delete', 'blog_post_fts_update'}
+SQLITE_REBUILD = "INSERT INTO blog_post_fts(blog_post_fts) VALUES ('rebuild')"
+SQLITE_SEARCH = (
+    "SELECT id, score FROM ("
+    "SELECT rowid AS id, -bm25(blog_post_fts) AS score FROM blog_post_fts WHERE blog_post_fts MATCH %s"
+    ") ranked {where} ORDER BY score {direction}, id {direction} LIMIT %s"
+)
+
+POSTGRESQL_INSTALL = [
+    "ALTER TABLE blog_post ADD COLUMN IF NOT EXISTS search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', text)) STORED",
+    "CREATE INDEX IF NOT EXISTS blog_post_search_vector_idx ON blog_post USING GIN (search_vector)",
+]
+POSTGRESQL_SEARCH = (
+    "SELECT id, score FROM ("
+    "SELECT id, ts_rank(search_vector, query) AS score FROM blog_post, plainto_tsquery('english', %s) query "
+    "WHERE search_vector @@ query"
+    ") ranked {where} ORDER BY score {direction}, id {direction} LIMIT %s"
+)
+
+
+def install(using='default', rebuild=False):
+    """
+    Create the search index if it is missing, and fill it if it may be out of sync with the posts.
+    """
+    connection = connections[using]
+    if 'blog_post' not in connection.introspection.table_names():
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'blog_post'")
+            missing = SQLITE_TRIGGERS - {row[0] for row in cursor.fetchall()}
+            for statement in SQLITE_INSTALL:
+                cursor.execute(statement)
+            if missing or rebuild:
+                cursor.execute(SQLITE_REBUILD)
+        elif connection.vendor == 'postgresql':
+            for statement in POSTGRESQL_INSTALL:
+                cursor.execute(statement)
+
+
+def search(posts, query, ordering, position, limit):
+    """
+    Return up to ``limit`` posts matching the query after the position in the ``(score, id)`` ordering.
+    Every returned post has its relevance in the ``score`` attribute, higher is more relevant.
+    """
+    connection = connections[posts.db]
+    if connection.vendor == 'sqlite':
+        terms = ' '.join('"{}"'.format(word) for word in re.findall(r'\w+', query))
+        sql = SQLITE_SEARCH
+    elif connection.vendor == 'postgresql':
+        terms = query
+        sql = POSTGRESQL_SEARCH
+    else:
+        return search_fallback(posts, query, ordering, position, limit)
+
+    if not terms.strip():
+        return []
+
+    descending = ordering[0].startswith('-')
+    where, params = '', [terms]
+    if position is not None:
+        where = 'WHERE score {op} %s OR (score = %s AND id {op} %s)'.format(op='<' if descending else '>')
+        params += [position[0], position[0], position[1]]
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(where=where, direction='DESC' if descending else 'ASC'), params)
+        scores = cursor.fetchall()
+
+    found = posts.in_bulk([post_id for post_id, _ in scores])
+    results = []
+    for post_id, score in scores:
+        if post_id in found:
+            found[post_id].score = score
+            results.append(found[post_id])
+    return results
+
+
+def search_fallback(posts, query, ordering, position, limit):
+    posts = posts.filter(text__icontains=query).order_by(ordering[1])
+    if position is not None:
+        posts = posts.filter(**{'id__lt' if ordering[1].startswith('-') else 'id__gt': position[1]})
+    results = list(posts[:limit])
+    for post in results:
+        post.score = 0
+    return results
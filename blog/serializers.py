@@ -1,23 +1,47 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from socialnetwork.serializers import (
+    FragmentCacheMixin, FragmentListSerializer, RowHyperlinkedModelSerializer, TimedDataMixin, TimedListSerializer,
+)
 from .models import Post
 
 
-class PostSerializer(serializers.HyperlinkedModelSerializer):
+class PostSerializer(FragmentCacheMixin, RowHyperlinkedModelSerializer):
     class Meta:
         model = Post
-        fields = ('url', 'id', 'text', 'author')
-        read_only_fields = ('id', 'author')
+        fields = ('url', 'id', 'text', 'author', 'like_count')
+        read_only_fields = ('id', 'author', 'like_count')
+        list_serializer_class = FragmentListSerializer
 
     def create(self, validated_data):
         post = Post.objects.create(
-            author=self.context['request'].user,
+            author_id=self.context['request'].user.pk,
             text=validated_data['text'],
         )
 
         return post
 
 
-class LikeAnalyticsSerializer(serializers.Serializer):
+class LikeBatchSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(min_value=1), min_length=1, max_length=100)
+
+
+class TrendingQuerySerializer(serializers.Serializer):
+    window = serializers.ChoiceField(choices=['hour', 'day', 'week'], default='day')
+    limit = serializers.IntegerField(min_value=1, max_value=settings.TRENDING_SIZE, default=20)
+
+
+class TrendingPostSerializer(PostSerializer):
+    window_like_count = serializers.IntegerField(read_only=True)
+
+    class Meta(PostSerializer.Meta):
+        fields = PostSerializer.Meta.fields + ('window_like_count',)
+
+
+class LikeAnalyticsSerializer(TimedDataMixin, serializers.Serializer):
     day = serializers.DateTimeField()
     count = serializers.IntegerField()
+
+    class Meta:
+        list_serializer_class = TimedListSerializer
@@ -0,0 +1,14 @@
+from django.dispatch import receiver
+
+from accounts.signals import followed, unfollowed
+from . import timeline
+
+
+@receiver(followed)
+def deliver_followee_posts(sender, follower_id, followee_id, **kwargs):
+    timeline.backfill(follower_id, followee_id)
+
+
+@receiver(unfollowed)
+def remove_followee_posts(sender, follower_id, followee_id, **kwargs):
+    timeline.remove_author(follower_id, followee_id)
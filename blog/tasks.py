@@ -0,0 +1,12 @@
+from tasks.queue import task
+from . import timeline
+from .models import Post
+
+
+@task(batch_size=100)
+def fan_out_posts(payloads):
+    """
+    Deliver the posts of the ``post_ids`` of the batch to the timelines of the followers of their authors.
+    """
+    post_ids = [post_id for payload in payloads for post_id in payload['post_ids']]
+    timeline.fan_out(list(Post.objects.filter(id__in=post_ids)))
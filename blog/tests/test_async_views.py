@@ -0,0 +1,65 @@
+from django.test import AsyncClient, override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from accounts.buffers import last_request_buffer
+from accounts.tests.test_views import SetUpTestCase
+from blog.models import Like
+
+
+@override_settings(ASYNC_DATABASE_THREAD_SENSITIVE=True)
+class AsyncViewsTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def assertSameResponse(self, async_url, sync_url):
+        async_response = self.client_authorized.get(async_url)
+        sync_response = self.client_authorized.get(sync_url)
+        self.assertEqual(async_response.status_code, sync_response.status_code)
+        self.assertEqual(async_response['Content-Type'], 'application/json')
+        self.assertEqual(async_response.content.replace(b'/api/async/', b'/api/'), sync_response.content)
+
+    def test_fail_unauthorized(self):
+        response = self.client.get(reverse('async-post-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+        response = self.client.get(reverse('async-post-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_method_not_allowed(self):
+        response = self.client_authorized.post(reverse('async-post-list'), {'text': 'Post'})
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+    def test_post_list_and_detail(self):
+        for query in ('?limit=2&offset=1', '?pagination=cursor'):
+            self.assertSameResponse(reverse('async-post-list') + query, reverse('post-list') + query)
+        for pk in (1, 100):
+            self.assertSameResponse(reverse('async-post-detail', kwargs={'pk': pk}),
+                                    reverse('post-detail', kwargs={'pk': pk}))
+
+    def test_like(self):
+        url = reverse('async-post-like', kwargs={'post_id': 5})
+        self.assertEqual(self.client_authorized.get(url).json(), 'Not liked')
+        self.assertEqual(self.client_authorized.post(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client_authorized.get(url).json(), 'Liked')
+        self.assertTrue(Like.objects.filter(user_id=self.user_id, post_id=5).exists())
+        self.assertEqual(self.client_authorized.delete(url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client_authorized.get(url).json(), 'Not liked')
+
+        url = reverse('async-post-like', kwargs={'post_id': 100})
+        self.assertEqual(self.client_authorized.post(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_like_analytics(self):
+        self.assertSameResponse(reverse('async-user-analytics', kwargs={'user_id': 1}) + '?live=1',
+                                reverse('user-analytics', kwargs={'user_id': 1}) + '?live=1')
+        response = self.client_authorized.get(reverse('async-user-analytics', kwargs={'user_id': 1}) + '?date_from=x')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_asgi_saves_last_request(self):
+        last_request_buffer.clear()
+        authorization = self.client_authorized._credentials['HTTP_AUTHORIZATION']
+        response = await AsyncClient().get(reverse('async-post-like', kwargs={'post_id': 1}),
+                                           authorization=authorization)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIsNotNone(last_request_buffer._seen.get(self.user_id))
@@ -0,0 +1,130 @@
+import threading
+import time
+from datetime import datetime
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.cache.backends.db import DatabaseCache
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.response import Response
+
+from accounts.tests.test_views import SetUpTestCase
+from blog.models import Like
+from socialnetwork.cache import _lock_key, response_cache_key, versioned_cache
+
+factory = RequestFactory()
+
+
+class CountingView:
+    """
+    Stands in for a view, counting how many times the cached method computes a response.
+    """
+
+    def __init__(self, duration=0, timeout=60):
+        self.calls = 0
+        self.duration = duration
+        self.list = versioned_cache('test', timeout)(CountingView.compute).__get__(self)
+
+    def compute(self, request):
+        self.calls += 1
+        time.sleep(self.duration)
+        return Response({'calls': self.calls})
+
+
+@override_settings(CACHE_STALE_TIMEOUT=60, CACHE_LOCK_TIMEOUT=5, CACHE_EARLY_EXPIRATION_BETA=1.0)
+class VersionedCacheTestCase(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.request = factory.get('/api/test/')
+
+    def test_concurrent_misses_compute_once(self):
+        view = CountingView(duration=0.2)
+        responses = []
+        threads = [threading.Thread(target=lambda: responses.append(view.list(self.request))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(view.calls, 1)
+        self.assertEqual([response.data for response in responses], [{'calls': 1}] * 5)
+        self.assertEqual(sorted(response['X-Cache'] for response in responses), ['HIT'] * 4 + ['MISS'])
+
+    def test_expired_entry_served_while_recomputed(self):
+        view = CountingView(timeout=0)
+        self.assertEqual(view.list(self.request)['X-Cache'], 'MISS')
+
+        cache.add(_lock_key(response_cache_key('test', self.request)), True)
+        response = view.list(self.request)
+        self.assertEqual((response['X-Cache'], response.data), ('STALE', {'calls': 1}))
+
+        cache.delete(_lock_key(response_cache_key('test', self.request)))
+        response = view.list(self.request)
+        self.assertEqual((response['X-Cache'], response.data), ('MISS', {'calls': 2}))
+
+    def test_early_expiration(self):
+        view = CountingView(duration=0.01)
+        view.list(self.request)
+        with mock.patch('socialnetwork.cache.random.random', return_value=0.5):
+            self.assertEqual(view.list(self.request)['X-Cache'], 'HIT')
+            with override_settings(CACHE_EARLY_EXPIRATION_BETA=100000):
+                self.assertEqual(view.list(self.request)['X-Cache'], 'MISS')
+        self.assertEqual(view.calls, 2)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+                                       'LOCATION': 'test_cache_table'}})
+class SharedCacheTestCase(TestCase):
+    """
+    Checks single-flight locking with the database cache, shared by processes which each have their own instance.
+    """
+
+    def setUp(self):
+        call_command('createcachetable', verbosity=0)
+        self.request = factory.get('/api/test/')
+        self.other = DatabaseCache('test_cache_table', {})
+
+    def test_lock_taken_once(self):
+        key = _lock_key(response_cache_key('test', self.request))
+        self.assertTrue(self.other.add(key, True, 5))
+        self.assertFalse(cache.add(key, True, 5))
+        self.assertFalse(self.other.add(key, True, 5))
+
+        self.other.delete(key)
+        self.assertTrue(cache.add(key, True, 5))
+        self.assertFalse(self.other.add(key, True, 5))
+
+        cache.delete(key)
+        self.other.add(key, True, 0)
+        self.assertTrue(cache.add(key, True, 5))
+
+    @override_settings(CACHE_STALE_TIMEOUT=60, CACHE_LOCK_TIMEOUT=5)
+    def test_expired_entry_served_while_other_process_recomputes(self):
+        view = CountingView(timeout=0)
+        self.assertEqual(view.list(self.request)['X-Cache'], 'MISS')
+
+        self.assertTrue(self.other.add(_lock_key(response_cache_key('test', self.request)), True, 5))
+        response = view.list(self.request)
+        self.assertEqual((response['X-Cache'], response.data), ('STALE', {'calls': 1}))
+        self.assertEqual(view.calls, 1)
+
+
+class LikeAnalyticsCacheTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def get(self, **params):
+        return self.client_authorized.get(reverse('user-analytics', kwargs={'user_id': self.user_id}), params)
+
+    def test_cached_until_like_counts_change(self):
+        self.assertEqual(self.get()['X-Cache'], 'MISS')
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(self.get(date_to=datetime(2020, 1, 1).isoformat())['X-Cache'], 'MISS')
+
+        Like.objects.add(self.user_id, 2)
+        response = self.get()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['count'], 3)
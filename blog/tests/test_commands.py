@@ -0,0 +1,95 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from accounts.tests.test_views import SetUpTestCase
+from blog.models import Post, Like, DailyLikeCount, TrendingBucket
+
+User = get_user_model()
+
+
+class RebuildLikeCountsTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def test_rebuild_like_counts(self):
+        expected = dict(Post.objects.values_list('id', 'like_count'))
+        Post.objects.update(like_count=10)
+        call_command('rebuild_like_counts', stdout=StringIO())
+        self.assertEqual(dict(Post.objects.values_list('id', 'like_count')), expected)
+
+    def test_rebuild_like_counts_selected_posts(self):
+        Post.objects.update(like_count=10)
+        call_command('rebuild_like_counts', '1', stdout=StringIO())
+        self.assertEqual(Post.objects.get(id=1).like_count, 2)
+        self.assertEqual(Post.objects.get(id=2).like_count, 10)
+
+
+class RebuildLikeAnalyticsTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def test_rebuild_like_analytics(self):
+        expected = set(DailyLikeCount.objects.values_list('user_id', 'day', 'count'))
+        DailyLikeCount.objects.update(count=10)
+        DailyLikeCount.objects.filter(user_id=2).delete()
+        call_command('rebuild_like_analytics', stdout=StringIO())
+        self.assertEqual(set(DailyLikeCount.objects.values_list('user_id', 'day', 'count')), expected)
+
+
+class ImportDataTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def write(self, suffix, content):
+        file = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False)
+        self.addCleanup(os.remove, file.name)
+        with file:
+            file.write(content)
+        return file.name
+
+    def write_jsonl(self, rows):
+        return self.write('.jsonl', ''.join(json.dumps(row) + '\n' for row in rows))
+
+    def test_import_data(self):
+        users = self.write('.csv', 'username,password,email\nimported_1,imported_password1,a@example.com\n'
+                                   'imported_2,,\n')
+        posts = self.write_jsonl([
+            {'id': 100, 'author': 'imported_1', 'text': 'Imported post', 'created_at': '2021-01-02T10:00:00Z'},
+            {'id': 101, 'author_id': 1, 'text': 'Imported post of an existing user'},
+            {'author': 'missing', 'text': 'Skipped post'},
+        ])
+        likes = self.write_jsonl([
+            {'user': 'imported_2', 'post_id': 100, 'created_at': '2021-01-03T10:00:00Z'},
+            {'user': 'imported_2', 'post_id': 100},
+            {'user_id': 1, 'post_id': 100},
+            {'user_id': 1, 'post_id': 1000},
+        ])
+        out = StringIO()
+        call_command('import_data', users=users, posts=posts, likes=likes, batch_size=2, workers=0, stdout=out)
+        self.assertIn('Imported 2 posts', out.getvalue())
+        self.assertIn('Imported 2 likes', out.getvalue())
+        self.assertIn('skipped 2.', out.getvalue().splitlines()[-1])
+
+        user = User.objects.get(username='imported_1')
+        self.assertTrue(user.check_password('imported_password1'))
+        self.assertEqual(user.email, 'a@example.com')
+        self.assertFalse(User.objects.get(username='imported_2').has_usable_password())
+
+        post = Post.objects.get(id=100)
+        self.assertEqual((post.author_id, post.created_at.year, post.like_count), (user.id, 2021, 2))
+        self.assertEqual(Post.objects.get(id=101).author_id, 1)
+        self.assertFalse(Post.objects.filter(text='Skipped post').exists())
+        self.assertEqual(Like.objects.filter(post_id=100).count(), 2)
+        self.assertTrue(DailyLikeCount.objects.filter(user__username='imported_2', day__year=2021, count=1).exists())
+        self.assertEqual(TrendingBucket.objects.top('hour', 10), [(100, 1)])
+
+        post = Post.objects.create(author=user, text='Created after import')
+        self.assertGreater(post.id, 101)
+
+    def test_import_users_password_pool(self):
+        users = self.write_jsonl([{'username': 'pooled_{}'.format(i), 'password': 'password{}'.format(i)}
+                                  for i in range(3)])
+        call_command('import_data', users=users, workers=2, stdout=StringIO())
+        self.assertTrue(User.objects.get(username='pooled_2').check_password('password2'))
@@ -0,0 +1,87 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+
+from accounts.tests.test_views import SetUpTestCase
+from blog.models import DailyLikeCount, Like, LikeEvent, Post, TrendingBucket, truncate_bucket, truncate_day
+
+
+@override_settings(LIKE_INGESTION='log')
+class LikeEventTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def like(self, post_id, method='post', client=None):
+        url = reverse('post-like', kwargs={'post_id': post_id})
+        return getattr(client or self.client_authorized, method)(url)
+
+    def test_like_is_appended(self):
+        response = self.like(2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Like.objects.filter(user_id=self.user_id, post_id=2).exists())
+        self.assertEqual(LikeEvent.objects.filter(user_id=self.user_id, post_id=2, liked=True).count(), 1)
+        self.assertEqual(Post.objects.get(id=2).like_count, 1)
+
+    def test_like_missing_post_not_found(self):
+        self.assertEqual(self.like(100).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.like(100, 'delete').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.like(100, 'get').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(LikeEvent.objects.exists())
+
+    def test_user_reads_own_pending_likes(self):
+        self.like(2)
+        self.assertEqual(self.like(2, 'get').data, 'Liked')
+        self.assertEqual(self.like(2, 'get', self.client_authorized_admin).data, 'Not liked')
+        self.like(1, 'delete')
+        self.assertEqual(self.like(1, 'get').data, 'Not liked')
+
+        response = self.client_authorized.get(reverse('post-like-batch'), {'ids': '1,2,3'})
+        self.assertEqual(response.data, {1: False, 2: True, 3: True})
+
+    def test_compact_applies_latest_events(self):
+        self.like(2)
+        self.like(4)
+        self.like(4, 'delete')
+        self.like(1, 'delete')
+        response = self.client_authorized.post(reverse('post-like-batch'), {'ids': [5, 100]}, format='json')
+        self.assertEqual(response.data, {5: True})
+        like_counts = dict(Post.objects.values_list('id', 'like_count'))
+
+        self.assertEqual(LikeEvent.objects.compact(batch_size=2), 2)
+        call_command('compact_like_events', stdout=StringIO())
+        self.assertFalse(LikeEvent.objects.exists())
+        self.assertEqual(set(Like.objects.filter(user_id=self.user_id).values_list('post_id', flat=True)), {2, 3, 5})
+        self.assertEqual(dict(Post.objects.values_list('id', 'like_count')), {
+            **like_counts, 1: like_counts[1] - 1, 2: like_counts[2] + 1, 5: like_counts[5] + 1,
+        })
+        self.assertEqual(DailyLikeCount.objects.get(user_id=self.user_id, day=truncate_day(now())).count, 2)
+        self.assertEqual(TrendingBucket.objects.top('hour', 10), [(5, 1), (2, 1)])
+        self.assertEqual(self.like(4, 'get').data, 'Not liked')
+
+    def test_compact_repeated_events(self):
+        for _ in range(3):
+            self.like(2)
+            self.like(2, 'delete')
+        self.like(2)
+        self.like(2, 'post', self.client_authorized_admin)
+        self.assertEqual(LikeEvent.objects.compact(), 8)
+        self.assertEqual(Like.objects.filter(post_id=2).count(), Post.objects.get(id=2).like_count)
+        self.assertTrue(Like.objects.filter(user_id=self.user_id, post_id=2).exists())
+
+    def test_compact_keeps_event_time(self):
+        self.like(2)
+        liked_at = now() - timedelta(days=2, hours=1)
+        LikeEvent.objects.update(created_at=liked_at)
+        LikeEvent.objects.compact()
+
+        self.assertEqual(Like.objects.get(user_id=self.user_id, post_id=2).created_at, liked_at)
+        self.assertEqual(DailyLikeCount.objects.get(user_id=self.user_id, day=truncate_day(liked_at)).count, 1)
+        self.assertFalse(DailyLikeCount.objects.filter(user_id=self.user_id, day=truncate_day(now())).exists())
+        self.assertEqual(set(TrendingBucket.objects.filter(post_id=2).values_list('start', flat=True)),
+                         {truncate_bucket(liked_at, size) for size in TrendingBucket.objects.sizes})
+        self.assertEqual(TrendingBucket.objects.top('week', 10), [(2, 1)])
+        self.assertEqual(TrendingBucket.objects.top('day', 10), [])
@@ -0,0 +1,87 @@
+import re
+import threading
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import serializers, status
+
+from accounts.tests.test_views import SetUpTestCase
+from socialnetwork.metrics import Registry, RequestStats, registry
+
+
+class MetricsTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def setUp(self):
+        super(MetricsTestCase, self).setUp()
+        registry.clear()
+
+    def get_metrics(self):
+        response = self.client_authorized_admin.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def get_sample(self, metrics, name, **labels):
+        for line in metrics.splitlines():
+            sample, _, value = line.rpartition(' ')
+            if sample.startswith(name + '{') and all('{}="{}"'.format(*label) in sample for label in labels.items()):
+                return float(value)
+        self.fail('{} {} not found'.format(name, labels))
+
+    def test_fail_not_admin(self):
+        response = self.client_authorized.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_route_metrics(self):
+        for _ in range(2):
+            response = self.client_authorized.get(reverse('post-list'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.client_authorized.get(reverse('post-detail', kwargs={'pk': 1000}))
+        metrics = self.get_metrics()
+
+        labels = dict(route='post-list', method='GET')
+        self.assertEqual(self.get_sample(metrics, 'socialnetwork_http_request_duration_seconds_count', **labels), 2)
+        self.assertEqual(self.get_sample(metrics, 'socialnetwork_http_request_duration_seconds_bucket',
+                                         le='+Inf', **labels), 2)
+        self.assertEqual(self.get_sample(metrics, 'socialnetwork_http_responses_total', status=200, **labels), 2)
+        self.assertGreater(self.get_sample(metrics, 'socialnetwork_http_db_queries_total', **labels), 0)
+        self.assertGreater(self.get_sample(metrics, 'socialnetwork_http_serialize_seconds_total', **labels), 0)
+        self.assertGreater(self.get_sample(metrics, 'socialnetwork_http_response_bytes_total', **labels), 0)
+        self.assertEqual(self.get_sample(metrics, 'socialnetwork_http_n_plus_one_total', **labels), 0)
+        self.assertEqual(self.get_sample(metrics, 'socialnetwork_http_responses_total',
+                                         route='post-detail', status=404), 1)
+        self.assertIn('socialnetwork_cache_requests_total{namespace="posts",result="misses"}', metrics)
+
+        buckets = re.findall(r'^socialnetwork_http_request_duration_seconds_bucket\{route="post-list",.*} (\d+)$',
+                             metrics, re.MULTILINE)
+        self.assertEqual([int(count) for count in buckets], sorted(int(count) for count in buckets))
+
+    def test_serializer_time_without_patching_drf(self):
+        self.client_authorized.get(reverse('user-analytics', kwargs={'user_id': self.user_id}))
+        metrics = self.get_metrics()
+        self.assertGreater(self.get_sample(metrics, 'socialnetwork_http_serialize_seconds_total',
+                                           route='user-analytics'), 0)
+        self.assertEqual(serializers.BaseSerializer.data.fget.__module__, 'rest_framework.serializers')
+
+    @override_settings(METRICS_N_PLUS_ONE_THRESHOLD=1)
+    def test_n_plus_one(self):
+        with self.assertLogs('socialnetwork.metrics', 'WARNING'):
+            self.client_authorized.get(reverse('post-list'))
+            metrics = self.get_metrics()
+        self.assertEqual(self.get_sample(metrics, 'socialnetwork_http_n_plus_one_total', route='post-list'), 1)
+
+    def test_finished_threads_are_kept(self):
+        metrics = Registry()
+        thread = threading.Thread(target=metrics.record, args=('post-list', 'GET', 0.02, 200, RequestStats(), 10, 0))
+        thread.start()
+        thread.join()
+        metrics.record('post-list', 'GET', 0.2, 200, RequestStats(), 30, 1)
+
+        stats = metrics.collect()['post-list', 'GET']
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(stats.response_bytes, 40)
+        self.assertEqual(stats.n_plus_one, 1)
+        self.assertEqual(sum(stats.buckets), 2)
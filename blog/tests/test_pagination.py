@@ -0,0 +1,93 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from accounts.tests.test_views import SetUpTestCase
+from blog.models import Post
+from blog.pagination import PostCursorPagination
+from socialnetwork.pagination import ApproximateCountPagination
+
+
+class PostCursorPaginationTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def setUp(self):
+        super(PostCursorPaginationTestCase, self).setUp()
+        same_time = Post.objects.get(id=5).created_at
+        for i in range(3):
+            Post.objects.create(author_id=self.user_id, text='Same time {}'.format(i))
+        Post.objects.filter(text__startswith='Same time').update(created_at=same_time)
+        self.expected_ids = list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def collect_pages(self, url):
+        ids = []
+        while url:
+            response = self.client_authorized.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    @mock.patch.object(PostCursorPagination, 'page_size', 2)
+    def test_cursor_pages_cover_all_posts_in_order(self):
+        ids = self.collect_pages(reverse('post-list') + '?pagination=cursor')
+        self.assertEqual(ids, self.expected_ids)
+
+    @mock.patch.object(PostCursorPagination, 'page_size', 3)
+    def test_cursor_previous_link(self):
+        first = self.client_authorized.get(reverse('post-list') + '?pagination=cursor')
+        second = self.client_authorized.get(first.data['next'])
+        previous = self.client_authorized.get(second.data['previous'])
+        self.assertEqual(previous.data['results'], first.data['results'])
+        self.assertIsNone(previous.data['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.client_authorized.get(reverse('post-list') + '?cursor=invalid')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_offset_pagination_by_default(self):
+        response = self.client_authorized.get(reverse('post-list'))
+        self.assertEqual(response.data['count'], len(self.expected_ids))
+        self.assertEqual([post['id'] for post in response.data['results']], self.expected_ids)
+
+
+@override_settings(APPROXIMATE_COUNT_THRESHOLD=3)
+class ApproximateCountPaginationTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def get_page(self, **params):
+        response = self.client_authorized.get(reverse('post-list'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_count_of_large_table_is_cached(self):
+        self.assertEqual(self.get_page(limit=2)['count'], 5)
+        Post.objects.create(author_id=self.user_id, text='Not counted yet')
+        page = self.get_page(limit=2, offset=2)
+        self.assertEqual(page['count'], 5)
+        self.assertIsNotNone(page['next'])
+
+        page = self.get_page(limit=2, offset=4)
+        self.assertEqual(page['count'], 6)
+        self.assertIsNone(page['next'])
+
+    def test_low_estimate_keeps_next_page(self):
+        self.get_page(limit=2)
+        Post.objects.bulk_create([Post(author_id=self.user_id, text='New {}'.format(i)) for i in range(3)])
+        page = self.get_page(limit=2, offset=4)
+        self.assertEqual(page['count'], 7)
+        self.assertEqual(len(page['results']), 2)
+        self.assertIsNotNone(page['next'])
+
+    def test_small_table_counted_exactly(self):
+        with override_settings(APPROXIMATE_COUNT_THRESHOLD=100):
+            self.get_page(limit=2)
+            Post.objects.create(author_id=self.user_id, text='Counted')
+            self.assertEqual(self.get_page(limit=3)['count'], 6)
+
+    def test_filtered_queryset_counted_exactly(self):
+        self.assertTrue(ApproximateCountPagination.is_filtered(Post.objects.filter(author_id=1)))
+        self.assertFalse(ApproximateCountPagination.is_filtered(Post.objects.order_by('-id').values('id')))
@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from blog.models import Post
+from socialnetwork.routers import PIN_COOKIE, ReplicaPinningMiddleware, ReplicaRouter, health
+
+User = get_user_model()
+
+factory = RequestFactory()
+router = ReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1', 'replica_2'], REPLICA_PIN_SECONDS=5)
+@mock.patch.object(health, 'is_healthy', return_value=True)
+class ReplicaRouterTestCase(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def handle(self, request, write=False, user=None):
+        """
+        Pass the request through the middleware, return the databases read before and after the optional write.
+        """
+        reads = []
+
+        def get_response(request):
+            if user is not None:
+                request.user = user
+            reads.append(router.db_for_read(Post))
+            if write:
+                self.assertEqual(router.db_for_write(Post), 'default')
+            reads.append(router.db_for_read(Post))
+            return HttpResponse()
+        return reads, ReplicaPinningMiddleware(get_response)(request)
+
+    def test_reads_outside_requests_use_default_routing(self, is_healthy):
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertEqual(router.db_for_write(Post), 'default')
+
+    def test_safe_requests_read_from_one_replica(self, is_healthy):
+        (first, second), response = self.handle(factory.get('/api/posts/'))
+        self.assertIn(first, ['replica_1', 'replica_2'])
+        self.assertEqual(first, second)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        reads, _ = self.handle(factory.post('/api/posts/'))
+        self.assertEqual(reads, ['default', 'default'])
+
+    def test_unhealthy_replicas_are_skipped(self, is_healthy):
+        is_healthy.side_effect = lambda alias: alias == 'replica_2'
+        reads, _ = self.handle(factory.get('/api/posts/'))
+        self.assertEqual(reads, ['replica_2', 'replica_2'])
+
+        is_healthy.side_effect = None
+        is_healthy.return_value = False
+        reads, _ = self.handle(factory.get('/api/posts/'))
+        self.assertEqual(reads, ['default', 'default'])
+
+    def test_write_pins_request_and_client(self, is_healthy):
+        user = User(pk=3, username='myname3')
+        (before, after), response = self.handle(factory.get('/api/posts/'), write=True, user=user)
+        self.assertNotEqual(before, 'default')
+        self.assertEqual(after, 'default')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        request = factory.get('/api/posts/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        reads, _ = self.handle(request)
+        self.assertEqual(reads, ['default', 'default'])
+
+        reads, _ = self.handle(factory.get('/api/posts/'), user=user)
+        self.assertEqual(reads, ['default', 'default'])
+
+        reads, _ = self.handle(factory.get('/api/posts/'), user=User(pk=4, username='other'))
+        self.assertNotIn('default', reads)
+
+    def test_sessions_are_read_from_primary(self, is_healthy):
+        def get_response(request):
+            self.assertEqual(router.db_for_read(Session), 'default')
+            return HttpResponse()
+        ReplicaPinningMiddleware(get_response)(factory.get('/'))
+
+    def test_replicas_are_not_migrated(self, is_healthy):
+        self.assertFalse(router.allow_migrate('replica_1', 'blog'))
+        self.assertIsNone(router.allow_migrate('default', 'blog'))
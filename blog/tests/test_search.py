@@ -0,0 +1,97 @@
+from importlib import import_module
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.urls import reverse
+from rest_framework import status
+
+from accounts.tests.test_views import SetUpTestCase
+from blog.models import Post
+from blog.pagination import SearchPagination
+
+
+class PostSearchTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def setUp(self):
+        super(PostSearchTestCase, self).setUp()
+        # Fixtures are loaded without the triggers knowing the previous state of the test database.
+        call_command('rebuild_search_index', stdout=mock.Mock())
+
+    def search(self, query, url=None):
+        response = self.client_authorized.get(url or reverse('post-search'), None if url else {'q': query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response
+
+    def get_ids(self, query):
+        return [post['id'] for post in self.search(query).data['results']]
+
+    def test_search_fail_unauthorized(self):
+        response = self.client.get(reverse('post-search'), {'q': 'post'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_search_ranked(self):
+        relevant = Post.objects.create(author_id=self.user_id, text='Mountain mountain mountain trip')
+        other = Post.objects.create(author_id=self.user_id, text='A long text about a trip that went to a mountain')
+        self.assertEqual(self.get_ids('mountain'), [relevant.id, other.id])
+        self.assertEqual(self.get_ids('mountain trip'), [relevant.id, other.id])
+
+    def test_search_empty_query(self):
+        self.assertEqual(self.get_ids(''), [])
+        self.assertEqual(self.get_ids('"*'), [])
+
+    def test_search_index_follows_changes(self):
+        post = Post.objects.create(author_id=self.user_id, text='Searchable words')
+        self.assertEqual(self.get_ids('searchable'), [post.id])
+
+        post.text = 'Changed words'
+        post.save()
+        self.assertEqual(self.get_ids('searchable'), [])
+        self.assertEqual(self.get_ids('changed'), [post.id])
+
+        post.delete()
+        self.assertEqual(self.get_ids('changed'), [])
+
+    def get_all_ids(self, query):
+        response = self.search(query)
+        ids = [post['id'] for post in response.data['results']]
+        while response.data['next']:
+            response = self.search(None, url=response.data['next'])
+            ids.extend(post['id'] for post in response.data['results'])
+        return ids
+
+    @mock.patch.object(SearchPagination, 'page_size', 2)
+    def test_search_cursor_pages(self):
+        self.assertEqual(sorted(self.get_all_ids('post')), [1, 2, 3])
+
+        post_ids = [Post.objects.create(author_id=self.user_id, text='Equally ranked').id for _ in range(3)]
+        self.assertEqual(self.get_all_ids('equally ranked'), post_ids[::-1])
+
+    def test_search_index_installed(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('FTS5 is used only on SQLite.')
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE name LIKE 'blog_post_fts%%'")
+            self.assertGreaterEqual(cursor.fetchone()[0], 4)
+
+
+class SearchIndexMigrationTestCase(SimpleTestCase):
+
+    def collect_sql(self, vendor, backwards=False):
+        operation = import_module('blog.migrations.0012_post_search_index').Migration.operations[0]
+        schema_editor = mock.Mock(connection=mock.Mock(vendor=vendor, alias='default'))
+        if backwards:
+            operation.database_backwards('blog', schema_editor, None, None)
+        else:
+            operation.database_forwards('blog', schema_editor, None, None)
+        return [call.args[0] for call in schema_editor.execute.call_args_list]
+
+    def test_statements_by_vendor(self):
+        self.assertTrue(self.collect_sql('sqlite')[0].startswith('CREATE VIRTUAL TABLE'))
+        self.assertEqual(self.collect_sql('sqlite', backwards=True)[-1], 'DROP TABLE IF EXISTS blog_post_fts')
+        self.assertIn('GIN', self.collect_sql('postgresql')[1])
+        self.assertEqual(self.collect_sql('postgresql', backwards=True)[-1],
+                         'ALTER TABLE blog_post DROP COLUMN IF EXISTS search_vector')
+        self.assertEqual(self.collect_sql('mysql'), [])
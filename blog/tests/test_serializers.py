@@ -0,0 +1,101 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import serializers, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from accounts.serializers import UserSerializer
+from accounts.tests.test_views import SetUpTestCase, User
+from blog.models import Post
+from blog.serializers import PostSerializer
+from socialnetwork.cache import bump_generation
+
+factory = APIRequestFactory()
+
+
+class RowSerializerTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def render_all_ways(self, serializer_class, queryset, path):
+        context = {'request': Request(factory.get(path))}
+        serializer = serializer_class(context=context)
+        instances = serializer_class(queryset, many=True, context=context).data
+        rows = serializer_class(serializer.get_row_queryset(queryset), many=True, context=context).data
+        default = serializers.ListSerializer(queryset, child=serializer_class(), context=context).data
+        return [JSONRenderer().render(data) for data in (instances, rows, default)]
+
+    def test_same_output_as_hyperlinked_serializer(self):
+        Post.objects.create(author_id=self.user_id, text='Unicode ✓ "quoted"\n')
+        for serializer_class, queryset, path in (
+            (PostSerializer, Post.objects.order_by('id'), reverse('post-list')),
+            (UserSerializer, User.objects.order_by('id'), reverse('user-list')),
+        ):
+            instances, rows, default = self.render_all_ways(serializer_class, queryset, path)
+            self.assertEqual(instances, default)
+            self.assertEqual(rows, default)
+
+    def test_post_list_reads_rows(self):
+        # The ETag needs one indexed MAX(updated_at) and no count of the table, the page reads ids and rows.
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client_authorized.get(reverse('post-list'))
+        self.assertEqual(len(queries), 3)
+        self.assertIn('MAX(', queries[0]['sql'])
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql']])
+        expected = serializers.ListSerializer(Post.objects.order_by('-created_at', '-id'), child=PostSerializer(),
+                                              context={'request': factory.get(reverse('post-list'))}).data
+        self.assertEqual(response.data['results'], expected)
+
+        # With all fragments cached only the ids and versions of the page are read.
+        bump_generation('posts')
+        with self.assertNumQueries(2):
+            response = self.client_authorized.get(reverse('post-list'))
+        self.assertEqual(response.data['results'], expected)
+        self.assertEqual(response.content, JSONRenderer().render({**response.data, 'results': expected}))
+
+        with self.assertNumQueries(1):
+            response = self.client_authorized.get(reverse('post-list'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_edit_serializes_only_edited_post(self):
+        self.client_authorized.get(reverse('post-list'))
+        post = Post.objects.get(id=3)
+        post.text = 'Edited'
+        post.save()
+        bump_generation('posts')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client_authorized.get(reverse('post-list'))
+        self.assertEqual(len(queries), 3)
+        self.assertTrue(queries[-1]['sql'].endswith('IN (3)'))
+        self.assertEqual([row['text'] for row in response.data['results'] if row['id'] == 3], ['Edited'])
+
+        response = self.client_authorized.get(reverse('post-detail', kwargs={'pk': 3}))
+        self.assertEqual(response.data, PostSerializer(post, context={'request': factory.get('/')}).data)
+        self.assertEqual(response.data['text'], 'Edited')
+
+    def test_sparse_fields(self):
+        response = self.client_authorized.get(reverse('post-list'), {'fields': 'id,text,unknown'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['results'])
+        for post in response.data['results']:
+            self.assertEqual(list(post), ['id', 'text'])
+
+        response = self.client_authorized.get(reverse('post-list'), {'fields': 'id', 'pagination': 'cursor'})
+        self.assertEqual([list(post) for post in response.data['results']], [['id']] * len(response.data['results']))
+
+        response = self.client_authorized.get(reverse('post-detail', kwargs={'pk': 1}), {'fields': 'author'})
+        self.assertEqual(list(response.data), ['author'])
+
+        response = self.client_authorized.get(reverse('user-list'), {'fields': 'url,username'})
+        self.assertEqual(list(response.data['results'][0]), ['url', 'username'])
+
+    def test_sparse_fields_do_not_limit_writes(self):
+        response = self.client_authorized.post(reverse('post-list') + '?fields=id', {'text': 'New post'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['text'], 'New post')
+
+    def test_format_suffix(self):
+        response = self.client_authorized.get('/api/posts.json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['results'][0]['url'].endswith('.json'))
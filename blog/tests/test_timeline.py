@@ -0,0 +1,112 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework import status
+
+from accounts.models import Follow
+from accounts.tests.test_views import SetUpTestCase
+from blog.models import Post, TimelineEntry
+from blog.pagination import TimelinePagination
+from tasks.models import Task
+from tasks.queue import backends
+
+User = get_user_model()
+
+
+@override_settings(TASK_BACKEND='local', TASK_WORKERS=0)
+class TimelineTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def follow(self, user_id):
+        return self.client_authorized.post(reverse('user-follow', kwargs={'pk': user_id}))
+
+    def get_feed_ids(self, url=None):
+        response = self.client_authorized.get(url or reverse('feed'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [post['id'] for post in response.data['results']]
+
+    def create_post(self, client, text='Followed post'):
+        """
+        Create the post and run the fan-out queued with the local backend, as test transactions are never committed.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            post_id = client.post(reverse('post-list'), {'text': text}).data['id']
+        backends['local'].drain()
+        return post_id
+
+    def test_follow_success(self):
+        response = self.follow(1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client_authorized.get(reverse('user-follow', kwargs={'pk': 1})).data, 'Following')
+        self.assertEqual(User.objects.get(pk=1).followers_count, 1)
+        self.follow(1)
+        self.assertEqual(User.objects.get(pk=1).followers_count, 1)
+
+    def test_follow_fail(self):
+        self.assertEqual(self.follow(self.user_id).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.follow(100).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_feed_backfilled_on_follow(self):
+        self.assertEqual(self.get_feed_ids(), [])
+        self.follow(1)
+        self.follow(2)
+        self.assertEqual(self.get_feed_ids(), [2, 1])
+
+    def test_feed_fan_out_on_write(self):
+        self.follow(1)
+        post_id = self.create_post(self.client_authorized_admin)
+        self.assertTrue(TimelineEntry.objects.filter(owner_id=self.user_id, post_id=post_id).exists())
+        self.assertEqual(self.get_feed_ids(), [post_id, 2])
+
+    @override_settings(TASK_BACKEND='database')
+    def test_feed_fan_out_by_worker(self):
+        self.follow(1)
+        post_id = self.client_authorized_admin.post(reverse('post-list'), {'text': 'Followed post'}).data['id']
+        self.assertFalse(TimelineEntry.objects.filter(owner_id=self.user_id, post_id=post_id).exists())
+        self.assertEqual(Task.objects.count(), 1)
+
+        self.assertEqual(backends['database'].run_pending(), 1)
+        self.assertEqual(self.get_feed_ids(), [post_id, 2])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_feed_merges_popular_authors_on_read(self):
+        self.follow(1)
+        self.follow(2)
+        Follow.objects.follow(2, 1)
+        post_id = self.create_post(self.client_authorized_admin)
+        self.assertFalse(TimelineEntry.objects.filter(post_id=post_id).exists())
+        self.assertEqual(self.get_feed_ids(), [post_id, 2, 1])
+
+    def test_feed_unfollow(self):
+        self.follow(1)
+        self.follow(2)
+        self.client_authorized.delete(reverse('user-follow', kwargs={'pk': 2}))
+        self.assertEqual(self.get_feed_ids(), [2])
+        self.assertEqual(User.objects.get(pk=2).followers_count, 0)
+
+    @override_settings(TIMELINE_MAX_LENGTH=2)
+    def test_feed_trimmed(self):
+        self.follow(1)
+        post_ids = [self.create_post(self.client_authorized_admin) for _ in range(3)]
+        self.assertEqual(self.get_feed_ids(), post_ids[:0:-1])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    @mock.patch.object(TimelinePagination, 'page_size', 2)
+    def test_feed_cursor_pages(self):
+        self.follow(1)
+        self.follow(2)
+        Follow.objects.follow(2, 1)
+        post_ids = [self.create_post(self.client_authorized_admin) for _ in range(2)]
+        Post.objects.filter(id=1).update(created_at=Post.objects.get(id=post_ids[0]).created_at)
+        TimelineEntry.objects.filter(post_id=1).update(created_at=Post.objects.get(id=post_ids[0]).created_at)
+
+        expected = list(Post.objects.filter(author_id__in=[1, 2]).order_by('-created_at', '-id').values_list(
+            'id', flat=True))
+        ids, url = [], reverse('feed')
+        while url:
+            response = self.client_authorized.get(url)
+            ids.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, expected)
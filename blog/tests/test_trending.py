@@ -0,0 +1,65 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils.timezone import now
+from rest_framework import status
+
+from accounts.tests.test_views import SetUpTestCase
+from blog.models import Like, TrendingBucket
+
+
+class TrendingTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def get_trending(self, **params):
+        response = self.client_authorized.get(reverse('post-trending'), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [(post['id'], post['window_like_count']) for post in response.data['results']]
+
+    def test_trending_fail_unauthorized(self):
+        response = self.client.get(reverse('post-trending'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_trending_fail_invalid_query(self):
+        for params in ({'window': 'month'}, {'limit': 0}, {'limit': 1000}):
+            response = self.client_authorized.get(reverse('post-trending'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_trending_follows_likes(self):
+        for user_id in (1, 3, 4):
+            Like.objects.add(user_id, 5)
+        Like.objects.add_many(1, [2, 4])
+        Like.objects.add(3, 4)
+        Like.objects.remove(1, 2)
+        Like.objects.remove_many(1, [2, 4])
+        # Likes older than the longest window are not counted.
+        Like.objects.remove(2, 2)
+        self.assertEqual(self.get_trending(window='hour'), [(5, 3), (4, 1)])
+        self.assertEqual(self.get_trending(window='week', limit=1), [(5, 3)])
+
+    def test_trending_windows(self):
+        Like.objects.add(1, 5)
+        for user_id, hours in ((3, 3), (4, 3 * 24), (5, 30 * 24)):
+            like = Like.objects.create(user_id=user_id, post_id=4)
+            Like.objects.filter(pk=like.pk).update(created_at=now() - timedelta(hours=hours))
+        call_command('rebuild_trending', stdout=StringIO())
+        self.assertEqual(TrendingBucket.objects.top('hour', 10), [(5, 1)])
+        self.assertEqual(TrendingBucket.objects.top('day', 10), [(5, 1), (4, 1)])
+        self.assertEqual(TrendingBucket.objects.top('week', 10), [(4, 2), (5, 1)])
+
+    def test_rebuild_matches_incremental_counts(self):
+        Like.objects.add_many(1, [1, 2, 4])
+        Like.objects.add_many(4, [2, 5])
+        Like.objects.remove(1, 4)
+        expected = set(TrendingBucket.objects.filter(count__gt=0).values_list('post_id', 'size', 'start', 'count'))
+        call_command('rebuild_trending', stdout=StringIO())
+        self.assertEqual(set(TrendingBucket.objects.values_list('post_id', 'size', 'start', 'count')), expected)
+
+    def test_expired_buckets_are_deleted(self):
+        Like.objects.add(1, 5)
+        TrendingBucket.objects.create(post_id=3, size=60 * 60, start=now() - timedelta(days=8), count=5)
+        self.assertEqual(TrendingBucket.objects.expire(force=True), 1)
+        self.assertFalse(TrendingBucket.objects.filter(post_id=3).exists())
+        self.assertTrue(TrendingBucket.objects.filter(post_id=5).exists())
@@ -1,13 +1,20 @@
-from datetime import datetime
+import gzip
+import json
+from datetime import datetime, timedelta
+from unittest import mock
 import pytz
 
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.db.models import QuerySet
+from django.utils.http import http_date
+from django.utils.timezone import now
 from django.urls import reverse
 from rest_framework.test import APIRequestFactory
 from rest_framework import status
 
 from accounts.tests.test_views import SetUpTestCase
-from blog.models import Post, Like
+from blog.models import Post, Like, DailyLikeCount, truncate_day
 from blog.views import LikeAnalyticsView
 from blog.serializers import PostSerializer
 
@@ -40,6 +47,18 @@ class PostTestCase(SetUpTestCase):
 
         self.assertSequenceEqual(response.data.get('results'), serializer.data)
 
+    def test_get_post_list_cached_until_post_created(self):
+        first = self.client_authorized.get(reverse('post-list'), format='json')
+        second = self.client_authorized.get(reverse('post-list'), format='json')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+
+        self.client_authorized.post(reverse('post-list'), {'text': self.post_text})
+        response = self.client_authorized.get(reverse('post-list'), format='json')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['text'], self.post_text)
+
     def test_create_post_fail_unauthorized(self):
         response = self.client.post(reverse('post-list'), {'text': self.post_text})
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -60,6 +79,20 @@ class PostTestCase(SetUpTestCase):
         self.assertTrue(self.is_post_liked(user_id=self.user_id, post_id=2))
         self.assertEqual(response.data, 'OK')
 
+    def test_post_add_like_increments_count_once(self):
+        for _ in range(2):
+            self.client_authorized.post(reverse('post-like', kwargs={'post_id': 2}))
+        self.assertEqual(Post.objects.get(id=2).like_count, 2)
+
+    def test_post_delete_like_decrements_count_once(self):
+        for _ in range(2):
+            self.client_authorized.delete(reverse('post-like', kwargs={'post_id': 1}))
+        self.assertEqual(Post.objects.get(id=1).like_count, 1)
+
+    def test_get_post_like_count(self):
+        response = self.client_authorized.get(reverse('post-detail', kwargs={'pk': 1}))
+        self.assertEqual(response.data['like_count'], 2)
+
     def test_post_delete_like_fail_unauthorized(self):
         response = self.client.delete(reverse('post-like', kwargs={'post_id': 1}))
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -84,6 +117,89 @@ class PostTestCase(SetUpTestCase):
         self.assertEqual(response.data, 'Not liked')
 
 
+class LikeViewTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def test_like_missing_post_not_found(self):
+        url = reverse('post-like', kwargs={'post_id': 100})
+        self.assertEqual(self.client_authorized.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client_authorized.post(url).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client_authorized.delete(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_like_add_is_idempotent(self):
+        self.assertTrue(Like.objects.add(self.user_id, 2))
+        self.assertFalse(Like.objects.add(self.user_id, 2))
+        self.assertEqual(Like.objects.filter(user_id=self.user_id, post_id=2).count(), 1)
+
+    def test_like_remove_is_idempotent(self):
+        self.assertTrue(Like.objects.remove(self.user_id, 1))
+        self.assertFalse(Like.objects.remove(self.user_id, 1))
+        self.assertEqual(Post.objects.get(id=1).like_count, 1)
+
+    def test_like_is_liked_single_query(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(Like.objects.is_liked(self.user_id, 1))
+        with self.assertNumQueries(1):
+            self.assertIsNone(Like.objects.is_liked(self.user_id, 100))
+
+    def test_like_unique_constraint(self):
+        with self.assertRaises(IntegrityError):
+            Like.objects.create(user_id=self.user_id, post_id=1)
+
+
+class LikeBatchViewTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def test_get_like_statuses(self):
+        response = self.client_authorized.get(reverse('post-like-batch'), {'ids': '1,2,3,100'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {1: True, 2: False, 3: True})
+
+    def test_get_like_statuses_fail_invalid_ids(self):
+        response = self.client_authorized.get(reverse('post-like-batch'), {'ids': '1,a'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_add_likes(self):
+        response = self.client_authorized.post(reverse('post-like-batch'), {'ids': [1, 2, 4, 100]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {1: True, 2: True, 4: True})
+        self.assertEqual(set(Like.objects.filter(user_id=self.user_id).values_list('post_id', flat=True)), {1, 2, 3, 4})
+        self.assertEqual(dict(Post.objects.filter(id__in=[1, 2, 4]).values_list('id', 'like_count')),
+                         {1: 2, 2: 2, 4: 2})
+
+    def test_remove_likes(self):
+        response = self.client_authorized.delete(reverse('post-like-batch'), {'ids': [1, 2]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data, {1: False, 2: False})
+        self.assertEqual(list(Like.objects.filter(user_id=self.user_id).values_list('post_id', flat=True)), [3])
+        self.assertEqual(dict(Post.objects.filter(id__in=[1, 2]).values_list('id', 'like_count')), {1: 1, 2: 1})
+
+    def test_add_likes_counts_stored_likes_only(self):
+        Like.objects.add_many(self.user_id, [2, 4])
+        Like.objects.add_many(self.user_id, [2, 4, 5])
+        self.assertEqual(dict(Post.objects.filter(id__in=[2, 4, 5]).values_list('id', 'like_count')),
+                         {2: 2, 4: 2, 5: 1})
+        self.assertEqual(DailyLikeCount.objects.get(user_id=self.user_id, day=truncate_day(now())).count, 3)
+
+    def test_remove_likes_counts_deleted_likes_only(self):
+        Like.objects.add_many(self.user_id, [4, 5])
+        values_list = QuerySet.values_list
+        raced = []
+
+        def read_likes_then_lose_race(queryset, *fields, **kwargs):
+            if queryset.model is not Like or raced:
+                return values_list(queryset, *fields, **kwargs)
+            raced.append(True)
+            rows = list(values_list(queryset, *fields, **kwargs))
+            Like.objects.remove(self.user_id, 4)
+            return rows
+
+        with mock.patch.object(QuerySet, 'values_list', read_likes_then_lose_race):
+            self.assertEqual(Like.objects.remove_many(self.user_id, [4, 5]), [4, 5])
+        self.assertEqual(dict(Post.objects.filter(id__in=[4, 5]).values_list('id', 'like_count')), {4: 1, 5: 0})
+        self.assertEqual(DailyLikeCount.objects.get(user_id=self.user_id, day=truncate_day(now())).count, 0)
+
+
 class LikeAnalyticsTestCase(SetUpTestCase):
     fixtures = SetUpTestCase.fixtures + ['post-data.json']
 
@@ -92,3 +208,140 @@ class LikeAnalyticsTestCase(SetUpTestCase):
         result = v.get_queryset()
         self.assertEqual(result.get(day=datetime(2020, 12, 25, 0, 0, tzinfo=pytz.UTC))['count'], 2)
         self.assertEqual(result.get(day=datetime(2019, 3, 12, 0, 0, tzinfo=pytz.UTC))['count'], 1)
+
+    def test_like_updates_daily_count(self):
+        today = truncate_day(now())
+        Like.objects.add(self.user_id, 2)
+        Like.objects.add_many(self.user_id, [4, 5])
+        self.assertEqual(DailyLikeCount.objects.get(user_id=self.user_id, day=today).count, 3)
+        Like.objects.remove(self.user_id, 2)
+        Like.objects.remove_many(self.user_id, [1, 4])
+        self.assertEqual(DailyLikeCount.objects.get(user_id=self.user_id, day=today).count, 1)
+        day = datetime(2021, 5, 28, tzinfo=pytz.UTC)
+        self.assertEqual(DailyLikeCount.objects.get(user_id=self.user_id, day=day).count, 0)
+
+    def test_like_analytics_live_day(self):
+        url = reverse('user-analytics', kwargs={'user_id': self.user_id})
+        Like.objects.add(self.user_id, 2)
+        DailyLikeCount.objects.filter(user_id=self.user_id, day=truncate_day(now())).update(count=5)
+
+        response = self.client_authorized.get(url)
+        self.assertEqual(response.data['results'][0]['count'], 5)
+        self.assertEqual(response.data['count'], 3)
+
+        response = self.client_authorized.get(url, {'live': '1'})
+        self.assertEqual(response.data['results'][0]['count'], 1)
+        self.assertEqual(response.data['count'], 3)
+
+        response = self.client_authorized.get(url, {'live': '1', 'date_to': '2020-01-01T00:00:00Z'})
+        self.assertEqual(response.data['count'], 1)
+
+
+class UserExportViewTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def export(self, client, user_id, **extra):
+        return client.get(reverse('user-export', kwargs={'user_id': user_id}), **extra)
+
+    def read_lines(self, response):
+        content = b''.join(response.streaming_content)
+        if response.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_export_fail(self):
+        self.assertEqual(self.export(self.client, self.user_id).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.export(self.client_authorized, 1).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.export(self.client_authorized_admin, 100).status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client_authorized.get(reverse('user-export', kwargs={'user_id': self.user_id}),
+                                              {'cursor': 'users:1'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_success(self):
+        response = self.export(self.client_authorized_admin, 1)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = self.read_lines(response)
+
+        posts = Post.objects.filter(author_id=1).order_by('id')
+        likes = Like.objects.filter(user_id=1).order_by('id')
+        self.assertEqual([line['id'] for line in lines if line['type'] == 'post'], [post.id for post in posts])
+        self.assertEqual([line['id'] for line in lines if line['type'] == 'like'], [like.id for like in likes])
+        self.assertEqual(lines[0]['text'], posts[0].text)
+        self.assertEqual(lines[0]['like_count'], posts[0].like_count)
+        self.assertEqual(lines[-1]['post'], likes.last().post_id)
+
+        resumed = self.client_authorized_admin.get(reverse('user-export', kwargs={'user_id': 1}),
+                                                   {'cursor': lines[0]['cursor']})
+        self.assertEqual(self.read_lines(resumed), lines[1:])
+
+    def test_export_gzip(self):
+        response = self.export(self.client_authorized_admin, 1)
+        compressed = self.export(self.client_authorized_admin, 1, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(self.read_lines(compressed), self.read_lines(response))
+
+
+class ConditionalGetTestCase(SetUpTestCase):
+    fixtures = SetUpTestCase.fixtures + ['post-data.json']
+
+    def test_post_list_not_modified(self):
+        url = reverse('post-list')
+        response = self.client_authorized.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('no-cache', response['Cache-Control'])
+        etag = response['ETag']
+
+        response = self.client_authorized.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client_authorized.get(url, {'limit': 2}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        Like.objects.add(self.user_id, 2)
+        response = self.client_authorized.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_post_list_fresh_after_like(self):
+        url = reverse('post-list')
+        etag = self.client_authorized.get(url)['ETag']
+        self.client_authorized.post(reverse('post-like', kwargs={'post_id': 2}))
+
+        response = self.client_authorized.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        like_counts = {post['id']: post['like_count'] for post in response.data['results']}
+        self.assertEqual(like_counts[2], Post.objects.get(id=2).like_count)
+
+        response = self.client_authorized.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_post_list_modified_since_deletion(self):
+        url = reverse('post-list')
+        long_ago = now() - timedelta(days=1)
+        Post.objects.update(updated_at=long_ago)
+        with mock.patch('socialnetwork.cache.time.time', return_value=long_ago.timestamp()):
+            response = self.client_authorized.get(url)
+        last_modified = response['Last-Modified']
+        self.assertEqual(last_modified, http_date(long_ago.timestamp()))
+
+        response = self.client_authorized.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.client_authorized.delete(reverse('post-detail', kwargs={'pk': 3}))
+        response = self.client_authorized.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_like_analytics_not_modified(self):
+        url = reverse('user-analytics', kwargs={'user_id': self.user_id})
+        etag = self.client_authorized.get(url)['ETag']
+        response = self.client_authorized.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Like.objects.add(self.user_id, 2)
+        response = self.client_authorized.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['count'], 1)
@@ -0,0 +1,127 @@
+"""
+Home timelines of posts by followed users.
+
+Posts of authors with fewer than ``TIMELINE_FANOUT_LIMIT`` followers are copied into
+:model:`blog.TimelineEntry` rows of every follower when they are created (fan-out on write),
+and every timeline keeps at most ``TIMELINE_MAX_LENGTH`` entries.
+Posts of authors with more followers are merged in when a timeline is read (fan-out on read).
+"""
+from heapq import merge
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+
+from accounts.models import Follow
+from socialnetwork.pagination import KeysetPagination
+from .models import Post, TimelineEntry
+
+User = get_user_model()
+
+
+def get_fanout_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+
+
+def get_max_length():
+    return getattr(settings, 'TIMELINE_MAX_LENGTH', 800)
+
+
+def fan_out(posts):
+    """
+    Deliver the posts to the timelines of the followers of their authors.
+    """
+    authors = User.objects.filter(pk__in={post.author_id for post in posts}, followers_count__lt=get_fanout_limit())
+    followers = {}
+    follows = Follow.objects.filter(followee__in=authors).values_list('follower_id', 'followee_id')
+    for follower_id, followee_id in follows:
+        followers.setdefault(followee_id, []).append(follower_id)
+
+    entries = [
+        TimelineEntry(owner_id=owner_id, post_id=post.id, created_at=post.created_at)
+        for post in posts for owner_id in followers.get(post.author_id, ())
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+    trim({entry.owner_id for entry in entries})
+
+
+def backfill(owner_id, author_id):
+    """
+    Deliver the latest posts of a newly followed author to the timeline.
+    """
+    if not User.objects.filter(pk=author_id, followers_count__lt=get_fanout_limit()).exists():
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by('-created_at', '-id').values_list('id', 'created_at')
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(owner_id=owner_id, post_id=post_id, created_at=created_at)
+        for post_id, created_at in posts[:getattr(settings, 'TIMELINE_BACKFILL_SIZE', 20)]
+    ], ignore_conflicts=True)
+    trim([owner_id])
+
+
+def remove_author(owner_id, author_id):
+    """
+    Remove posts of an unfollowed author from the timeline.
+    """
+    TimelineEntry.objects.filter(owner_id=owner_id, post__author_id=author_id).delete()
+
+
+def trim(owner_ids, batch_size=500):
+    """
+    Delete the oldest entries of the timelines longer than ``TIMELINE_MAX_LENGTH``.
+    """
+    owner_ids = list(owner_ids)
+    connection = connections[TimelineEntry.objects.db]
+    qn = connection.ops.quote_name
+    opts = TimelineEntry._meta
+    sql = (
+        'DELETE FROM {table} WHERE {id} IN ('
+        'SELECT {id} FROM ('
+        'SELECT {id}, ROW_NUMBER() OVER (PARTITION BY {owner} ORDER BY {created_at} DESC, {post} DESC) AS entry_rank '
+        'FROM {table} WHERE {owner} IN ({owners})'
+        ') ranked WHERE entry_rank > %s)'
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(owner_ids), batch_size):
+            batch = owner_ids[start:start + batch_size]
+            cursor.execute(sql.format(
+                table=qn(opts.db_table),
+                id=qn(opts.pk.column),
+                owner=qn(opts.get_field('owner').column),
+                created_at=qn(opts.get_field('created_at').column),
+                post=qn(opts.get_field('post').column),
+                owners=', '.join(['%s'] * len(batch)),
+            ), batch + [get_max_length()])
+
+
+def get_timeline(posts, owner_id, ordering, position, limit):
+    """
+    Return up to ``limit`` posts of the timeline after the position in the ``(created_at, id)`` ordering.
+    """
+    descending = ordering[0].startswith('-')
+    sources = []
+
+    entry_ordering = tuple(field.replace('id', 'post_id') if field.lstrip('-') == 'id' else field
+                           for field in ordering)
+    entries = TimelineEntry.objects.filter(owner_id=owner_id).order_by(*entry_ordering)
+    if position is not None:
+        entries = entries.filter(KeysetPagination.get_position_filter(entry_ordering, position))
+    sources.append(entries.values_list('created_at', 'post_id')[:limit])
+
+    authors = Follow.objects.filter(follower_id=owner_id, followee__followers_count__gte=get_fanout_limit())
+    for author_id in authors.values_list('followee_id', flat=True):
+        author_posts = Post.objects.filter(author_id=author_id).order_by(*ordering)
+        if position is not None:
+            author_posts = author_posts.filter(KeysetPagination.get_position_filter(ordering, position))
+        sources.append(author_posts.values_list('created_at', 'id')[:limit])
+
+    post_ids, seen = [], set()
+    for _, post_id in merge(*sources, reverse=descending):
+        if post_id not in seen:
+            seen.add(post_id)
+            post_ids.append(post_id)
+        if len(post_ids) == limit:
+            break
+
+    found = posts.in_bulk(post_ids)
+    return [found[post_id] for post_id in post_ids if post_id in found]
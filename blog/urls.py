@@ -1,12 +1,19 @@
 from django.urls import include, path
 from rest_framework import routers
-from . import views
+from . import async_views, views
 
 router = routers.DefaultRouter()
 router.register(r'posts', views.PostViewSet)
 
 urlpatterns = [
+    path('posts/likes/', views.LikeBatchView.as_view(), name='post-like-batch'),
     path('', include(router.urls)),
+    path('feed/', views.FeedView.as_view(), name='feed'),
     path('posts/<int:post_id>/like/', views.LikeView.as_view(), name='post-like'),
-    path('users/<int:user_id>/analytics/', views.LikeAnalyticsView.as_view(), name='user-analytics')
+    path('users/<int:user_id>/analytics/', views.LikeAnalyticsView.as_view(), name='user-analytics'),
+    path('users/<int:user_id>/export/', views.UserExportView.as_view(), name='user-export'),
+    path('async/posts/', async_views.post_list, name='async-post-list'),
+    path('async/posts/<int:pk>/', async_views.post_detail, name='async-post-detail'),
+    path('async/posts/<int:post_id>/like/', async_views.like, name='async-post-like'),
+    path('async/users/<int:user_id>/analytics/', async_views.like_analytics, name='async-user-analytics'),
 ]
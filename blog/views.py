@@ -1,16 +1,30 @@
-from django.db.models import Count
-from django.db.models.functions import TruncDay
+import re
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django_filters import rest_framework as filters
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from django.utils.timezone import now
 from rest_framework import viewsets
 from rest_framework import permissions
 from rest_framework import views
 from rest_framework import generics
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
 from rest_framework.response import Response
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from socialnetwork.cache import bump_generation, conditional, versioned_cache
+from .models import Post, Like, DailyLikeCount, TrendingBucket, get_like_manager, truncate_day
+from . import exports
+from .tasks import fan_out_posts
+from .pagination import PostPagination, SearchPagination, TimelinePagination
+from .serializers import (
+    PostSerializer, LikeBatchSerializer, LikeAnalyticsSerializer, TrendingQuerySerializer, TrendingPostSerializer,
+)
 
-from .models import Post, Like
-from .serializers import PostSerializer, LikeAnalyticsSerializer
+User = get_user_model()
 
 
 class IsPostOwnerPermission(permissions.BasePermission):
@@ -22,21 +36,90 @@ class IsPostOwnerPermission(permissions.BasePermission):
         if request.method in permissions.SAFE_METHODS:
             return True
 
-        return obj.author == request.user
+        return obj.author_id == request.user.pk
+
+
+def get_posts(view):
+    return Post.objects.all()
 
 
 class PostViewSet(viewsets.ModelViewSet):
     """
     API endpoint that allows posts to be edited by their owners and viewed by all authenticated users.
     """
-    queryset = Post.objects.all().order_by('-created_at')
+    queryset = Post.objects.all().order_by('-created_at', '-id')
     serializer_class = PostSerializer
+    pagination_class = PostPagination
     permission_classes = [permissions.IsAuthenticated, IsPostOwnerPermission]
 
-    @method_decorator(cache_page(60 * 60))
+    def get_queryset(self):
+        queryset = super(PostViewSet, self).get_queryset()
+        if self.action == 'list':
+            # Cursor pagination reads its position from the rows.
+            queryset = self.get_serializer().get_fragment_queryset(queryset, 'created_at', 'id')
+        return queryset
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        fragments = serializer.to_fragments([serializer.instance])
+        return Response(serializer.data if fragments is None else ReturnDict(fragments[0], serializer=serializer))
+
+    @conditional(get_posts, namespace='posts')
+    @versioned_cache('posts', settings.POST_LIST_CACHE_TIMEOUT, get_rows=get_posts, count=False)
     def list(self, *args, **kwargs):
         return super(PostViewSet, self).list(*args, **kwargs)
 
+    @action(detail=False)
+    def search(self, request):
+        """
+        Return posts matching the ``q`` query, most relevant first, paginated with a cursor.
+        """
+        paginator = SearchPagination()
+        page = paginator.paginate_queryset(self.get_queryset(), request, view=self)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=False)
+    @versioned_cache('posts', settings.TRENDING_CACHE_TIMEOUT)
+    def trending(self, request):
+        """
+        Return the posts liked most within the last ``window`` (``hour``, ``day`` or ``week``), up to ``limit``.
+        """
+        query = TrendingQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        top = TrendingBucket.objects.top(query.validated_data['window'], query.validated_data['limit'])
+        posts = Post.objects.in_bulk([post_id for post_id, _ in top])
+        results = []
+        for post_id, likes in top:
+            if post_id in posts:
+                posts[post_id].window_like_count = likes
+                results.append(posts[post_id])
+        serializer = TrendingPostSerializer(results, many=True, context=self.get_serializer_context())
+        return Response({'window': query.validated_data['window'], 'results': serializer.data})
+
+    def perform_create(self, serializer):
+        super(PostViewSet, self).perform_create(serializer)
+        fan_out_posts.delay(post_ids=[serializer.instance.pk])
+        bump_generation('posts')
+
+    def perform_update(self, serializer):
+        super(PostViewSet, self).perform_update(serializer)
+        bump_generation('posts')
+
+    def perform_destroy(self, instance):
+        super(PostViewSet, self).perform_destroy(instance)
+        bump_generation('posts')
+
+
+class FeedView(generics.ListAPIView):
+    """
+    API endpoint that returns the home timeline of posts by users followed by the authenticated user.
+    """
+    queryset = Post.objects.all()
+    serializer_class = PostSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = TimelinePagination
+
 
 class LikeView(views.APIView):
     """
@@ -45,49 +128,142 @@ class LikeView(views.APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request, post_id):
-        try:
-            Like.objects.get(user=request.user, post=Post.objects.get(id=post_id))
-            return Response('Liked')
-        except Like.DoesNotExist:
-            return Response('Not liked')
+        liked = get_like_manager().is_liked(request.user.pk, post_id)
+        if liked is None:
+            raise NotFound()
+        return Response('Liked' if liked else 'Not liked')
 
     def post(self, request, post_id):
-        Like.objects.get_or_create(user=request.user, post=Post.objects.get(id=post_id))
+        if get_like_manager().add(request.user.pk, post_id) is None:
+            raise NotFound()
         return Response("OK")
 
     def delete(self, request, post_id):
-        try:
-            Like.objects.get(user=request.user, post=Post.objects.get(id=post_id)).delete()
-        except Like.DoesNotExist:
-            pass
+        if get_like_manager().remove(request.user.pk, post_id) is None:
+            raise NotFound()
         return Response("OK")
 
 
+class LikeBatchView(views.APIView):
+    """
+    API endpoint that allows checking, adding or removing likes of many posts at once.
+    Takes a list of post ids as ``ids`` (comma-separated in the query string for GET)
+    and returns a map of post ids to whether they are liked. Missing posts are left out.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_post_ids(self, data):
+        serializer = LikeBatchSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return set(serializer.validated_data['ids'])
+
+    def get(self, request):
+        ids = request.query_params.get('ids', '')
+        post_ids = self.get_post_ids({'ids': [post_id for post_id in ids.split(',') if post_id]})
+        return Response(get_like_manager().statuses(request.user.pk, post_ids))
+
+    def post(self, request):
+        post_ids = get_like_manager().add_many(request.user.pk, self.get_post_ids(request.data))
+        return Response({post_id: True for post_id in post_ids})
+
+    def delete(self, request):
+        post_ids = get_like_manager().remove_many(request.user.pk, self.get_post_ids(request.data))
+        return Response({post_id: False for post_id in post_ids})
+
+
 class LikeDateFilter(filters.FilterSet):
     """
-    Filter by dates in the range.
+    Filter daily like counts by dates in the range.
+    Whole days are compared, so the days containing ``date_from`` and ``date_to`` are included.
     """
-    date_from = filters.DateTimeFilter(field_name="created_at", lookup_expr='gte')
-    date_to = filters.DateTimeFilter(field_name="created_at", lookup_expr='lte')
+    date_from = filters.DateTimeFilter(method='filter_date_from')
+    date_to = filters.DateTimeFilter(field_name="day", lookup_expr='lte')
 
     class Meta:
-        model = Like
-        fields = ['created_at', ]
+        model = DailyLikeCount
+        fields = ['day', ]
+
+    def filter_date_from(self, queryset, name, value):
+        return queryset.filter(day__gte=truncate_day(value))
+
+
+def get_user_like_counts(view):
+    return DailyLikeCount.objects.filter(user_id=view.kwargs.get('user_id'))
 
 
 class LikeAnalyticsView(generics.ListAPIView):
     """
     API endpoint that returns analytics about how many likes were made by user aggregated by day.
+    Pass ``live=1`` to count today's likes from the likes themselves instead of the stored daily count.
     """
     permission_classes = [permissions.IsAuthenticated]
 
-    queryset = Like.objects.all()
+    queryset = DailyLikeCount.objects.all()
     serializer_class = LikeAnalyticsSerializer
     filter_backends = (filters.DjangoFilterBackend,)
     filterset_class = LikeDateFilter
 
+    @conditional(get_user_like_counts)
+    @versioned_cache('analytics', settings.ANALYTICS_CACHE_TIMEOUT, get_rows=get_user_like_counts)
+    def list(self, *args, **kwargs):
+        return super(LikeAnalyticsView, self).list(*args, **kwargs)
+
     def get_queryset(self):
-        queryset = self.queryset.filter(user_id=self.kwargs.get('user_id'))
-        queryset = queryset.annotate(day=TruncDay('created_at')).values('day').annotate(count=Count('id')).order_by(
-            "-day")
+        queryset = self.queryset.filter(user_id=self.kwargs.get('user_id'), count__gt=0)
+        queryset = queryset.values('day', 'count').order_by("-day")
+        return queryset
+
+    def filter_queryset(self, queryset):
+        queryset = super(LikeAnalyticsView, self).filter_queryset(queryset)
+        if self.request.query_params.get('live') in ('1', 'true'):
+            return self.merge_live_day(queryset)
         return queryset
+
+    def merge_live_day(self, queryset):
+        today = truncate_day(now())
+        rows = [row for row in queryset if row['day'] != today]
+
+        filterset = self.filterset_class(self.request.query_params, queryset=queryset)
+        filterset.is_valid()
+        date_from = filterset.form.cleaned_data.get('date_from')
+        date_to = filterset.form.cleaned_data.get('date_to')
+        if (date_from and truncate_day(date_from) > today) or (date_to and date_to < today):
+            return rows
+
+        count = Like.objects.filter(user_id=self.kwargs.get('user_id'), created_at__gte=today).count()
+        if count:
+            rows.insert(0, {'day': today, 'count': count})
+        return rows
+
+
+class UserExportView(views.APIView):
+    """
+    API endpoint that streams all posts and likes of a user as newline-delimited JSON, to the user or admins.
+    Every line has a ``cursor``; pass it as ``?cursor=`` to resume the export after that line.
+    The response is compressed with gzip if the client accepts it.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    chunk_size = 2000
+
+    def get(self, request, user_id):
+        if not request.user.is_staff and request.user.pk != user_id:
+            raise PermissionDenied()
+        if not User.objects.filter(pk=user_id).exists():
+            raise NotFound()
+
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            try:
+                exports.parse_cursor(cursor)
+            except ValueError:
+                raise NotFound('Invalid cursor')
+
+        chunks = exports.encode_lines(exports.export_rows(user_id, cursor, self.chunk_size))
+        gzip = bool(re.search(r'\bgzip\b', request.META.get('HTTP_ACCEPT_ENCODING', '')))
+        response = StreamingHttpResponse(exports.gzip_chunks(chunks) if gzip else chunks,
+                                         content_type='application/x-ndjson')
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        response['Content-Disposition'] = 'attachment; filename="user-{}.ndjson"'.format(user_id)
+        return response
@@ -0,0 +1,78 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+"""
+import io
+import math
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rollback(using=None):
+    """
+    Run the block in a transaction which is always rolled back, so benchmark data is not kept.
+    """
+    try:
+        with transaction.atomic(using=using):
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(percent / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize(latencies):
+    """
+    Summarize latencies in seconds as milliseconds.
+    """
+    values = sorted(latencies)
+    to_ms = lambda value: round(value * 1000, 3) if value is not None else None  # noqa: E731
+    return {
+        'count': len(values),
+        'mean_ms': to_ms(sum(values) / len(values) if values else None),
+        'p50_ms': to_ms(percentile(values, 50)),
+        'p95_ms': to_ms(percentile(values, 95)),
+        'p99_ms': to_ms(percentile(values, 99)),
+        'max_ms': to_ms(values[-1] if values else None),
+    }
+
+
+def wsgi_request(handler, method, path, headers=None, body=b'', content_type='application/json'):
+    """
+    Make a request to a WSGI handler in the current thread. Return the status code and the content.
+    """
+    url = urlsplit(path)
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'SERVER_NAME': settings.ALLOWED_HOSTS[0],
+        'SERVER_PORT': '80',
+        'CONTENT_TYPE': content_type,
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': 'http',
+    }
+    for name, value in (headers or {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+    statuses = []
+    response = handler(environ, lambda status, response_headers: statuses.append(status))
+    try:
+        content = b''.join(response)
+    finally:
+        response.close()
+    return int(statuses[0].split()[0]), content
@@ -0,0 +1,245 @@
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework.response import Response
+
+from .routers import get_pin_seconds, is_reading_replica
+
+_stats = Counter()
+_stats_lock = threading.Lock()
+
+
+def _generation_key(namespace):
+    return 'generation:{}'.format(namespace)
+
+
+def _changed_at_key(namespace):
+    return 'changed_at:{}'.format(namespace)
+
+
+def _lock_key(key):
+    return 'lock:{}'.format(key)
+
+
+def get_generation(namespace):
+    """
+    Return the current generation of cached data in the namespace.
+    A missing counter starts from the current time, so it never goes back to a generation used before eviction.
+    """
+    key = _generation_key(namespace)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns() // 1000, None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(*namespaces):
+    """
+    Invalidate everything cached in the namespaces.
+    """
+    changed_at = time.time()
+    for namespace in namespaces:
+        try:
+            cache.incr(_generation_key(namespace))
+        except ValueError:
+            get_generation(namespace)
+        cache.set(_changed_at_key(namespace), changed_at, None)
+
+
+def get_changed_at(namespace):
+    """
+    Return the time of the last :func:`bump_generation` of the namespace.
+    A missing time starts from the current time, so it never goes back to a time before eviction.
+    """
+    key = _changed_at_key(namespace)
+    changed_at = cache.get(key)
+    if changed_at is None:
+        cache.add(key, time.time(), None)
+        changed_at = cache.get(key)
+    return changed_at
+
+
+def record(namespace, event):
+    with _stats_lock:
+        _stats[namespace, event] += 1
+
+
+def cache_stats():
+    """
+    Return the hit and miss counters of this process as ``{namespace: {'hits': ..., 'misses': ...}}``,
+    with the number of stale responses as ``'stale'`` once there are any.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    result = {}
+    for (namespace, event), value in stats.items():
+        result.setdefault(namespace, {'hits': 0, 'misses': 0})[event] = value
+    return result
+
+
+def response_cache_key(namespace, request, *parts):
+    location = '{}{}'.format(request.get_host(), request.get_full_path())
+    digest = hashlib.md5(location.encode()).hexdigest()
+    return ':'.join(str(part) for part in ('response', namespace, get_generation(namespace)) + parts + (digest,))
+
+
+def may_lag(namespace):
+    return is_reading_replica() and time.time() - get_changed_at(namespace) < get_pin_seconds()
+
+
+def get_row_version(view, get_rows, count=True):
+    """
+    Return the latest ``updated_at`` and, unless ``count`` is false, the number of the rows returned by
+    ``get_rows(view)``, aggregated once per view.
+    """
+    versions = view.__dict__.setdefault('_row_versions', {})
+    if (get_rows, count) not in versions:
+        aggregates = {'updated_at': Max('updated_at')}
+        if count:
+            aggregates['count'] = Count('pk')
+        versions[get_rows, count] = get_rows(view).aggregate(**aggregates)
+    return versions[get_rows, count]
+
+
+def get_stale_timeout():
+    return getattr(settings, 'CACHE_STALE_TIMEOUT', 30)
+
+
+def get_lock_timeout():
+    return getattr(settings, 'CACHE_LOCK_TIMEOUT', 10)
+
+
+def expires_early(expires_at, delta):
+    """
+    Return whether to recompute an entry before it expires, with a probability which grows as the expiry nears,
+    the more the longer the entry took to compute, see "Optimal Probabilistic Cache Stampede Prevention".
+    """
+    beta = getattr(settings, 'CACHE_EARLY_EXPIRATION_BETA', 1.0)
+    return time.time() - delta * beta * math.log(1 - random.random()) >= expires_at
+
+
+def wait_for(key):
+    """
+    Wait for the request holding the lock of the key to store the entry, return the entry or ``None`` if
+    the lock is released or times out without one.
+    """
+    deadline = time.monotonic() + get_lock_timeout()
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if cache.get(_lock_key(key)) is None:
+            break
+    return None
+
+
+def versioned_cache(namespace, timeout, get_rows=None, count=True):
+    """
+    Cache the data of successful responses of a view method under the current generation of the namespace,
+    and the version of the rows returned by ``get_rows(view)`` if given, see :func:`get_row_version`.
+    Stacked under :func:`conditional`, pass the same ``get_rows`` and ``count`` so the cached data has the version
+    of the ETag, and changes of the rows which do not bump the generation reach both.
+
+    Keys contain the generation, so :func:`bump_generation` makes new data visible immediately
+    and the timeout can be long. One request at a time computes an entry, holding a lock in the cache:
+    other requests wait for a missing entry up to ``CACHE_LOCK_TIMEOUT`` seconds, and get an expired entry
+    for up to ``CACHE_STALE_TIMEOUT`` seconds after it expires. Entries are also recomputed early at random,
+    see :func:`expires_early`, so entries read often are rarely expired.
+    Responses carry an ``X-Cache`` header with ``HIT``, ``STALE`` or ``MISS``.
+    Responses read from a replica shortly after a bump are not stored, as the replica may not have the change yet.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            parts = ()
+            if get_rows is not None:
+                version = get_row_version(view, get_rows, count)
+                parts = (version['updated_at'].timestamp() if version['updated_at'] else 0,)
+                if count:
+                    parts = (version['count'],) + parts
+            key = response_cache_key(namespace, request, *parts)
+            entry = cache.get(key)
+            locked = False
+            if entry is not None:
+                data, expires_at, delta = entry
+                if not expires_early(expires_at, delta):
+                    record(namespace, 'hits')
+                    return Response(data, headers={'X-Cache': 'HIT'})
+                locked = cache.add(_lock_key(key), True, get_lock_timeout())
+                if not locked:
+                    expired = time.time() >= expires_at
+                    record(namespace, 'stale' if expired else 'hits')
+                    return Response(data, headers={'X-Cache': 'STALE' if expired else 'HIT'})
+            else:
+                locked = cache.add(_lock_key(key), True, get_lock_timeout())
+                if not locked:
+                    entry = wait_for(key)
+                    if entry is not None:
+                        record(namespace, 'hits')
+                        return Response(entry[0], headers={'X-Cache': 'HIT'})
+
+            record(namespace, 'misses')
+            try:
+                start = time.perf_counter()
+                response = method(view, request, *args, **kwargs)
+                delta = time.perf_counter() - start
+                if response.status_code == 200 and not may_lag(namespace):
+                    cache.set(key, (response.data, time.time() + timeout, delta), timeout + get_stale_timeout())
+            finally:
+                if locked:
+                    cache.delete(_lock_key(key))
+            response['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional(get_rows, namespace=None):
+    """
+    Answer conditional GET requests of a view method with ``304 Not Modified`` without calling it.
+
+    The ETag is built from the request URL, the ``Accept`` header and the latest ``updated_at`` of the rows
+    returned by ``get_rows(view)``, which an index on ``updated_at`` keeps cheap. Deleted rows leave no
+    ``updated_at`` behind, so the ETag also includes the generation of the namespace if given, which deletions bump,
+    or else the number of the rows, which should then be filtered down by an index.
+    ``Last-Modified`` is the latest ``updated_at``, or the last :func:`bump_generation` of the namespace if later.
+    Clients are asked to revalidate on every use.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            version = get_row_version(view, get_rows, count=namespace is None)
+            last_modified = version['updated_at'].timestamp() if version['updated_at'] else 0
+            if namespace is not None:
+                last_modified = max(last_modified, get_changed_at(namespace))
+                counter = get_generation(namespace)
+            else:
+                counter = version['count']
+            location = '{}{}'.format(request.get_host(), request.get_full_path())
+            tag = '{}|{}|{}|{}'.format(location, request.META.get('HTTP_ACCEPT', ''), counter, version['updated_at'])
+            etag = quote_etag(hashlib.md5(tag.encode()).hexdigest())
+            last_modified = int(last_modified) or None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = method(view, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified:
+                    response['Last-Modified'] = http_date(last_modified)
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,329 @@
+"""
+Per-route request metrics in the Prometheus text format.
+
+:class:`MetricsMiddleware` records latency, database queries and their time, serializer and rendering time,
+and response size of every request, and flags requests repeating one query ``METRICS_N_PLUS_ONE_THRESHOLD``
+or more times. Serializer time is measured by serializers using :class:`socialnetwork.serializers.TimedDataMixin`.
+Every thread aggregates its own requests without locks, and the aggregates are summed when ``api/metrics/`` is scraped.
+"""
+import asyncio
+import contextvars
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework import permissions, views
+
+from .cache import cache_stats
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_current = contextvars.ContextVar('metrics_request', default=None)
+
+
+class RequestStats:
+    """
+    Measurements of the request being handled.
+    """
+    __slots__ = ('queries', 'query_seconds', 'statements', 'serialize_seconds', 'serializing', 'render_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements = Counter()
+        self.serialize_seconds = 0.0
+        self.serializing = False
+        self.render_seconds = 0.0
+
+
+class RouteStats:
+    """
+    Aggregated measurements of the requests to one route with one method.
+    """
+    __slots__ = ('count', 'seconds', 'buckets', 'statuses', 'queries', 'query_seconds', 'serialize_seconds',
+                 'render_seconds', 'response_bytes', 'n_plus_one')
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.statuses = Counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.render_seconds = 0.0
+        self.response_bytes = 0
+        self.n_plus_one = 0
+
+    def add(self, seconds, status, request_stats, response_bytes, n_plus_one):
+        self.count += 1
+        self.seconds += seconds
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.statuses[status] += 1
+        self.queries += request_stats.queries
+        self.query_seconds += request_stats.query_seconds
+        self.serialize_seconds += request_stats.serialize_seconds
+        self.render_seconds += request_stats.render_seconds
+        self.response_bytes += response_bytes
+        self.n_plus_one += n_plus_one
+
+    def merge(self, other):
+        for name in self.__slots__:
+            if name == 'buckets':
+                self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+            elif name == 'statuses':
+                self.statuses.update(other.statuses)
+            else:
+                setattr(self, name, getattr(self, name) + getattr(other, name))
+
+
+class Registry:
+    """
+    Keeps the route statistics of every thread. Threads only write to their own statistics,
+    and those of finished threads are merged together when a thread starts or metrics are collected.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._threads = []
+        self._finished = {}
+
+    def record(self, route, method, *args):
+        routes = getattr(self._local, 'routes', None)
+        if routes is None:
+            routes = self._local.routes = {}
+            with self._lock:
+                self._merge_finished()
+                self._threads.append((threading.current_thread(), routes))
+        stats = routes.get((route, method))
+        if stats is None:
+            stats = routes[route, method] = RouteStats()
+        stats.add(*args)
+
+    def _merge_finished(self):
+        alive = []
+        for thread, routes in self._threads:
+            if thread.is_alive():
+                alive.append((thread, routes))
+            else:
+                self._merge(self._finished, routes)
+        self._threads = alive
+
+    @staticmethod
+    def _merge(total, routes):
+        for key, stats in dict(routes).items():
+            total.setdefault(key, RouteStats()).merge(stats)
+
+    def collect(self):
+        """
+        Return the statistics of all threads summed up, as ``{(route, method): RouteStats}``.
+        """
+        total = {}
+        with self._lock:
+            self._merge_finished()
+            self._merge(total, self._finished)
+            for _, routes in self._threads:
+                self._merge(total, routes)
+        return total
+
+    def clear(self):
+        with self._lock:
+            for _, routes in self._threads:
+                routes.clear()
+            self._finished.clear()
+
+
+registry = Registry()
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - start
+        stats.statements[sql] += 1
+
+
+def add_query_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@contextmanager
+def serializing():
+    """
+    Add the time spent in the block to the serializer time of the current request, unless already serializing.
+    """
+    stats = _current.get()
+    if stats is None or stats.serializing:
+        yield
+        return
+    stats.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialize_seconds += time.perf_counter() - start
+        stats.serializing = False
+
+
+_installed = False
+
+
+def install():
+    """
+    Hook the measurement of queries in. Safe to call more than once.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(add_query_wrapper)
+    for connection in connections.all():
+        add_query_wrapper(connection)
+
+
+class MetricsMiddleware:
+    """
+    Middleware recording the metrics of every request, see :mod:`socialnetwork.metrics`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        stats, start = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats, start = RequestStats(), time.perf_counter()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def process_template_response(self, request, response):
+        stats = _current.get()
+        if stats is not None:
+            render = response.render
+
+            def timed_render():
+                start = time.perf_counter()
+                try:
+                    return render()
+                finally:
+                    stats.render_seconds += time.perf_counter() - start
+            response.render = timed_render
+        return response
+
+    def record(self, request, response, stats, seconds):
+        match = getattr(request, 'resolver_match', None)
+        route = match.view_name if match is not None else 'unmatched'
+        response_bytes = 0 if response.streaming else len(response.content)
+
+        n_plus_one = False
+        if stats.statements:
+            sql, repeats = stats.statements.most_common(1)[0]
+            n_plus_one = repeats >= getattr(settings, 'METRICS_N_PLUS_ONE_THRESHOLD', 10)
+            if n_plus_one:
+                logger.warning('Possible N+1 queries in %s %s: %d times %s', request.method, route, repeats, sql)
+
+        registry.record(route, request.method, seconds, response.status_code, stats, response_bytes, n_plus_one)
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(**labels):
+    return '{' + ','.join('{}="{}"'.format(name, escape(value)) for name, value in labels.items()) + '}'
+
+
+def render_metrics():
+    """
+    Render the collected metrics in the Prometheus text exposition format.
+    """
+    routes = sorted(registry.collect().items())
+    lines = []
+
+    def family(name, kind, help_text, samples):
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        lines.extend('{}{} {}'.format(sample_name, format_labels(**labels), value)
+                     for sample_name, labels, value in samples)
+
+    def histogram():
+        name = 'socialnetwork_http_request_duration_seconds'
+        for (route, method), stats in routes:
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), stats.buckets):
+                cumulative += count
+                yield name + '_bucket', dict(route=route, method=method, le=bound), cumulative
+            yield name + '_sum', dict(route=route, method=method), stats.seconds
+            yield name + '_count', dict(route=route, method=method), stats.count
+
+    def counter(attribute):
+        return ((name, dict(route=route, method=method), getattr(stats, attribute))
+                for (route, method), stats in routes)
+
+    family('socialnetwork_http_request_duration_seconds', 'histogram', 'Request latency.', histogram())
+    family('socialnetwork_http_responses_total', 'counter', 'Responses by status code.', (
+        ('socialnetwork_http_responses_total', dict(route=route, method=method, status=status), count)
+        for (route, method), stats in routes for status, count in sorted(stats.statuses.items())
+    ))
+    for name, attribute, help_text in (
+        ('socialnetwork_http_db_queries_total', 'queries', 'Database queries made by requests.'),
+        ('socialnetwork_http_db_query_seconds_total', 'query_seconds', 'Time spent in database queries.'),
+        ('socialnetwork_http_serialize_seconds_total', 'serialize_seconds', 'Time spent serializing data.'),
+        ('socialnetwork_http_render_seconds_total', 'render_seconds', 'Time spent rendering responses.'),
+        ('socialnetwork_http_response_bytes_total', 'response_bytes', 'Size of non-streaming responses.'),
+        ('socialnetwork_http_n_plus_one_total', 'n_plus_one', 'Requests repeating one query too many times.'),
+    ):
+        family(name, 'counter', help_text, counter(attribute))
+
+    family('socialnetwork_cache_requests_total', 'counter', 'Response cache lookups by result.', (
+        ('socialnetwork_cache_requests_total', dict(namespace=namespace, result=result), count)
+        for namespace, counts in sorted(cache_stats().items()) for result, count in sorted(counts.items())
+    ))
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsView(views.APIView):
+    """
+    API endpoint that returns request metrics of this process in the Prometheus text format, to admins.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
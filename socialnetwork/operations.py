@@ -0,0 +1,31 @@
+"""
+Migration operations shared by the apps.
+"""
+from django.db import migrations, router
+
+
+class RunSQLForVendor(migrations.RunSQL):
+    """
+    Runs the statements listed for the vendor of the database, e.g. ``{'sqlite': [...], 'postgresql': [...]}``,
+    and nothing on other databases. Like :class:`~django.db.migrations.RunSQL`, the statements are shown
+    by ``sqlmigrate``.
+    """
+
+    def __init__(self, sql, reverse_sql, **kwargs):
+        self.sql_by_vendor = sql
+        self.reverse_sql_by_vendor = reverse_sql
+        super(RunSQLForVendor, self).__init__(migrations.RunSQL.noop, migrations.RunSQL.noop, **kwargs)
+
+    def deconstruct(self):
+        return self.__class__.__qualname__, [self.sql_by_vendor, self.reverse_sql_by_vendor], {}
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if router.allow_migrate(schema_editor.connection.alias, app_label, **self.hints):
+            self._run_sql(schema_editor, self.sql_by_vendor.get(schema_editor.connection.vendor, []))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if router.allow_migrate(schema_editor.connection.alias, app_label, **self.hints):
+            self._run_sql(schema_editor, self.reverse_sql_by_vendor.get(schema_editor.connection.vendor, []))
+
+    def describe(self):
+        return 'Raw SQL operation for {}'.format(', '.join(sorted(self.sql_by_vendor)))
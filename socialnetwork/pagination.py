@@ -0,0 +1,235 @@
+import json
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+
+
+class KeysetPagination(pagination.CursorPagination):
+    """
+    Cursor pagination positioned on every field of a unique ordering, e.g. ``('-created_at', '-id')``.
+
+    Unlike :class:`rest_framework.pagination.CursorPagination`, which positions on the first field only
+    and skips duplicates with an offset, every page is a single range scan of the ordering index,
+    so the cost of a page does not depend on how deep it is.
+    """
+    ordering = ('-created_at', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor.reverse if self.cursor else False
+
+        ordering = self.ordering if not reverse else pagination._reverse_ordering(self.ordering)
+        position = None
+        if self.cursor and self.cursor.position is not None:
+            position = self.decode_position(queryset.model, self.cursor.position)
+
+        results = self.get_page_items(queryset, ordering, position, self.page_size + 1)
+        has_following = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_following
+        else:
+            self.has_next, self.has_previous = has_following, self.cursor is not None
+
+        if self.has_next or self.has_previous:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(pagination.Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(pagination.Cursor(offset=0, reverse=True, position=position))
+
+    def get_page_items(self, queryset, ordering, position, limit):
+        """
+        Return up to ``limit`` items following the position (``None`` for the first page) in the ordering.
+        """
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.get_position_filter(ordering, position))
+        return list(queryset[:limit])
+
+    @staticmethod
+    def get_position_filter(ordering, values):
+        """
+        Build the lexicographic "comes after" condition for the given position.
+        """
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = '{}__{}'.format(name, 'lt' if field.startswith('-') else 'gt')
+            equal = {ordering[i].lstrip('-'): values[i] for i in range(index)}
+            conditions.append(Q(**equal) & Q(**{lookup: values[index]}))
+        return reduce(or_, conditions)
+
+    def decode_position(self, model, position):
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(self.ordering):
+                raise ValueError
+            return [self.to_python(model, field.lstrip('-'), value) for field, value in zip(self.ordering, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    @staticmethod
+    def to_python(model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        return field.target_field.to_python(value) if field.is_relation else field.to_python(value)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = instance[name] if isinstance(instance, dict) else getattr(instance, name)
+            values.append(value if isinstance(value, (int, float)) or value is None else str(value))
+        return json.dumps(values, separators=(',', ':'))
+
+
+class ApproximateCountPagination(pagination.LimitOffsetPagination):
+    """
+    Limit/offset pagination which estimates the ``count`` of whole large tables instead of counting them.
+
+    PostgreSQL tables are estimated from the planner statistics (``pg_class.reltuples``), other databases count
+    the table at most every ``APPROXIMATE_COUNT_TIMEOUT`` seconds. Filtered querysets, and tables with fewer than
+    ``APPROXIMATE_COUNT_THRESHOLD`` rows, are counted exactly. Pages fetch one extra row to find out if there is
+    a next page, and an exhausted list reports its exact count.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.offset = self.get_offset(request)
+        self.request = request
+        rows = list(queryset[self.offset:self.offset + self.limit + 1])
+        page = rows[:self.limit]
+        if len(rows) > self.limit:
+            self.count = max(self.get_count(queryset), self.offset + len(rows))
+        elif page or not self.offset:
+            self.count = self.offset + len(page)
+        else:
+            self.count = min(self.get_count(queryset), self.offset)
+
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        return page
+
+    def get_count(self, queryset):
+        if self.is_filtered(queryset):
+            return super(ApproximateCountPagination, self).get_count(queryset)
+        threshold = getattr(settings, 'APPROXIMATE_COUNT_THRESHOLD', 10000)
+        if connections[queryset.db].vendor == 'postgresql':
+            estimate = self.get_planner_estimate(queryset)
+            if estimate >= threshold:
+                return estimate
+            return super(ApproximateCountPagination, self).get_count(queryset)
+
+        key = 'row_count:{}:{}'.format(queryset.db, queryset.model._meta.db_table)
+        count = cache.get(key)
+        if count is None or count < threshold:
+            count = super(ApproximateCountPagination, self).get_count(queryset)
+            cache.set(key, count, getattr(settings, 'APPROXIMATE_COUNT_TIMEOUT', 60))
+        return count
+
+    @staticmethod
+    def is_filtered(queryset):
+        query = queryset.query
+        return bool(query.where) or query.distinct or query.combinator or query.is_sliced or \
+            query.group_by is not None
+
+    @staticmethod
+    def get_planner_estimate(queryset):
+        """
+        Return the number of rows of the table estimated by PostgreSQL, -1 if the table was never analyzed.
+        """
+        connection = connections[queryset.db]
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)',
+                           [connection.ops.quote_name(queryset.model._meta.db_table)])
+            row = cursor.fetchone()
+        return row[0] if row else -1
+
+
+class SelectablePagination(pagination.BasePagination):
+    """
+    Lets each request choose between offset and cursor pagination.
+
+    Cursor pagination is used when the request passes a cursor or ``?pagination=cursor``,
+    offset pagination otherwise, so existing clients keep working.
+    """
+    query_param = 'pagination'
+    offset_class = pagination.LimitOffsetPagination
+    cursor_class = KeysetPagination
+
+    def __init__(self):
+        self.offset_paginator = self.offset_class()
+        self.cursor_paginator = self.cursor_class()
+        self.paginator = self.offset_paginator
+
+    def get_paginator(self, request):
+        if self.cursor_paginator.cursor_query_param in request.query_params or \
+                request.query_params.get(self.query_param) == 'cursor':
+            return self.cursor_paginator
+        return self.offset_paginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request)
+        page = self.paginator.paginate_queryset(queryset, request, view)
+        self.display_page_controls = self.paginator.display_page_controls
+        return page
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return self.offset_paginator.get_paginated_response_schema(schema)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_results(self, data):
+        return self.paginator.get_results(data)
+
+    def get_schema_fields(self, view):
+        return self.offset_paginator.get_schema_fields(view) + self.cursor_paginator.get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Pagination style, "offset" (default) or "cursor".',
+                'schema': {
+                    'type': 'string',
+                    'enum': ['offset', 'cursor'],
+                },
+            }
+        ] + self.offset_paginator.get_schema_operation_parameters(view) + \
+            self.cursor_paginator.get_schema_operation_parameters(view)
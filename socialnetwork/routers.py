@@ -0,0 +1,205 @@
+"""
+Routing of reads to database replicas.
+
+:class:`ReplicaPinningMiddleware` tracks each request: GET and HEAD requests read from one healthy replica
+of ``DATABASE_REPLICAS``, while other requests, and the rest of a request after it writes, use the primary.
+After a write the client is pinned to the primary for ``REPLICA_PIN_SECONDS``, so it reads its own writes
+while the replicas catch up. Pinning is kept in a cookie and, for authenticated users, in the cache.
+Outside requests, e.g. in management commands, everything uses the primary.
+"""
+import asyncio
+import contextvars
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.utils.functional import SimpleLazyObject, empty
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_pin'
+
+_current = contextvars.ContextVar('replica_request', default=None)
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_pin_seconds():
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+
+
+def user_pin_key(user_id):
+    return 'replica_pin:user:{}'.format(user_id)
+
+
+def get_loaded_user(request):
+    """
+    Return the user of the request, or ``None`` if it is not loaded yet.
+    """
+    user = request.__dict__.get('user')
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user
+
+
+def is_reading_replica():
+    """
+    Return whether the current request reads from a replica, whose data may lag behind the primary.
+    """
+    state = _current.get()
+    return state is not None and state.replica not in (None, DEFAULT_DB_ALIAS)
+
+
+class ReplicaHealth:
+    """
+    Checks replicas with a query of their migrations table, at most every ``REPLICA_HEALTH_CHECK_INTERVAL``
+    seconds per replica and process.
+    """
+
+    def __init__(self):
+        self._checked = {}
+
+    def is_healthy(self, alias):
+        healthy, checked_at = self._checked.get(alias, (None, None))
+        interval = getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 10)
+        if checked_at is None or time.monotonic() - checked_at >= interval:
+            healthy = self.check(alias)
+            self._checked[alias] = (healthy, time.monotonic())
+        return healthy
+
+    def check(self, alias):
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1 FROM {} LIMIT 1'.format(
+                    connection.ops.quote_name(MigrationRecorder.Migration._meta.db_table)))
+            return True
+        except DatabaseError as exc:
+            logger.warning('Replica %s failed the health check: %s', alias, exc)
+            connection.close()
+            return False
+
+    def clear(self):
+        self._checked.clear()
+
+
+health = ReplicaHealth()
+
+
+class RequestState:
+    """
+    Routing state of the request being handled.
+    """
+    __slots__ = ('request', 'pinned', 'written', 'user_checked', 'replica')
+
+    def __init__(self, request, pinned):
+        self.request = request
+        self.pinned = pinned
+        self.written = False
+        self.user_checked = False
+        self.replica = None
+
+    def check_user(self):
+        """
+        Pin the request if its user wrote recently. The user is known once authentication has run.
+        """
+        user = get_loaded_user(self.request)
+        if user is None:
+            return
+        self.user_checked = True
+        if user.is_authenticated and cache.get(user_pin_key(user.pk)):
+            self.pinned = True
+
+
+class ReplicaRouter:
+    """
+    Sends reads of requests tracked by :class:`ReplicaPinningMiddleware` to replicas and all writes to the primary.
+    Sessions and the database cache are always read from the primary, so clients are not logged out and do not get
+    outdated data while a replica lags behind.
+    """
+    primary_apps = {'sessions', 'django_cache'}
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        replicas = get_replicas()
+        if state is None or not replicas:
+            return None
+        if model._meta.app_label in self.primary_apps:
+            return DEFAULT_DB_ALIAS
+        if not state.pinned and not state.user_checked:
+            state.check_user()
+        if state.pinned:
+            return DEFAULT_DB_ALIAS
+        if state.replica is None:
+            healthy = [alias for alias in replicas if health.is_healthy(alias)]
+            state.replica = random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            state.pinned = state.written = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Middleware tracking requests for :class:`ReplicaRouter`, see :mod:`socialnetwork.routers`.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(self.get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        state = self.start(request)
+        token = _current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = self.start(request)
+        token = _current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(state, response)
+
+    def start(self, request):
+        pinned = request.method not in ('GET', 'HEAD') or PIN_COOKIE in request.COOKIES
+        return RequestState(request, pinned)
+
+    def finish(self, state, response):
+        if state.written:
+            seconds = get_pin_seconds()
+            response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True, samesite='Lax')
+            user = get_loaded_user(state.request)
+            if user is not None and user.is_authenticated:
+                cache.set(user_pin_key(user.pk), True, seconds)
+        return response
@@ -0,0 +1,237 @@
+"""
+Hyperlinked serializers with a fast path for lists and sparse fieldsets.
+
+Serializing a list with :class:`RowHyperlinkedModelSerializer` builds URLs by appending ids to prefixes reversed
+once per list, and reads plain values straight from the rows, which can be model instances or ``values()`` dicts.
+The output is the same as the one of :class:`rest_framework.serializers.HyperlinkedModelSerializer`.
+:class:`FragmentCacheMixin` additionally caches the representation of every row, so only changed rows are serialized.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.urls import get_script_prefix
+from rest_framework import permissions, relations, serializers
+from rest_framework.reverse import reverse
+
+from .metrics import serializing
+
+# Stands in for ids in reversed URLs, which are split around it into a prefix and a suffix.
+PLACEHOLDER = '987654321'
+
+
+def url_builder(prefix, suffix):
+    return lambda pk: prefix + str(pk) + suffix
+
+
+class TimedDataMixin:
+    """
+    Adds the time spent building ``data`` to the serializer time of the request, see :mod:`socialnetwork.metrics`.
+    """
+
+    @property
+    def data(self):
+        with serializing():
+            return super(TimedDataMixin, self).data
+
+
+class TimedListSerializer(TimedDataMixin, serializers.ListSerializer):
+    pass
+
+
+class SparseFieldsMixin:
+    """
+    Limits the fields of serializers reading data to the ones listed in the ``fields`` query parameter,
+    e.g. ``?fields=id,text``. Unknown names are ignored.
+    """
+    fields_query_param = 'fields'
+
+    def get_fields(self):
+        fields = super(SparseFieldsMixin, self).get_fields()
+        request = self.context.get('request', None)
+        if request is None or request.method not in permissions.SAFE_METHODS:
+            return fields
+        requested = getattr(request, 'query_params', request.GET).get(self.fields_query_param)
+        if requested:
+            names = {name.strip() for name in requested.split(',')}
+            for name in [name for name in fields if name not in names]:
+                fields.pop(name)
+        return fields
+
+
+class RowListSerializer(TimedListSerializer):
+    """
+    Serializes lists with the row serializer of the child when it has one.
+    """
+
+    def to_representation(self, data):
+        to_representation = self.child.get_row_serializer()
+        if to_representation is None:
+            return super(RowListSerializer, self).to_representation(data)
+        rows = data.all() if isinstance(data, models.Manager) else data
+        return [to_representation(row) for row in rows]
+
+
+class RowHyperlinkedModelSerializer(TimedDataMixin, SparseFieldsMixin, serializers.HyperlinkedModelSerializer):
+    """
+    Hyperlinked model serializer which serializes lists from rows, see :mod:`socialnetwork.serializers`.
+    Subclasses set ``list_serializer_class = RowListSerializer`` in their ``Meta``.
+
+    Rows are used when every readable field is a model field, or a hyperlink looked up by ``pk``,
+    and the request has no format suffix. Other serializers fall back to serializing instances.
+    """
+
+    def get_row_fields(self):
+        """
+        Return ``(name, column, to_representation)`` of every readable field, or ``None`` if the fields
+        cannot be serialized from rows.
+        """
+        request = self.context.get('request', None)
+        if request is None or self.context.get('format'):
+            return None
+
+        opts = self.Meta.model._meta
+        row_fields = []
+        for field in self._readable_fields:
+            if isinstance(field, relations.HyperlinkedRelatedField):
+                if field.lookup_field != 'pk':
+                    return None
+                if isinstance(field, relations.HyperlinkedIdentityField):
+                    column = opts.pk.attname
+                else:
+                    column = self.get_column(field, relation=True)
+                url = reverse(field.view_name, kwargs={field.lookup_url_kwarg: PLACEHOLDER}, request=request)
+                to_representation = url_builder(*url.split(PLACEHOLDER))
+            elif isinstance(field, relations.RelatedField) or isinstance(field, serializers.BaseSerializer):
+                return None
+            else:
+                column, to_representation = self.get_column(field, relation=False), field.to_representation
+            if column is None:
+                return None
+            row_fields.append((field.field_name, column, to_representation))
+        return row_fields
+
+    def get_column(self, field, relation):
+        if len(field.source_attrs) != 1:
+            return None
+        try:
+            model_field = self.Meta.model._meta.get_field(field.source)
+        except FieldDoesNotExist:
+            return None
+        if not model_field.concrete or model_field.is_relation != relation or model_field.many_to_many:
+            return None
+        return model_field.attname
+
+    def get_row_serializer(self, row_fields=None):
+        """
+        Return a function serializing a row, or ``None`` if the fields cannot be serialized from rows.
+        """
+        if row_fields is None:
+            row_fields = self.get_row_fields()
+        if row_fields is None:
+            return None
+
+        def to_representation(row):
+            get = row.__getitem__ if isinstance(row, dict) else row.__getattribute__
+            data = {}
+            for name, column, to_value in row_fields:
+                value = get(column)
+                data[name] = None if value is None else to_value(value)
+            return data
+        return to_representation
+
+    def get_row_queryset(self, queryset, *columns):
+        """
+        Return the queryset as ``values()`` rows with the columns needed by the fields and the given ones,
+        or unchanged if the fields cannot be serialized from rows.
+        """
+        row_fields = self.get_row_fields()
+        if row_fields is None:
+            return queryset
+        return queryset.values(*dict.fromkeys([column for _, column, _ in row_fields] + list(columns)))
+
+
+def version_key(value):
+    if hasattr(value, 'timestamp'):
+        return str(int(value.timestamp() * 1000000))
+    return str(value)
+
+
+class FragmentListSerializer(RowListSerializer):
+    """
+    Serializes lists with the cached fragments of the child when it can, see :class:`FragmentCacheMixin`.
+    """
+
+    def to_representation(self, data):
+        rows = data.all() if isinstance(data, models.Manager) else data
+        fragments = self.child.to_fragments(rows)
+        if fragments is None:
+            return super(FragmentListSerializer, self).to_representation(rows)
+        return fragments
+
+
+class FragmentCacheMixin:
+    """
+    Caches the representations of rows serialized by :class:`RowHyperlinkedModelSerializer` one by one, keyed by
+    the primary key and the ``fragment_version_field`` of the row, and by the fields and URLs of the request.
+    The version field has to change with every change of the row, so edits only miss the fragments of edited rows.
+    Subclasses set ``list_serializer_class = FragmentListSerializer`` in their ``Meta``.
+    """
+    fragment_version_field = 'updated_at'
+
+    def get_fragment_prefix(self, row_fields):
+        request = self.context['request']
+        variant = '{}|{}'.format(request.build_absolute_uri(get_script_prefix()),
+                                 ','.join(name for name, _, _ in row_fields))
+        return 'fragment:{}:{}'.format(self.Meta.model._meta.label_lower, hashlib.md5(variant.encode()).hexdigest())
+
+    def get_fragment_queryset(self, queryset, *columns):
+        """
+        Return the queryset as ``values()`` rows with only the primary key, the version and the given columns,
+        or unchanged if the fields cannot be serialized from rows. Missing fragments are loaded by :meth:`to_fragments`.
+        """
+        if self.get_row_fields() is None:
+            return queryset
+        pk = self.Meta.model._meta.pk.attname
+        return queryset.values(*dict.fromkeys([pk, self.fragment_version_field] + list(columns)))
+
+    def to_fragments(self, rows):
+        """
+        Return the representations of the rows, taken from the cache where possible, or ``None`` if the fields
+        cannot be serialized from rows or the rows have no versions. Rows missing in the cache which are ``values()``
+        rows without all the columns needed by the fields are loaded with one query.
+        """
+        row_fields = self.get_row_fields()
+        if row_fields is None:
+            return None
+        rows = list(rows)
+        if not rows:
+            return []
+        pk, version = self.Meta.model._meta.pk.attname, self.fragment_version_field
+        is_dict = isinstance(rows[0], dict)
+        if version not in (rows[0] if is_dict else rows[0].__dict__):
+            return None
+
+        def get(row, column):
+            return row[column] if is_dict else getattr(row, column)
+
+        prefix = self.get_fragment_prefix(row_fields)
+        keys = {get(row, pk): '{}:{}:{}'.format(prefix, get(row, pk), version_key(get(row, version))) for row in rows}
+        cached = cache.get_many(list(keys.values()))
+        results = {row_pk: cached[key] for row_pk, key in keys.items() if key in cached}
+
+        missing = [row for row in rows if get(row, pk) not in results]
+        if missing:
+            columns = [column for _, column, _ in row_fields]
+            if is_dict and not all(column in missing[0] for column in columns):
+                missing = self.Meta.model._default_manager.filter(
+                    pk__in=[row[pk] for row in missing]).values(*dict.fromkeys([pk, version] + columns))
+            to_representation = self.get_row_serializer(row_fields)
+            fragments = {}
+            for row in missing:
+                results[get(row, pk)] = data = to_representation(row)
+                fragments['{}:{}:{}'.format(prefix, get(row, pk), version_key(get(row, version)))] = data
+            cache.set_many(fragments, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24))
+        return [results[get(row, pk)] for row in rows if get(row, pk) in results]
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'accounts',
     'blog',
+    'tasks',
     'rest_framework',
     'django_filters',
 ]
@@ -50,7 +51,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'socialnetwork.metrics.MetricsMiddleware',
     'accounts.middleware.SaveLastRequestMiddleware',
+    'socialnetwork.routers.ReplicaPinningMiddleware',
 ]
 
 ROOT_URLCONF = 'socialnetwork.urls'
@@ -88,6 +91,26 @@ DATABASES = {
     }
 }
 
+# Read replicas
+# SQL_REPLICAS is a comma-separated list of replicas of the default database: host[:port] of servers sharing
+# its name and credentials, or database file names for SQLite. GET and HEAD requests read from a healthy replica,
+# clients which wrote read from the primary for REPLICA_PIN_SECONDS. Replicas are health checked at most
+# every REPLICA_HEALTH_CHECK_INTERVAL seconds.
+
+for number, replica in enumerate(filter(None, os.environ.get('SQL_REPLICAS', '').split(',')), 1):
+    config = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    if config['ENGINE'] == 'django.db.backends.sqlite3':
+        config['NAME'] = replica
+    else:
+        host, _, port = replica.partition(':')
+        config.update(HOST=host, PORT=port or config['PORT'])
+    DATABASES['replica_{}'.format(number)] = config
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['socialnetwork.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', default=5))
+REPLICA_HEALTH_CHECK_INTERVAL = int(os.environ.get('REPLICA_HEALTH_CHECK_INTERVAL', default=10))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -134,12 +157,130 @@ AUTH_USER_MODEL = 'accounts.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.BasicAuthentication',
+        'accounts.authentication.CachedBasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     'PAGE_SIZE': 100
 }
 
 LOGIN_REDIRECT_URL = '/'
+
+# Basic authentication
+# Successfully verified credentials are remembered for BASIC_AUTH_CACHE_TIMEOUT seconds (0 disables it),
+# so scripted clients do not pay for password hashing on every request.
+# Entries stop matching when the password changes, and deactivated users are rejected right away.
+
+BASIC_AUTH_CACHE_TIMEOUT = int(os.environ.get('BASIC_AUTH_CACHE_TIMEOUT', default=5 * 60))
+
+# JWT authentication
+# Access tokens carry the user's username, is_staff and is_active, so requests are authenticated without queries.
+# Changes of these fields take effect when the access token is refreshed.
+# Views which need the full user row load it through a per-process cache of JWT_USER_CACHE_SIZE users,
+# kept for JWT_USER_CACHE_TIMEOUT seconds.
+
+JWT_USER_CACHE_SIZE = int(os.environ.get('JWT_USER_CACHE_SIZE', default=1024))
+JWT_USER_CACHE_TIMEOUT = int(os.environ.get('JWT_USER_CACHE_TIMEOUT', default=60))
+
+# Async endpoints
+# Under ASGI, database calls of the api/async/ endpoints run in a pool of threads.
+# Set ASYNC_DATABASE_THREAD_SENSITIVE to run them all in one thread, as Django does for synchronous views.
+
+ASYNC_DATABASE_THREAD_SENSITIVE = int(os.environ.get('ASYNC_DATABASE_THREAD_SENSITIVE', default=0))
+
+# Approximate counts
+# The posts and users lists estimate the total count of tables with APPROXIMATE_COUNT_THRESHOLD or more rows:
+# from the planner statistics on PostgreSQL, otherwise from a count refreshed every APPROXIMATE_COUNT_TIMEOUT seconds.
+
+APPROXIMATE_COUNT_THRESHOLD = int(os.environ.get('APPROXIMATE_COUNT_THRESHOLD', default=10000))
+APPROXIMATE_COUNT_TIMEOUT = int(os.environ.get('APPROXIMATE_COUNT_TIMEOUT', default=60))
+
+# Cache
+# CACHE_BACKEND is 'locmem' for a cache in each process, 'database' for the CACHE_LOCATION table of the default
+# database shared by all processes, created with `python manage.py createcachetable`, or the import path of another
+# Django cache backend. Shared backends must add keys atomically for locks to hold across processes, which rules out
+# the file-based one.
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', ''),
+    'database': ('django.core.cache.backends.db.DatabaseCache', 'cache_table'),
+}
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS.get(os.environ.get('CACHE_BACKEND', default='locmem'),
+                                                  (os.environ.get('CACHE_BACKEND'), ''))
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.environ.get('CACHE_LOCATION', default=CACHE_LOCATION),
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', default=10000))},
+    }
+}
+
+# List caching
+# Cached lists are invalidated as soon as posts or users change, like counters included, so the timeouts can be long.
+# Likes analytics is cached for each user and query until the daily like counts of the user change.
+# Serialized posts are cached one by one for FRAGMENT_CACHE_TIMEOUT seconds, until the post changes.
+# One request at a time computes a cached response: others wait for a missing one up to CACHE_LOCK_TIMEOUT seconds,
+# or get an expired one for up to CACHE_STALE_TIMEOUT seconds. Responses are recomputed early at random,
+# the sooner the higher CACHE_EARLY_EXPIRATION_BETA is (0 disables it).
+
+POST_LIST_CACHE_TIMEOUT = int(os.environ.get('POST_LIST_CACHE_TIMEOUT', default=60 * 60))
+USER_LIST_CACHE_TIMEOUT = int(os.environ.get('USER_LIST_CACHE_TIMEOUT', default=60 * 60 * 24))
+ANALYTICS_CACHE_TIMEOUT = int(os.environ.get('ANALYTICS_CACHE_TIMEOUT', default=60 * 60))
+FRAGMENT_CACHE_TIMEOUT = int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', default=60 * 60 * 24))
+CACHE_LOCK_TIMEOUT = int(os.environ.get('CACHE_LOCK_TIMEOUT', default=10))
+CACHE_STALE_TIMEOUT = int(os.environ.get('CACHE_STALE_TIMEOUT', default=30))
+CACHE_EARLY_EXPIRATION_BETA = float(os.environ.get('CACHE_EARLY_EXPIRATION_BETA', default=1.0))
+
+# Background tasks
+# Work deferred out of requests runs in TASK_BACKEND: 'local' runs it in TASK_WORKERS threads of the serving process,
+# 'database' stores it for `python manage.py run_tasks`, 'eager' runs it at once. Failed tasks are retried after
+# TASK_RETRY_DELAY * 2 ** attempt seconds. Stored tasks claimed by a worker are run again if not finished
+# within TASK_LOCK_TIMEOUT seconds.
+
+TASK_BACKEND = os.environ.get('TASK_BACKEND', default='local')
+TASK_WORKERS = int(os.environ.get('TASK_WORKERS', default=2))
+TASK_RETRY_DELAY = int(os.environ.get('TASK_RETRY_DELAY', default=2))
+TASK_LOCK_TIMEOUT = int(os.environ.get('TASK_LOCK_TIMEOUT', default=5 * 60))
+
+# Like ingestion
+# With LIKE_INGESTION set to 'log', likes and unlikes are appended to an event log and acknowledged at once,
+# then applied to the likes in batches by `python manage.py compact_like_events --loop`. Users see their own
+# pending likes, like counters and analytics lag behind until the events are applied.
+
+LIKE_INGESTION = os.environ.get('LIKE_INGESTION', default='direct')
+
+# Trending posts
+# The leaderboard is served from like counts in time buckets, which are deleted once older than a week,
+# at most every TRENDING_EXPIRE_INTERVAL seconds. Responses are cached for TRENDING_CACHE_TIMEOUT seconds
+# and list up to TRENDING_SIZE posts.
+
+TRENDING_CACHE_TIMEOUT = int(os.environ.get('TRENDING_CACHE_TIMEOUT', default=60))
+TRENDING_SIZE = int(os.environ.get('TRENDING_SIZE', default=100))
+TRENDING_EXPIRE_INTERVAL = int(os.environ.get('TRENDING_EXPIRE_INTERVAL', default=60 * 60))
+
+# Home timeline
+# Posts of authors with fewer than TIMELINE_FANOUT_LIMIT followers are delivered to followers' timelines
+# when created, posts of more followed authors are merged in when timelines are read.
+
+TIMELINE_FANOUT_LIMIT = int(os.environ.get('TIMELINE_FANOUT_LIMIT', default=1000))
+TIMELINE_MAX_LENGTH = int(os.environ.get('TIMELINE_MAX_LENGTH', default=800))
+TIMELINE_BACKFILL_SIZE = int(os.environ.get('TIMELINE_BACKFILL_SIZE', default=20))
+
+# Last request tracking
+# Requests made within LAST_REQUEST_GRANULARITY seconds of the recorded one are not written again.
+# With LAST_REQUEST_BUFFERED enabled, timestamps are kept in memory and written in bulk
+# every LAST_REQUEST_FLUSH_INTERVAL seconds or once LAST_REQUEST_FLUSH_SIZE users are pending.
+# Buffered flushes are written by a background task, unbuffered requests with a single update.
+
+LAST_REQUEST_BUFFERED = int(os.environ.get('LAST_REQUEST_BUFFERED', default=0))
+LAST_REQUEST_GRANULARITY = int(os.environ.get('LAST_REQUEST_GRANULARITY', default=60))
+LAST_REQUEST_FLUSH_INTERVAL = int(os.environ.get('LAST_REQUEST_FLUSH_INTERVAL', default=30))
+LAST_REQUEST_FLUSH_SIZE = int(os.environ.get('LAST_REQUEST_FLUSH_SIZE', default=500))
+
+# Request metrics
+# Latency, queries, serializer time and response size of every request are aggregated per route and process,
+# and exposed to admins on api/metrics/ in the Prometheus text format.
+# Requests running one query METRICS_N_PLUS_ONE_THRESHOLD or more times are counted and logged as possible N+1 queries.
+
+METRICS_N_PLUS_ONE_THRESHOLD = int(os.environ.get('METRICS_N_PLUS_ONE_THRESHOLD', default=10))
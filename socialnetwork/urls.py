@@ -1,13 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import TemplateView
-from rest_framework_simplejwt.views import (
-    TokenObtainPairView,
-    TokenRefreshView,
-    TokenVerifyView,
-)
+from rest_framework_simplejwt.views import TokenVerifyView
 from rest_framework.schemas import get_schema_view
 
+from accounts.views import TokenObtainPairView, TokenRefreshView
+from .metrics import MetricsView
+
 urlpatterns = [
     path('openapi/', get_schema_view(
         title="Social Network API",
@@ -23,6 +22,7 @@ urlpatterns = [
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/token/verify/', TokenVerifyView.as_view(), name='token_verify'),
+    path('api/metrics/', MetricsView.as_view(), name='metrics'),
     path('api/', include('accounts.urls')),
     path('api/', include('blog.urls')),
 ]
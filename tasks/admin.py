@@ -0,0 +1,9 @@
+from django.contrib import admin
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'run_at', 'attempts', 'failed', 'created_at')
+    list_filter = ('failed', 'name')
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.queue import backends
+
+
+class Command(BaseCommand):
+    help = 'Runs background tasks stored with the database backend (TASK_BACKEND=database).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep running new tasks until interrupted.')
+        parser.add_argument('--threads', type=int, default=settings.TASK_WORKERS, help='Tasks run at once.')
+        parser.add_argument('--limit', type=int, default=100, help='Tasks claimed at once.')
+        parser.add_argument('--interval', type=float, default=1.0,
+                            help='Seconds to wait for new tasks when none are due, with --loop.')
+
+    def handle(self, *args, **options):
+        run = 0
+        try:
+            run = backends['database'].work(options['limit'], options['threads'], options['interval'], options['loop'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Ran {} tasks.'.format(run)))
@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import F
+from django.utils.timezone import now
+
+
+class TaskManager(models.Manager):
+
+    def claim(self, limit, timeout):
+        """
+        Claim up to ``limit`` due tasks for ``timeout`` seconds and count their attempts, return the claimed tasks.
+        Tasks not finished within the timeout, e.g. of a stopped worker, are due again.
+        """
+        with transaction.atomic(using=self.db):
+            ids = list(self.select_for_update(skip_locked=True).filter(failed=False, run_at__lte=now()).order_by(
+                'run_at', 'id').values_list('id', flat=True)[:limit])
+            self.filter(id__in=ids).update(run_at=now() + timedelta(seconds=timeout), attempts=F('attempts') + 1)
+            return list(self.filter(id__in=ids).order_by('id'))
+
+
+class Task(models.Model):
+    """
+    Stores a call of a background task queued with the ``database`` backend, see :mod:`tasks.queue`.
+    Tasks which failed on all their attempts are kept with ``failed`` set.
+    """
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    run_at = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    failed = models.BooleanField(default=False)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TaskManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['failed', 'run_at'], name='tasks_task_failed_run_at_idx'),
+        ]
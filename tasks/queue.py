@@ -0,0 +1,255 @@
+"""
+Background tasks for work which does not have to finish before the response is sent.
+
+Functions decorated with :func:`task` are queued with ``.delay(**kwargs)`` and run by the backend chosen with
+``TASK_BACKEND``:
+
+* ``local`` runs tasks in a pool of ``TASK_WORKERS`` threads of the process which queued them, once the current
+  transaction commits. Tasks still queued when the process exits are run before it exits.
+* ``database`` stores tasks as :model:`tasks.Task` rows in the current transaction, and ``manage.py run_tasks``
+  runs them, so they survive restarts and can run in other processes.
+* ``eager`` runs tasks at once, in the caller.
+
+Arguments must be JSON serializable and are passed through JSON with every backend, so e.g. dict keys become strings.
+Tasks with ``batch_size`` greater than one are called with a list of the arguments of up to ``batch_size`` queued
+calls instead. Failing tasks are retried up to ``retries`` times, ``TASK_RETRY_DELAY * 2 ** attempt`` seconds later.
+"""
+import atexit
+import heapq
+import itertools
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.timezone import now
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def get_retry_delay(attempt):
+    return getattr(settings, 'TASK_RETRY_DELAY', 2) * 2 ** attempt
+
+
+class TaskDefinition:
+    """
+    A function registered with :func:`task`, which can still be called directly.
+    """
+
+    def __init__(self, func, name, retries, batch_size):
+        self.func = func
+        self.name = name
+        self.retries = retries
+        self.batch_size = batch_size
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, **kwargs):
+        """
+        Queue a call of the task with the keyword arguments.
+        """
+        get_backend().enqueue(self, json.loads(json.dumps(kwargs)))
+
+    def run(self, payloads):
+        """
+        Run the task with the arguments of one or, for batch tasks, more queued calls.
+        """
+        if self.batch_size > 1:
+            self.func(payloads)
+        else:
+            for payload in payloads:
+                self.func(**payload)
+
+
+def task(name=None, retries=3, batch_size=1):
+    """
+    Register the function as a task, named after its module and name unless ``name`` is given.
+    """
+    def decorator(func):
+        definition = TaskDefinition(func, name or '{}.{}'.format(func.__module__, func.__name__), retries, batch_size)
+        registry[definition.name] = definition
+        return definition
+    return decorator
+
+
+def batches(items, get_name):
+    """
+    Split the items into lists of items of the same task, of up to the batch size of the task.
+    """
+    by_name = {}
+    for item in items:
+        by_name.setdefault(get_name(item), []).append(item)
+    for name, named in by_name.items():
+        batch_size = registry[name].batch_size
+        for start in range(0, len(named), batch_size):
+            yield registry[name], named[start:start + batch_size]
+
+
+class EagerBackend:
+
+    def enqueue(self, definition, payload):
+        definition.run([payload])
+
+
+class LocalBackend:
+    """
+    Runs tasks in threads of this process. Queued tasks are kept in memory, ordered by the time they are due.
+    """
+
+    def __init__(self):
+        self._queue = []
+        self._condition = threading.Condition()
+        self._counter = itertools.count()
+        self._threads = []
+
+    def enqueue(self, definition, payload):
+        transaction.on_commit(lambda: self.put(definition.name, payload))
+
+    def put(self, name, payload, attempt=0, delay=0):
+        with self._condition:
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._counter), name, payload, attempt))
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < getattr(settings, 'TASK_WORKERS', 2):
+                thread = threading.Thread(target=self.work, name='task-worker', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._condition.notify()
+
+    def take(self, wait=True):
+        """
+        Remove and return the task of the first due item and up to its batch size of due items of that task,
+        as ``(definition, [(payload, attempt), ...])``. Wait until an item is due unless ``wait`` is false,
+        in which case all items are due and ``(None, [])`` is returned when there are none.
+        """
+        with self._condition:
+            while wait and not (self._queue and self._queue[0][0] <= time.monotonic()):
+                self._condition.wait(self._queue[0][0] - time.monotonic() if self._queue else None)
+            if not self._queue:
+                return None, []
+            _, _, name, payload, attempt = heapq.heappop(self._queue)
+            definition = registry[name]
+            items = [(payload, attempt)]
+            if definition.batch_size > 1:
+                current = time.monotonic()
+                rest = []
+                for item in sorted(self._queue):
+                    if len(items) < definition.batch_size and item[2] == name and (not wait or item[0] <= current):
+                        items.append((item[3], item[4]))
+                    else:
+                        rest.append(item)
+                heapq.heapify(rest)
+                self._queue = rest
+            return definition, items
+
+    def work(self):
+        while True:
+            self.execute(*self.take())
+
+    def execute(self, definition, items, retry=True):
+        close_old_connections()
+        try:
+            definition.run([payload for payload, _ in items])
+        except Exception:
+            attempt = max(attempt for _, attempt in items)
+            if retry and attempt < definition.retries:
+                logger.warning('Task %s failed, retrying', definition.name, exc_info=True)
+                for payload, _ in items:
+                    self.put(definition.name, payload, attempt + 1, get_retry_delay(attempt))
+            else:
+                logger.exception('Task %s failed after %d attempts', definition.name, attempt + 1)
+        finally:
+            close_old_connections()
+
+    def drain(self):
+        """
+        Run all queued tasks in the calling thread, without waiting for retries.
+        """
+        while True:
+            definition, items = self.take(wait=False)
+            if definition is None:
+                return
+            self.execute(definition, items, retry=False)
+
+
+class DatabaseBackend:
+    """
+    Stores tasks as :model:`tasks.Task` rows, run by :meth:`run_pending`.
+    """
+
+    def enqueue(self, definition, payload):
+        from .models import Task
+        Task.objects.create(name=definition.name, payload=payload, run_at=now())
+
+    def run_pending(self, limit=100, executor=None):
+        """
+        Claim and run up to ``limit`` due tasks, in batches run by the executor if given.
+        Return the number of tasks run.
+        """
+        from .models import Task
+        tasks = Task.objects.claim(limit, getattr(settings, 'TASK_LOCK_TIMEOUT', 5 * 60))
+        unknown = [stored.id for stored in tasks if stored.name not in registry]
+        if unknown:
+            Task.objects.filter(id__in=unknown).update(failed=True, last_error='Unknown task')
+        jobs = list(batches([stored for stored in tasks if stored.name in registry], lambda stored: stored.name))
+        if executor is None:
+            for definition, stored in jobs:
+                self.execute(definition, stored)
+        else:
+            list(executor.map(lambda job: self.execute(*job), jobs))
+        return len(tasks)
+
+    def execute(self, definition, tasks):
+        from .models import Task
+        close_old_connections()
+        try:
+            definition.run([stored.payload for stored in tasks])
+        except Exception as exc:
+            attempts = max(stored.attempts for stored in tasks)
+            failed = attempts > definition.retries
+            if failed:
+                logger.exception('Task %s failed after %d attempts', definition.name, attempts)
+            else:
+                logger.warning('Task %s failed, retrying', definition.name, exc_info=True)
+            Task.objects.filter(id__in=[stored.id for stored in tasks]).update(
+                failed=failed, last_error=repr(exc), run_at=now() + timedelta(seconds=get_retry_delay(attempts - 1)),
+            )
+        else:
+            Task.objects.filter(id__in=[stored.id for stored in tasks]).delete()
+        finally:
+            close_old_connections()
+
+    def work(self, limit=100, threads=1, interval=1.0, loop=False):
+        """
+        Run due tasks with a pool of threads until none are due, or until interrupted with ``loop``.
+        Return the number of tasks run.
+        """
+        run = 0
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            while True:
+                ran = self.run_pending(limit, executor if threads > 1 else None)
+                run += ran
+                if ran:
+                    continue
+                if not loop:
+                    return run
+                time.sleep(interval)
+
+
+backends = {
+    'eager': EagerBackend(),
+    'local': LocalBackend(),
+    'database': DatabaseBackend(),
+}
+
+atexit.register(backends['local'].drain)
+
+
+def get_backend():
+    return backends[getattr(settings, 'TASK_BACKEND', 'local')]
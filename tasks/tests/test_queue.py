@@ -0,0 +1,140 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+
+from accounts.buffers import last_request_buffer
+from accounts.tests.test_views import SetUpTestCase
+from tasks.models import Task
+from tasks.queue import LocalBackend, backends, task
+
+User = get_user_model()
+
+calls = []
+
+
+@task(name='tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='tests.record_batch', batch_size=3)
+def record_batch(payloads):
+    calls.append([payload['value'] for payload in payloads])
+
+
+@task(name='tests.fail', retries=1)
+def fail(value):
+    raise ValueError(value)
+
+
+class TaskQueueTestCase(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    @override_settings(TASK_BACKEND='eager')
+    def test_eager_backend_passes_arguments_through_json(self):
+        record.delay(value={1: 'a'})
+        self.assertEqual(calls, [{'1': 'a'}])
+
+    @override_settings(TASK_BACKEND='database')
+    def test_database_backend_runs_batches(self):
+        for value in range(4):
+            record_batch.delay(value=value)
+        record.delay(value='single')
+        self.assertEqual(Task.objects.count(), 5)
+        self.assertEqual(calls, [])
+
+        self.assertEqual(backends['database'].run_pending(), 5)
+        self.assertEqual(calls, [[0, 1, 2], [3], 'single'])
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(TASK_BACKEND='database', TASK_RETRY_DELAY=60)
+    def test_database_backend_retries_with_backoff(self):
+        fail.delay(value='error')
+        Task.objects.create(name='tests.missing', run_at=now())
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            self.assertEqual(backends['database'].run_pending(), 2)
+        stored = Task.objects.get(name='tests.fail')
+        self.assertEqual(stored.attempts, 1)
+        self.assertFalse(stored.failed)
+        self.assertIn('error', stored.last_error)
+        self.assertGreater(stored.run_at, now() + timedelta(seconds=50))
+        self.assertTrue(Task.objects.get(name='tests.missing').failed)
+
+        self.assertEqual(backends['database'].run_pending(), 0)
+        Task.objects.filter(pk=stored.pk).update(run_at=now())
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            backends['database'].run_pending()
+        stored.refresh_from_db()
+        self.assertEqual(stored.attempts, 2)
+        self.assertTrue(stored.failed)
+        self.assertEqual(backends['database'].run_pending(), 0)
+
+    @override_settings(TASK_WORKERS=0, TASK_RETRY_DELAY=60)
+    def test_local_backend_batches_due_tasks(self):
+        backend = LocalBackend()
+        for value in range(4):
+            backend.put('tests.record_batch', {'value': value})
+        backend.put('tests.record_batch', {'value': 'later'}, delay=60)
+        backend.put('tests.record', {'value': 'single'})
+
+        definition, items = backend.take()
+        self.assertEqual(definition, record_batch)
+        self.assertEqual(items, [({'value': value}, 0) for value in range(3)])
+        backend.execute(definition, items)
+        self.assertEqual(calls, [[0, 1, 2]])
+
+        with self.assertLogs('tasks.queue', 'WARNING'):
+            backend.execute(fail, [({'value': 'error'}, 0)])
+        self.assertEqual([item[2:] for item in sorted(backend._queue)][-1], ('tests.fail', {'value': 'error'}, 1))
+
+        with self.assertLogs('tasks.queue', 'ERROR'):
+            backend.drain()
+        self.assertEqual(calls, [[0, 1, 2], [3, 'later'], 'single'])
+        self.assertEqual(backend._queue, [])
+
+
+@override_settings(TASK_BACKEND='database', LAST_REQUEST_BUFFERED=1, LAST_REQUEST_GRANULARITY=0,
+                   LAST_REQUEST_FLUSH_SIZE=1)
+class DeferredWritesTestCase(SetUpTestCase):
+
+    def setUp(self):
+        super(DeferredWritesTestCase, self).setUp()
+        last_request_buffer.clear()
+
+    def test_last_request_saved_by_worker(self):
+        User.objects.filter(pk=self.user_id).update(last_request=None)
+        self.client_authorized.get(reverse('user-list'))
+        self.client_authorized.get(reverse('user-list'))
+        self.assertIsNone(User.objects.get(pk=self.user_id).last_request)
+
+        out = StringIO()
+        call_command('run_tasks', threads=1, stdout=out)
+        self.assertIn('Ran 2 tasks.', out.getvalue())
+        self.assertIsNotNone(User.objects.get(pk=self.user_id).last_request)
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(LAST_REQUEST_BUFFERED=0)
+    def test_unbuffered_last_request_saved_without_task(self):
+        User.objects.filter(pk=self.user_id).update(last_request=None)
+        self.client_authorized.get(reverse('user-list'))
+        self.assertIsNotNone(User.objects.get(pk=self.user_id).last_request)
+        self.assertFalse(Task.objects.exists())
+
+    def test_activity_shows_queued_last_request(self):
+        User.objects.filter(pk=self.user_id).update(last_request=None)
+        self.client_authorized.get(reverse('user-list'))
+        url = '/api/users/{}/activity/'.format(self.user_id)
+        queued = self.client_authorized_admin.get(url).data['last_request']
+        self.assertIsNotNone(queued)
+        self.assertIsNone(User.objects.get(pk=self.user_id).last_request)
+
+        call_command('run_tasks', threads=1, stdout=StringIO())
+        self.assertIsNone(last_request_buffer.get(self.user_id))
+        self.assertEqual(self.client_authorized_admin.get(url).data['last_request'], queued)